@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+"""
+Пакетный рерайт для всплесков бэклога.
+
+После простоя или при первом запуске с широким DATE_WINDOW_DAYS стадия
+rewrite делает по запросу на инцидент, и каждый повторяет длинный шаблон
+с примерами. RewriteBatcher собирает инциденты, пришедшие от воркеров
+стадии, в пакет и переписывает его одним запросом (rewrite_batch):
+
+- пакет отправляется, когда набралось max_items инцидентов, когда следующий
+  не влезает в token_budget (оценка переменной части промпта) или через
+  linger_seconds после первого инцидента в пакете;
+- инциденты, которых нет в ответе или чей текст не прошёл validate_rewrite,
+  переписываются по одному обычным rewrite().
+"""
+
+import asyncio
+import logging
+from typing import Protocol
+
+from app.ai.deepseek_client import RewriteResult
+from app.ai.prompt_templates import build_incident_prompt
+from app.ai.usage import estimate_tokens
+from app.domain.models import Incident
+
+logger = logging.getLogger(__name__)
+
+
+class BatchRewriter(Protocol):
+    """DeepSeekClient или FailoverRewriter."""
+
+    def rewrite(self, incident: Incident) -> RewriteResult: ...
+
+    def rewrite_batch(self, incidents: list[Incident]) -> dict[str, RewriteResult]: ...
+
+
+class RewriteBatcher:
+    def __init__(
+        self,
+        rewriter: BatchRewriter,
+        max_items: int,
+        token_budget: int,
+        linger_seconds: float,
+    ) -> None:
+        self._rewriter = rewriter
+        self._max_items = max(1, max_items)
+        self._token_budget = max(1, token_budget)
+        self._linger = max(0.0, linger_seconds)
+        self._pending: list[tuple[Incident, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._batches = 0
+        self._batched_items = 0
+        self._single_calls = 0
+
+    async def rewrite(self, incident: Incident) -> RewriteResult:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        tokens = estimate_tokens(build_incident_prompt(incident))
+        if self._pending and self._pending_tokens + tokens > self._token_budget:
+            self._flush()
+        self._pending.append((incident, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self._max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._linger, self._flush)
+        return await future
+
+    def log_stats(self) -> None:
+        logger.info(
+            "llm batch | batches=%d batched_items=%d single_calls=%d",
+            self._batches, self._batched_items, self._single_calls,
+        )
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[Incident, asyncio.Future]]) -> None:
+        # Воркер, ждавший результат, мог быть отменён (остановка конвейера)
+        batch = [(incident, future) for incident, future in batch if not future.done()]
+        if not batch:
+            return
+        results: dict[str, RewriteResult] = {}
+        if len(batch) > 1:
+            try:
+                results = await asyncio.to_thread(self._rewriter.rewrite_batch, [incident for incident, _ in batch])
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("batch rewrite failed, rewriting one by one: %s", exc)
+            self._batches += 1
+            self._batched_items += len(results)
+        self._single_calls += len(batch) - len(results)
+
+        await asyncio.gather(*(self._resolve(incident, future, results) for incident, future in batch))
+
+    async def _resolve(
+        self, incident: Incident, future: asyncio.Future, results: dict[str, RewriteResult],
+    ) -> None:
+        result = results.get(incident.incident_id)
+        try:
+            if result is None:
+                result = await asyncio.to_thread(self._rewriter.rewrite, incident)
+        except Exception as exc:  # noqa: BLE001
+            if not future.done():
+                future.set_exception(exc)
+            return
+        if not future.done():
+            future.set_result(result)
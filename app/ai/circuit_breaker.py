@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+"""
+Предохранитель (circuit breaker) вызовов LLM API.
+
+Раньше 402 отключал провайдера до перезапуска, а таймауты и 5xx повторялись
+на каждом инциденте, каждый раз ожидая до 40 с. Предохранитель считает
+исходы последних вызовов:
+
+- closed — вызовы идут; если в окне из window последних вызовов (не меньше
+  min_calls) доля ошибок и медленных ответов (дольше slow_call_ms) достигла
+  failure_rate, цепь размыкается;
+- open — вызовы не выполняются open_seconds, затем цепь полуоткрыта;
+- half_open — пропускается одна пробная заявка: успех замыкает цепь,
+  ошибка или медленный ответ размыкают её снова.
+
+trip() размыкает цепь сразу (402 Payment Required, 401 — повторять нет смысла).
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        window: int = 10,
+        min_calls: int = 4,
+        slow_call_ms: float = 20_000.0,
+        open_seconds: float = 120.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._name = name
+        self._failure_rate = failure_rate
+        self._min_calls = max(1, min_calls)
+        self._slow_call_ms = slow_call_ms
+        self._open_seconds = max(0.0, open_seconds)
+        self._clock = clock
+        self._outcomes: deque[bool] = deque(maxlen=max(1, window))  # True — неудача
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self) -> bool:
+        """Можно ли выполнить вызов сейчас. В half_open разрешает только одну пробу."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self, latency_ms: float) -> None:
+        failed = latency_ms >= self._slow_call_ms
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                if failed:
+                    self._open(f"slow probe {latency_ms:.0f}ms")
+                else:
+                    self._outcomes.clear()
+                    self._transition(CLOSED, "probe succeeded")
+                return
+            self._record(failed, f"slow call {latency_ms:.0f}ms")
+
+    def record_failure(self, reason: str = "") -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._open(f"probe failed: {reason}")
+                return
+            self._record(True, reason)
+
+    def release(self) -> None:
+        """Вызов отменён без результата: освобождает слот пробы, счётчики не меняются."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def trip(self, reason: str) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+            self._open(reason)
+
+    def _record(self, failed: bool, reason: str) -> None:
+        if self._state != CLOSED:
+            return  # запоздавший ответ вызова, начатого до размыкания
+        self._outcomes.append(failed)
+        if len(self._outcomes) < self._min_calls:
+            return
+        rate = sum(self._outcomes) / len(self._outcomes)
+        if rate >= self._failure_rate:
+            self._open(f"failure rate {rate:.0%} ({reason})")
+
+    def _open(self, reason: str) -> None:
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self._transition(OPEN, reason)
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self._open_seconds:
+            self._transition(HALF_OPEN, f"after {self._open_seconds:.0f}s")
+
+    def _transition(self, state: str, reason: str) -> None:
+        if state == self._state and state != OPEN:
+            return
+        logger.warning("llm circuit | provider=%s %s -> %s | %s", self._name, self._state, state, reason)
+        self._state = state
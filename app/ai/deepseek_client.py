@@ -1,14 +1,62 @@
 from __future__ import annotations
 
+import json
 import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
 
 import httpx
 
-from app.ai.prompt_templates import SYSTEM_PROMPT, build_user_prompt
+from app.ai.circuit_breaker import OPEN, CircuitBreaker
+from app.ai.prompt_builder import PromptBuilder
+from app.ai.prompt_templates import (
+    PROMPT_PREFIX,
+    SYSTEM_PROMPT,
+    build_batch_prompt,
+    build_incident_prompt,
+    build_structured_prompt,
+)
+from app.ai.post_renderer import POST_SCHEMA, parse_structured_post, render_post
+from app.ai.repair import RepairResult, repair_rewrite
+from app.ai.rewrite_cache import RewriteCache, rewrite_cache_key
+from app.ai.streaming import StreamAborted, StreamCancelled, StreamStatsRecorder, WordCounter, iter_sse_data
+from app.ai.usage import LlmCallStore, TokenUsage, UsageLog, estimate_tokens, parse_usage
+from app.ai.validator import MAX_WORDS, validate_rewrite
 from app.domain.models import Incident
+from app.observability.metrics import LatencyTracker
+from app.transport.http import HttpTransport
 
 logger = logging.getLogger(__name__)
 
+TEMPERATURE = 0.2
+BATCH_OUTPUT_TOKENS_PER_ITEM = 700  # пост до 350 слов по-русски плюс JSON-обвязка
+
+
+def _prompt_size_bucket(tokens: int) -> str:
+    """Операция LatencyTracker по размеру промпта: prompt_le_1k, prompt_le_2k, ..."""
+    return f"prompt_le_{tokens // 1000 + 1}k"
+
+
+@dataclass(frozen=True)
+class RewriteResult:
+    """Результат рерайта: текст и признак того, что это fallback, а не ответ API."""
+    text: str
+    is_fallback: bool
+    provider: str
+    cached: bool = False       # взят из кэша рерайтов, запроса к API не было
+    latency_ms: float = 0.0    # задержка вызова API (для cached — исходного вызова)
+    tokens: int = 0            # usage.total_tokens вызова API (для cached — исходного)
+    repairs: tuple[str, ...] = ()  # что repair_rewrite исправил в ответе API
+
+
+@dataclass(frozen=True)
+class _Completion:
+    text: str
+    usage: TokenUsage
+    ttft_ms: float = 0.0       # только для потокового ответа
+
 
 class DeepSeekClient:
     def __init__(
@@ -18,68 +66,423 @@ class DeepSeekClient:
         base_url: str,
         provider_name: str = "deepseek",
         extra_headers: dict[str, str] | None = None,
+        transport: HttpTransport | None = None,
+        cache: RewriteCache | None = None,
+        breaker: CircuitBreaker | None = None,
+        streaming: bool = False,
+        stream_deadline_seconds: float = 30.0,
+        stream_read_timeout_seconds: float = 15.0,
+        stream_abort_words: int = 2 * MAX_WORDS,
+        usage_store: LlmCallStore | None = None,
+        structured_output: bool = False,
+        prompt_builder: PromptBuilder | None = None,
     ) -> None:
         self._api_key = api_key
         self._model = model
         self._base_url = base_url.rstrip("/")
         self._provider_name = provider_name
         self._extra_headers = extra_headers or {}
-        self._disabled_reason = ""
+        self._transport = transport
+        self._cache = cache
+        self._breaker = breaker or CircuitBreaker(provider_name)
+        self._streaming = streaming
+        self._stream_deadline = stream_deadline_seconds
+        self._stream_read_timeout = stream_read_timeout_seconds
+        # Обрыв только явного «разгона»: чуть длиннее MAX_WORDS сокращает repair_rewrite
+        self._stream_abort_words = max(MAX_WORDS, stream_abort_words)
+        self.latency = LatencyTracker()
+        self._stream_stats = StreamStatsRecorder()
+        self._usage = UsageLog(provider_name, model, usage_store)
+        self._structured = structured_output
+        self._prompt_builder = prompt_builder
+
+    @property
+    def provider_name(self) -> str:
+        return self._provider_name
 
     def is_api_rewrite_available(self) -> bool:
-        """Возвращает True если API доступно (не отключено из-за ошибки). (fix #6)"""
-        return bool(self._api_key) and not self._disabled_reason
+        """Возвращает True если API доступно (цепь предохранителя не разомкнута). (fix #6)"""
+        return bool(self._api_key) and self._breaker.state != OPEN
 
     def rewrite_incident(self, incident: Incident) -> str:
+        return self.rewrite(incident).text
+
+    def rewrite(self, incident: Incident, cancel: threading.Event | None = None) -> RewriteResult:
+        """
+        Как rewrite_incident, но сообщает, был ли использован fallback.
+        Признак возвращается вместе с текстом, а не читается через
+        is_api_rewrite_available(): при параллельном рерайте состояние
+        клиента может поменяться между вызовами.
+
+        cancel прерывает потоковый запрос между чанками (результат — fallback);
+        обычный запрос досчитывается, но его результат уже никому не нужен.
+        """
+        prefix, incident_prompt, sentences = self._prompt_parts(incident)
+        cache_key = ""
+        if self._cache is not None:
+            cache_key = self._prompt_cache_key(prefix, incident_prompt)
+            cached = self._cached_result(cache_key, incident)
+            if cached is not None:
+                return cached
+
         if not self._api_key:
-            return self._fallback(incident)
+            return self._fallback_result(incident)
 
-        if self._disabled_reason:
-            logger.info(
-                "%s disabled for current run (%s), using fallback.",
-                self._provider_name,
-                self._disabled_reason,
-            )
-            return self._fallback(incident)
+        if not self._breaker.allow():
+            logger.debug("%s circuit %s, using fallback.", self._provider_name, self._breaker.state)
+            return self._fallback_result(incident)
 
+        # Неизменный префикс (системный промпт, шаблон, примеры) идёт первым и
+        # попадает в кэш контекста провайдера; данные инцидента — последним сообщением
         payload = {
             "model": self._model,
             "messages": [
                 {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": build_user_prompt(incident)},
+                {"role": "user", "content": prefix},
+                {"role": "user", "content": incident_prompt},
             ],
-            "temperature": 0.2,
-        }
-
-        headers = {
-            "Authorization": f"Bearer {self._api_key}",
-            "Content-Type": "application/json",
-            **self._extra_headers,
+            "temperature": TEMPERATURE,
         }
+        prompt_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prefix) + estimate_tokens(incident_prompt)
+        if self._structured:
+            payload["response_format"] = self._structured_response_format()
 
+        headers = self._headers()
         endpoint = f"{self._base_url}/chat/completions"
 
+        started = time.perf_counter()
         try:
-            with httpx.Client(timeout=40.0) as client:
-                response = client.post(endpoint, headers=headers, json=payload)
-                response.raise_for_status()
-                data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
+            if self._streaming:
+                completion = self._complete_streaming(endpoint, headers, payload, started, cancel)
+            else:
+                completion = self._complete(endpoint, headers, payload)
+            latency_ms = (time.perf_counter() - started) * 1000.0
+            text, tokens = completion.text, completion.usage.total_tokens
+            self.latency.record("completion", latency_ms / 1000.0)
+            self.latency.record(_prompt_size_bucket(prompt_tokens), latency_ms / 1000.0)
+            logger.info(
+                "%s call | id=%s prompt_tokens_est=%d narrative=%s latency_ms=%.0f",
+                self._provider_name, incident.incident_id, prompt_tokens, sentences, latency_ms,
+            )
+            self._breaker.record_success(latency_ms)
+            self._usage.record(incident.incident_id, completion.usage, latency_ms, completion.ttft_ms)
+            if self._structured:
+                post = parse_structured_post(text)
+                if post is None:
+                    logger.warning(
+                        "%s structured output unparsable | id=%s, using fallback rewrite",
+                        self._provider_name,
+                        incident.incident_id,
+                    )
+                    return self._fallback_result(incident)
+                text = render_post(post)
+            repaired = self._repair(incident, text)
+            text = repaired.text
+            # В кэш — только валидный текст: мусор вытеснял бы хорошие записи и стоил чтения с удалением
+            if self._cache is not None and validate_rewrite(text)[0]:
+                self._cache.put(cache_key, self._provider_name, self._model, text, latency_ms, tokens)
+            return RewriteResult(
+                text=text,
+                is_fallback=False,
+                provider=self._provider_name,
+                latency_ms=latency_ms,
+                tokens=tokens,
+                repairs=repaired.fixes,
+            )
         except httpx.HTTPStatusError as exc:
             details = self._extract_error_details(exc.response)
             if exc.response.status_code == 402:
-                self._disabled_reason = f"{self._provider_name}_402_payment_required"
+                # Повторять сразу бесполезно: цепь размыкается, пробный запрос — после паузы
+                self._breaker.trip("402 Payment Required")
                 logger.warning(
-                    "%s 402 Payment Required. Отключаем запросы до перезапуска. details=%s",
+                    "%s 402 Payment Required. Запросы приостановлены до пробного. details=%s",
                     self._provider_name,
                     details,
                 )
             else:
+                self._breaker.record_failure(f"status={exc.response.status_code}")
                 logger.warning("%s API error, using fallback rewrite: %s", self._provider_name, details)
-            return self._fallback(incident)
+            return self._fallback_result(incident)
+        except StreamCancelled:
+            self._breaker.release()
+            logger.debug("%s request cancelled | id=%s", self._provider_name, incident.incident_id)
+            return self._fallback_result(incident)
+        except StreamAborted as exc:
+            if exc.provider_fault:
+                self._breaker.record_failure(exc.reason)
+            else:
+                self._breaker.record_success((time.perf_counter() - started) * 1000.0)
+            logger.warning(
+                "%s stream aborted | id=%s reason=%s, using fallback rewrite",
+                self._provider_name,
+                incident.incident_id,
+                exc.reason,
+            )
+            return self._fallback_result(incident)
         except Exception as exc:  # noqa: BLE001
+            self._breaker.record_failure(type(exc).__name__)
             logger.warning("%s unavailable, using fallback rewrite: %s", self._provider_name, exc)
-            return self._fallback(incident)
+            return self._fallback_result(incident)
+
+    def rewrite_batch(self, incidents: list[Incident]) -> dict[str, RewriteResult]:
+        """
+        Рерайт нескольких инцидентов одним запросом с JSON-ответом
+        {"posts": {incident_id: текст}}: шаблон и примеры отправляются один
+        раз на пакет, а не на каждый инцидент.
+
+        Возвращает только ответы из кэша и тексты, прошедшие validate_rewrite.
+        Пропущенные и невалидные инциденты вызывающий переписывает по одному
+        через rewrite(); при ошибке API возвращаются только попадания в кэш.
+        """
+        results: dict[str, RewriteResult] = {}
+        pending: list[Incident] = []
+        for incident in incidents:
+            cached = self._cached_result(self._cache_key(incident), incident) if self._cache is not None else None
+            if cached is not None:
+                results[incident.incident_id] = cached
+            else:
+                pending.append(incident)
+
+        if len(pending) < 2 or not self._api_key or not self._breaker.allow():
+            return results
+
+        # В пакете один общий префикс с обоими примерами, сжимаются только сводки
+        batch_items = pending
+        if self._prompt_builder is not None:
+            batch_items = [self._prompt_builder.build(incident).incident for incident in pending]
+        payload = {
+            "model": self._model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": PROMPT_PREFIX},
+                {"role": "user", "content": build_batch_prompt(batch_items)},
+            ],
+            "temperature": TEMPERATURE,
+            "response_format": {"type": "json_object"},
+            "max_tokens": BATCH_OUTPUT_TOKENS_PER_ITEM * len(pending),
+        }
+        endpoint = f"{self._base_url}/chat/completions"
+        ids = [incident.incident_id for incident in pending]
+
+        started = time.perf_counter()
+        try:
+            completion = self._complete(endpoint, self._headers(), payload, timeout=40.0 + 20.0 * len(pending))
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 402:
+                self._breaker.trip("402 Payment Required")
+            else:
+                self._breaker.record_failure(f"status={exc.response.status_code}")
+            logger.warning(
+                "%s batch rewrite failed, rewriting one by one | size=%d details=%s",
+                self._provider_name, len(pending), self._extract_error_details(exc.response),
+            )
+            return results
+        except Exception as exc:  # noqa: BLE001
+            self._breaker.record_failure(type(exc).__name__)
+            logger.warning("%s batch rewrite failed, rewriting one by one | size=%d error=%s",
+                           self._provider_name, len(pending), exc)
+            return results
+
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        # Предохранитель и p90 для хеджа считают задержку одного инцидента
+        per_item_ms = latency_ms / len(pending)
+        self._breaker.record_success(per_item_ms)
+        self._usage.record(",".join(ids), completion.usage, latency_ms, 0.0)
+
+        posts = self._parse_batch_posts(completion.text)
+        per_item_tokens = completion.usage.total_tokens // len(pending)
+        accepted = 0
+        for incident in pending:
+            text = posts.get(incident.incident_id)
+            if not isinstance(text, str):
+                logger.info("batch rewrite missing | id=%s", incident.incident_id)
+                continue
+            repaired = self._repair(incident, text.strip())
+            text = repaired.text
+            valid, reason = validate_rewrite(text)
+            if not valid:
+                logger.info("batch rewrite rejected | id=%s reason=%s", incident.incident_id, reason)
+                continue
+            if self._cache is not None:
+                self._cache.put(
+                    self._cache_key(incident), self._provider_name, self._model, text, per_item_ms, per_item_tokens,
+                )
+            results[incident.incident_id] = RewriteResult(
+                text=text,
+                is_fallback=False,
+                provider=self._provider_name,
+                latency_ms=per_item_ms,
+                tokens=per_item_tokens,
+                repairs=repaired.fixes,
+            )
+            accepted += 1
+        logger.info(
+            "%s batch rewrite | size=%d accepted=%d latency_ms=%.0f tokens=%d",
+            self._provider_name, len(pending), accepted, latency_ms, completion.usage.total_tokens,
+        )
+        return results
+
+    @staticmethod
+    def _repair(incident: Incident, text: str) -> RepairResult:
+        # Почти валидный ответ чиним локально: повторный запрос к API дороже
+        repaired = repair_rewrite(text)
+        if repaired.fixes:
+            logger.info("rewrite repaired | id=%s fixes=%s", incident.incident_id, ",".join(repaired.fixes))
+        return repaired
+
+    @staticmethod
+    def _parse_batch_posts(content: str) -> dict[str, Any]:
+        try:
+            data = json.loads(content)
+        except ValueError:
+            logger.warning("batch rewrite returned invalid JSON")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        posts = data.get("posts", data)
+        return posts if isinstance(posts, dict) else {}
+
+    def _prompt_parts(self, incident: Incident) -> tuple[str, str, str]:
+        """
+        (префикс, данные инцидента, «оставлено/всего» предложений нарратива).
+        Без PromptBuilder — общий префикс с обоими примерами и полная сводка.
+        """
+        render = build_structured_prompt if self._structured else build_incident_prompt
+        if self._prompt_builder is None:
+            return PROMPT_PREFIX, render(incident), "full"
+        built = self._prompt_builder.build(incident, render)
+        return built.prefix, render(built.incident), f"{built.sentences_kept}/{built.sentences_total}"
+
+    def _structured_response_format(self) -> dict[str, Any]:
+        # DeepSeek понимает только json_object (схема описана в промпте),
+        # OpenRouter передаёт json_schema моделям, которые её поддерживают
+        if self._provider_name == "openrouter":
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": "incident_post", "strict": True, "schema": POST_SCHEMA},
+            }
+        return {"type": "json_object"}
+
+    def _cache_key(self, incident: Incident) -> str:
+        prefix, incident_prompt, _ = self._prompt_parts(incident)
+        return self._prompt_cache_key(prefix, incident_prompt)
+
+    def _prompt_cache_key(self, prefix: str, incident_prompt: str) -> str:
+        # Ключ совпадает с прежним build_user_prompt: префикс + данные через пустую строку
+        return rewrite_cache_key(
+            self._provider_name, self._model, SYSTEM_PROMPT, f"{prefix}\n\n{incident_prompt}", TEMPERATURE,
+        )
+
+    def _headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self._api_key}",
+            "Content-Type": "application/json",
+            **self._extra_headers,
+        }
+
+    def _cached_result(self, cache_key: str, incident: Incident) -> RewriteResult | None:
+        cached = self._cache.get(cache_key)
+        if cached is None:
+            return None
+        # Кэш не обходит проверку: невалидный ответ выбрасываем и спрашиваем API заново
+        valid, reason = validate_rewrite(cached.text)
+        if not valid:
+            logger.info("cached rewrite rejected | id=%s reason=%s", incident.incident_id, reason)
+            self._cache.discard(cache_key)
+            return None
+        logger.info("rewrite cache hit | id=%s saved_ms=%.0f", incident.incident_id, cached.latency_ms)
+        return RewriteResult(
+            text=cached.text,
+            is_fallback=False,
+            provider=self._provider_name,
+            cached=True,
+            latency_ms=cached.latency_ms,
+            tokens=cached.tokens,
+        )
+
+    def _complete(
+        self, endpoint: str, headers: dict[str, str], payload: dict[str, Any], timeout: float = 40.0,
+    ) -> _Completion:
+        with self._client(timeout) as client:
+            response = client.post(endpoint, headers=headers, json=payload)
+            response.raise_for_status()
+            data = response.json()
+        text = data["choices"][0]["message"]["content"].strip()
+        return _Completion(text=text, usage=parse_usage(data.get("usage")))
+
+    def _complete_streaming(
+        self,
+        endpoint: str,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+        started: float,
+        cancel: threading.Event | None = None,
+    ) -> _Completion:
+        """
+        Собирает ответ из SSE-потока, обрывая его при превышении
+        stream_abort_words слов или общего дедлайна. read-таймаут ограничивает паузу между чанками,
+        в том числе ожидание первого токена.
+        """
+        payload = {**payload, "stream": True, "stream_options": {"include_usage": True}}
+        timeout = httpx.Timeout(40.0, read=self._stream_read_timeout)
+        parts: list[str] = []
+        counter = WordCounter()
+        usage: dict[str, Any] = {}
+        chunks = 0
+        first_token_at = 0.0
+
+        with self._client() as client, client.stream(
+            "POST", endpoint, headers=headers, json=payload, timeout=timeout,
+        ) as response:
+            if response.status_code >= 400:
+                response.read()  # тело нужно _extract_error_details
+            response.raise_for_status()
+            for event in iter_sse_data(response.iter_lines()):
+                if cancel is not None and cancel.is_set():
+                    raise StreamCancelled()
+                usage = event.get("usage") or usage
+                for choice in event.get("choices") or ():
+                    delta = (choice.get("delta") or {}).get("content") or ""
+                    if not delta:
+                        continue
+                    if not first_token_at:
+                        first_token_at = time.perf_counter()
+                        self.latency.record("ttft", first_token_at - started)
+                    chunks += 1
+                    parts.append(delta)
+                    if counter.feed(delta) > self._stream_abort_words:
+                        self._stream_stats.aborted()
+                        raise StreamAborted(f"runaway (>{self._stream_abort_words} words)", provider_fault=False)
+                if time.perf_counter() - started > self._stream_deadline:
+                    self._stream_stats.aborted()
+                    raise StreamAborted(f"deadline {self._stream_deadline:.0f}s", provider_fault=True)
+
+        finished = time.perf_counter()
+        # Без usage в последнем чанке число токенов оцениваем числом дельт
+        token_usage = parse_usage(usage) if usage else TokenUsage(completion_tokens=chunks)
+        self._stream_stats.completed(
+            token_usage.completion_tokens or chunks, finished - first_token_at if first_token_at else 0.0,
+        )
+        return _Completion(
+            text="".join(parts).strip(),
+            usage=token_usage,
+            ttft_ms=(first_token_at - started) * 1000.0 if first_token_at else 0.0,
+        )
+
+    def log_stats(self) -> None:
+        self.latency.log(logger, f"llm {self._provider_name}")
+        self._usage.log()
+        s = self._stream_stats.snapshot()
+        if s.streams:
+            logger.info(
+                "llm stream | provider=%s streams=%d aborted=%d tokens_per_s=%.1f",
+                self._provider_name, s.streams, s.aborted, s.tokens_per_second,
+            )
+
+    def _client(self, timeout: float = 40.0) -> Any:
+        if self._transport is not None:
+            return self._transport.session(timeout=timeout)
+        return httpx.Client(timeout=timeout)
 
     @staticmethod
     def _extract_error_details(response: httpx.Response) -> str:
@@ -98,6 +501,9 @@ class DeepSeekClient:
             pass
         return response.text.strip() or f"status={response.status_code}"
 
+    def _fallback_result(self, incident: Incident) -> RewriteResult:
+        return RewriteResult(text=self._fallback(incident), is_fallback=True, provider=self._provider_name)
+
     def _fallback(self, incident: Incident) -> str:
         aircraft = incident.aircraft or "Воздушное судно"
         location = incident.location or "место уточняется"
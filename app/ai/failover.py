@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+"""
+Переключение и хеджирование между LLM-провайдерами.
+
+FailoverRewriter опрашивает клиентов в порядке приоритета: если основной
+провайдер вернул fallback (ошибка API или разомкнутая цепь предохранителя),
+тот же инцидент отправляется следующему. Fallback-текст возвращается только
+если не ответил ни один провайдер.
+
+С hedge=True основной провайдер получает фору: если он не ответил за p90
+своих прошлых ответов (до накопления статистики — hedge_delay_seconds),
+тот же промпт уходит второму. Статистика копится между циклами опроса:
+FailoverRewriter создаётся один раз в run_forever. Побеждает первый ответ, прошедший
+validate_rewrite, запрос проигравшего отменяется. Хедж-гонка стоит лишних
+токенов, поэтому доля хеджей и победы по провайдерам пишутся в лог.
+"""
+
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from app.ai.deepseek_client import DeepSeekClient, RewriteResult
+from app.ai.validator import validate_rewrite
+from app.domain.models import Incident
+
+logger = logging.getLogger(__name__)
+
+HEDGE_MIN_SAMPLES = 5  # сколько ответов основного нужно, чтобы доверять его p90
+
+
+class FailoverRewriter:
+    def __init__(
+        self,
+        clients: list[DeepSeekClient],
+        hedge: bool = False,
+        hedge_delay_seconds: float = 10.0,
+    ) -> None:
+        if not clients:
+            raise ValueError("FailoverRewriter needs at least one client")
+        self._clients = clients
+        self._hedge = hedge and len(clients) > 1
+        self._hedge_delay = max(0.0, hedge_delay_seconds)
+        self._requests = 0
+        self._hedged = 0
+        self._wins: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def is_api_rewrite_available(self) -> bool:
+        return any(client.is_api_rewrite_available() for client in self._clients)
+
+    def rewrite_incident(self, incident: Incident) -> str:
+        return self.rewrite(incident).text
+
+    def log_stats(self) -> None:
+        for client in self._clients:
+            client.log_stats()
+        if not self._hedge:
+            return
+        with self._lock:
+            requests, hedged, wins = self._requests, self._hedged, dict(self._wins)
+        logger.info(
+            "llm hedge | requests=%d hedged=%d hedge_rate=%.0f%% wins=%s delay=%.1fs",
+            requests,
+            hedged,
+            100.0 * hedged / requests if requests else 0.0,
+            ",".join(f"{name}:{count}" for name, count in sorted(wins.items())) or "-",
+            self.hedge_delay(),
+        )
+
+    def hedge_delay(self) -> float:
+        """Фора основному провайдеру: p90 его ответов, пока их мало — hedge_delay_seconds."""
+        summary = self._clients[0].latency.summary("completion")
+        if summary is None or summary.count < HEDGE_MIN_SAMPLES:
+            return self._hedge_delay
+        return summary.p90_ms / 1000.0
+
+    def rewrite(self, incident: Incident) -> RewriteResult:
+        if self._hedge and self._clients[0].is_api_rewrite_available():
+            return self._rewrite_hedged(incident)
+        primary = self._clients[0].rewrite(incident)
+        if not primary.is_fallback:
+            return primary
+        return self._failover(incident, primary, self._clients[1:])
+
+    def rewrite_batch(self, incidents: list[Incident]) -> dict[str, RewriteResult]:
+        """Пакет уходит основному провайдеру; непереписанное добирается через rewrite() с переключением."""
+        return self._clients[0].rewrite_batch(incidents)
+
+    def _failover(self, incident: Incident, primary: RewriteResult, clients: list[DeepSeekClient]) -> RewriteResult:
+        for client in clients:
+            result = client.rewrite(incident)
+            if not result.is_fallback:
+                logger.info(
+                    "llm failover | id=%s %s -> %s",
+                    incident.incident_id, primary.provider, client.provider_name,
+                )
+                return result
+        return primary
+
+    def _rewrite_hedged(self, incident: Incident) -> RewriteResult:
+        primary_client, standby_client = self._clients[0], self._clients[1]
+        cancels = {primary_client.provider_name: threading.Event(), standby_client.provider_name: threading.Event()}
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-hedge")
+        try:
+            primary_future = pool.submit(primary_client.rewrite, incident, cancels[primary_client.provider_name])
+            done, _ = wait([primary_future], timeout=self.hedge_delay())
+            if done:
+                result = primary_future.result()
+                self._count(hedged=False, winner=None if result.is_fallback else result.provider)
+                if result.is_fallback:
+                    return self._failover(incident, result, self._clients[1:])
+                return result
+
+            logger.info(
+                "llm hedge | id=%s %s slow, asking %s",
+                incident.incident_id, primary_client.provider_name, standby_client.provider_name,
+            )
+            standby_future = pool.submit(standby_client.rewrite, incident, cancels[standby_client.provider_name])
+            winner = self._race([primary_future, standby_future])
+        finally:
+            pool.shutdown(wait=False)
+
+        for name, event in cancels.items():
+            if winner is None or name != winner.provider:
+                event.set()
+        if winner is None:
+            # Валидного ответа нет: отдаём ответ API, если он был, иначе fallback основного
+            results = [primary_future.result(), standby_future.result()]
+            winner = next((r for r in results if not r.is_fallback), results[0])
+            self._count(hedged=True, winner=None)
+        else:
+            self._count(hedged=True, winner=winner.provider)
+        return winner
+
+    @staticmethod
+    def _race(futures: list[Future]) -> RewriteResult | None:
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if not result.is_fallback and validate_rewrite(result.text)[0]:
+                    return result
+        return None
+
+    def _count(self, hedged: bool, winner: str | None) -> None:
+        with self._lock:
+            self._requests += 1
+            self._hedged += int(hedged)
+            if winner:
+                self._wins[winner] = self._wins.get(winner, 0) + 1
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+"""
+Структурированный ответ LLM и локальная сборка поста.
+
+В режиме LLM_STRUCTURED_OUTPUT модель возвращает не готовый текст, а JSON
+с полями заголовка, подробностей, пострадавших и хештегов региона. Пост по
+шаблону из PROMPT_PREFIX собирает render_post: эмодзи, порядок блоков и
+обязательные хештеги ставятся детерминированно, и эти проверки
+validate_rewrite не могут не пройти.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.ai.validator import REQUIRED_HASHTAGS
+
+POST_SCHEMA: dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "headline": {
+            "type": "string",
+            "description": "Заголовок: тип/модель ВС + суть события + место, без эмодзи и кавычек",
+        },
+        "details": {
+            "type": "string",
+            "description": "Блок «Подробности»: дата, борт/рейс, маршрут, ход событий, 2-3 предложения",
+        },
+        "casualties": {
+            "type": "string",
+            "description": "Погибшие и раненые; пустая строка, если никто не пострадал или данных нет",
+        },
+        "region_tags": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Хештеги страны/региона на русском, слитно, без #: Бразилия, США",
+        },
+        "extra_tags": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Другие релевантные хештеги без #",
+        },
+    },
+    "required": ["headline", "details", "casualties", "region_tags", "extra_tags"],
+    "additionalProperties": False,
+}
+
+_TAG_JUNK = re.compile(r"[\s\-–—_.,#]+")
+
+
+@dataclass(frozen=True)
+class StructuredPost:
+    headline: str
+    details: str
+    casualties: str = ""
+    region_tags: list[str] = field(default_factory=list)
+    extra_tags: list[str] = field(default_factory=list)
+
+
+def _tags(value: Any) -> list[str]:
+    if not isinstance(value, list):
+        return []
+    return [item for item in value if isinstance(item, str)]
+
+
+def parse_structured_post(content: str) -> StructuredPost | None:
+    """StructuredPost из JSON-ответа модели; None, если JSON битый или нет заголовка/подробностей."""
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    headline = data.get("headline")
+    details = data.get("details")
+    if not isinstance(headline, str) or not isinstance(details, str) or not headline.strip() or not details.strip():
+        return None
+    casualties = data.get("casualties")
+    return StructuredPost(
+        headline=headline,
+        details=details,
+        casualties=casualties if isinstance(casualties, str) else "",
+        region_tags=_tags(data.get("region_tags")),
+        extra_tags=_tags(data.get("extra_tags")),
+    )
+
+
+def _hashtag(tag: str) -> str:
+    body = _TAG_JUNK.sub("", tag)
+    return f"#{body}" if body else ""
+
+
+def _one_line(text: str) -> str:
+    return " ".join(text.split())
+
+
+def render_post(post: StructuredPost) -> str:
+    """Пост по шаблону: ✈️ заголовок, 📍 подробности, ⚠️ пострадавшие (если есть), хештеги."""
+    headline = _one_line(post.headline).lstrip("✈️ ").strip().strip('"«»')
+    details = _one_line(post.details)
+    if details.lower().startswith("подробности:"):
+        details = details[len("подробности:"):].lstrip()
+    blocks = [f"✈️ {headline}", f"📍 Подробности: {details}"]
+
+    casualties = _one_line(post.casualties)
+    if casualties.lower().startswith("пострадавшие:"):
+        casualties = casualties[len("пострадавшие:"):].lstrip()
+    if casualties:
+        blocks.append(f"⚠️ Пострадавшие: {casualties}")
+
+    # Порядок как в шаблоне: #авиация #происшествие #<регион> #небонаграни #авиабезопасность [+ другие]
+    head, tail = list(REQUIRED_HASHTAGS[:2]), list(REQUIRED_HASHTAGS[2:])
+    region = [_hashtag(tag) for tag in post.region_tags]
+    extra = [_hashtag(tag) for tag in post.extra_tags]
+    tags: list[str] = []
+    for tag in head + region + tail + extra:
+        if tag and tag.lower() not in {t.lower() for t in tags}:
+            tags.append(tag)
+    blocks.append(" ".join(tags))
+    return "\n\n".join(blocks)
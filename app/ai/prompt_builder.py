@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+"""
+Сборка промпта под бюджет токенов.
+
+_parse_incident_detail кладёт в summary нарратив ASN (или до пяти абзацев
+страницы) и строки фактов, а build_user_prompt вставляет всё это целиком
+вместе с двумя длинными примерами. PromptBuilder:
+
+- выбирает один пример — с пострадавшими или без, по данным инцидента;
+- делит нарратив на предложения, убирает повторы и предложения, которые
+  лишь пересказывают факты из таблицы (тип ВС, оператор, место, дата...);
+- оставляет самые содержательные предложения, пока промпт укладывается
+  в token_budget (оценка estimate_tokens), в исходном порядке.
+
+Строки фактов (фаза, аэропорты, погибшие) не сокращаются.
+"""
+
+import dataclasses
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+from app.ai.prompt_templates import (
+    PROMPT_PREFIX_WITH_CASUALTIES,
+    PROMPT_PREFIX_WITHOUT_CASUALTIES,
+    SYSTEM_PROMPT,
+    build_incident_prompt,
+)
+from app.ai.usage import estimate_tokens
+from app.domain.models import Incident
+
+NARRATIVE_LABEL = "Нарратив:"
+# Строки фактов из IncidentDetail.summary — их не трогаем
+_FACT_LABELS = ("Фаза полёта:", "Характер полёта:", "Аэропорт вылета:", "Аэропорт назначения:", "Погибших:")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d")
+_FATALITIES = re.compile(r"Погибших:\s*(\d+)")
+
+# Слова, по которым предложение описывает само событие, а не обстановку
+_EVENT_WORDS = (
+    "emergency", "mayday", "engine", "fire", "smoke", "crash", "collid", "struck", "strike", "runway",
+    "excursion", "overran", "gear", "returned", "diverted", "evacuat", "injur", "fatal", "killed",
+    "damage", "stall", "ditch", "bird", "fuel", "fail", "lost", "tyre", "tire", "hydraulic",
+    "depressur", "turbulence", "abort", "rejected",
+)
+_CASUALTY_WORDS = ("injur", "killed", "fatal", "died", "dead", "hospital", "ранен", "погиб", "травм")
+_CASUALTY = re.compile(r"\b(?:" + "|".join(_CASUALTY_WORDS) + ")", re.IGNORECASE)
+# «No one was injured», «without injuries», «никто не пострадал» — не пострадавшие
+_NEGATION = re.compile(r"\b(?:no|not|none|nobody|neither|nor|never|without|никто|не|нет|без|ни)\b|n't", re.IGNORECASE)
+# Отрицание действует до границы части предложения: «nobody was hurt, but a worker died»
+_CLAUSE_BREAK = re.compile(r"[,;:]|\b(?:but|however|although|но|однако)\b", re.IGNORECASE)
+
+# Служебные слова и обороты ASN, по которым не судят о новизне предложения
+_STOPWORDS = frozenset({
+    "the", "and", "was", "were", "with", "from", "that", "this", "which", "for", "while", "near",
+    "operated", "involved", "incident", "accident", "occurrence", "flight", "aircraft", "airplane",
+})
+
+# Доля слов предложения, уже известных из фактов, при которой оно считается пересказом таблицы
+_REDUNDANT_SHARE = 0.8
+
+
+@dataclass(frozen=True)
+class BuiltPrompt:
+    prefix: str
+    incident: Incident          # копия инцидента со сжатой сводкой
+    estimated_tokens: int       # системный промпт + префикс + данные инцидента
+    sentences_total: int
+    sentences_kept: int
+
+
+def has_casualties(incident: Incident) -> bool:
+    """
+    Погибшие — по полю fatalities или строке «Погибших: N»; раненые — по словам
+    нарратива (строки фактов не смотрим: «Погибших: 0» есть почти на каждой странице).
+    """
+    if incident.fatalities.strip().isdigit() and int(incident.fatalities) > 0:
+        return True
+    match = _FATALITIES.search(incident.summary)
+    if match and int(match.group(1)) > 0:
+        return True
+    narrative, _, _ = _split_summary(incident.summary)
+    return any(_mentions_casualties(sentence) for sentence in _SENTENCE_END.split(narrative))
+
+
+def _mentions_casualties(sentence: str) -> bool:
+    """Слово о пострадавших без отрицания перед ним в той же части предложения."""
+    for match in _CASUALTY.finditer(sentence):
+        clause_start = max((b.end() for b in _CLAUSE_BREAK.finditer(sentence, 0, match.start())), default=0)
+        if not _NEGATION.search(sentence, clause_start, match.start()):
+            return True
+    return False
+
+
+def _split_summary(summary: str) -> tuple[str, list[str], bool]:
+    """(нарратив, строки фактов, была ли метка «Нарратив:»)."""
+    narrative: list[str] = []
+    facts: list[str] = []
+    labelled = False
+    for line in summary.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith(_FACT_LABELS):
+            facts.append(stripped)
+        elif stripped.startswith(NARRATIVE_LABEL):
+            labelled = True
+            narrative.append(stripped[len(NARRATIVE_LABEL):].strip())
+        else:
+            narrative.append(stripped)
+    return " ".join(narrative), facts, labelled
+
+
+def _words(text: str) -> set[str]:
+    return {
+        word for word in _WORD.findall(text.lower())
+        if (len(word) > 2 or word.isdigit()) and word not in _STOPWORDS
+    }
+
+
+class PromptBuilder:
+    def __init__(self, token_budget: int) -> None:
+        self._token_budget = max(1, token_budget)
+
+    def build(
+        self,
+        incident: Incident,
+        render: Callable[[Incident], str] = build_incident_prompt,
+    ) -> BuiltPrompt:
+        """render — переменная часть промпта (build_incident_prompt или её вариант)."""
+        prefix = PROMPT_PREFIX_WITH_CASUALTIES if has_casualties(incident) else PROMPT_PREFIX_WITHOUT_CASUALTIES
+        narrative, facts, labelled = _split_summary(incident.summary)
+        sentences = self._candidate_sentences(narrative, incident, facts)
+
+        base = dataclasses.replace(incident, summary=self._summary([], facts, labelled))
+        fixed_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prefix) + estimate_tokens(render(base))
+        kept = self._select(sentences, self._token_budget - fixed_tokens - estimate_tokens(NARRATIVE_LABEL))
+
+        compacted = dataclasses.replace(incident, summary=self._summary(kept, facts, labelled))
+        return BuiltPrompt(
+            prefix=prefix,
+            incident=compacted,
+            estimated_tokens=estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prefix)
+            + estimate_tokens(render(compacted)),
+            sentences_total=len(_SENTENCE_END.split(narrative)) if narrative else 0,
+            sentences_kept=len(kept),
+        )
+
+    @staticmethod
+    def _candidate_sentences(narrative: str, incident: Incident, facts: list[str]) -> list[str]:
+        """Предложения нарратива без повторов и без пересказа таблицы фактов."""
+        known = _words(" ".join([
+            incident.aircraft, incident.operator, incident.location, incident.date_utc,
+            incident.registration, incident.persons_onboard, incident.title, *facts,
+        ]))
+        seen: set[str] = set()
+        result: list[str] = []
+        for sentence in _SENTENCE_END.split(narrative):
+            sentence = sentence.strip()
+            key = " ".join(_WORD.findall(sentence.lower()))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            words = _words(sentence)
+            if words and len(words & known) / len(words) >= _REDUNDANT_SHARE:
+                continue
+            result.append(sentence)
+        return result
+
+    @staticmethod
+    def _score(index: int, sentence: str) -> float:
+        lowered = sentence.lower()
+        score = 1.0 / (1.0 + 0.15 * index)  # начало нарратива обычно самое важное
+        score += 0.5 * min(3, sum(word in lowered for word in _EVENT_WORDS))
+        if _NUMBER.search(sentence):
+            score += 0.2  # время, высота, число людей
+        return score
+
+    def _select(self, sentences: list[str], budget: int) -> list[str]:
+        ranked = sorted(range(len(sentences)), key=lambda i: self._score(i, sentences[i]), reverse=True)
+        chosen: set[int] = set()
+        used = 0
+        for index in ranked:
+            cost = estimate_tokens(sentences[index] + " ")
+            if used + cost > budget:
+                continue
+            chosen.add(index)
+            used += cost
+        if not chosen and ranked:
+            chosen.add(ranked[0])  # хотя бы одно предложение о том, что произошло
+        return [sentences[i] for i in sorted(chosen)]
+
+    @staticmethod
+    def _summary(sentences: list[str], facts: list[str], labelled: bool) -> str:
+        parts: list[str] = []
+        if sentences:
+            text = " ".join(sentences)
+            parts.append(f"{NARRATIVE_LABEL} {text}" if labelled else text)
+        parts.extend(facts)
+        return "\n".join(parts)
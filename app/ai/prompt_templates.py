@@ -15,8 +15,7 @@ SYSTEM_PROMPT = """Ты опытный авиационный редактор T
 """
 
 
-def build_user_prompt(incident: Incident) -> str:
-    return f"""Подготовь пост для Telegram-канала об авиаинциденте строго по шаблону ниже.
+PROMPT_TEMPLATE = """Подготовь пост для Telegram-канала об авиаинциденте строго по шаблону ниже.
 
 ═══════════════════════════════
 ШАБЛОН (соблюдать структуру точно):
@@ -37,37 +36,95 @@ def build_user_prompt(incident: Incident) -> str:
 4. Если какие-то данные отсутствуют (фаза полёта, регистрация, аэропорт и т.д.) — просто не упоминай их. Никаких фраз об отсутствии данных.
 5. Хештег страны/региона — на русском, слитно, без пробелов: #Бразилия, #США, #Теннесси, #БуркинаФасо.
 6. Весь пост — минимум 60 слов, максимум 200 слов.
-7. Не используй Markdown-форматирование (никаких **жирных** или _курсивов_).
-
-═══════════════════════════════
-ПРИМЕРЫ ГОТОВЫХ ПОСТОВ:
+7. Не используй Markdown-форматирование (никаких **жирных** или _курсивов_)."""
 
-Пример 1 (есть пострадавшие — блок ⚠️ включён):
-✈️ Легкомоторный самолет разбился и сгорел при взлете в Бразилии
+EXAMPLE_WITH_CASUALTIES = """✈️ Легкомоторный самолет разбился и сгорел при взлете в Бразилии
 
 📍 Подробности: 24 февраля 2026 года, в 17:32, легкомоторный самолет потерпел катастрофу вскоре после взлета из аэропорта Формоза, Бразилия. У воздушного судна возникли проблемы, приведшие к падению и последующему возгоранию.
 
 ⚠️ Пострадавшие: На борту находился один пилот. Он получил травмы, но успел самостоятельно покинуть кабину до начала пожара и был доставлен в больницу.
 
-#авиация #происшествие #Бразилия #небонаграни #авиабезопасность
+#авиация #происшествие #Бразилия #небонаграни #авиабезопасность"""
 
-Пример 2 (никто не пострадал — блок ⚠️ отсутствует):
-✈️ LATAM A320 прервал взлет в Боготе из-за вертолета на полосе
+EXAMPLE_WITHOUT_CASUALTIES = """✈️ LATAM A320 прервал взлет в Боготе из-за вертолета на полосе
 
 📍 Подробности: 20 февраля 2026 года воздушное судно Airbus A320-200 (борт CC-COF) авиакомпании LATAM Chile, выполнявшее рейс LA-4278 из Боготы на остров Сан-Андрес, начало разбег по ВПП 14R. На скорости около 160 узлов экипаж заметил военный вертолет, пересекавший полосу, и принял решение о прекращении взлета. Из-за экстренного торможения перегрелись тормоза и лопнули несколько шин. На борту находились 157 пассажиров, никто не пострадал.
 
-#авиация #происшествие #Колумбия #Богота #небонаграни #авиабезопасность
+#авиация #происшествие #Колумбия #Богота #небонаграни #авиабезопасность"""
 
-═══════════════════════════════
-ДАННЫЕ ДЛЯ ПОСТА:
+_SEPARATOR = "═══════════════════════════════"
+
+# Неизменная часть пользовательского промпта: шаблон, правила и примеры.
+# Провайдеры кэшируют совпадающий префикс запроса, поэтому здесь не должно
+# быть ничего, что зависит от инцидента, — даже пробела.
+PROMPT_PREFIX = (
+    f"{PROMPT_TEMPLATE}\n\n{_SEPARATOR}\nПРИМЕРЫ ГОТОВЫХ ПОСТОВ:\n\n"
+    f"Пример 1 (есть пострадавшие — блок ⚠️ включён):\n{EXAMPLE_WITH_CASUALTIES}\n\n"
+    f"Пример 2 (никто не пострадал — блок ⚠️ отсутствует):\n{EXAMPLE_WITHOUT_CASUALTIES}"
+)
+
+# Префиксы с одним примером — под инцидент с пострадавшими и без; оба так же неизменны
+PROMPT_PREFIX_WITH_CASUALTIES = (
+    f"{PROMPT_TEMPLATE}\n\n{_SEPARATOR}\nПРИМЕР ГОТОВОГО ПОСТА (есть пострадавшие — блок ⚠️ включён):\n\n"
+    f"{EXAMPLE_WITH_CASUALTIES}"
+)
+PROMPT_PREFIX_WITHOUT_CASUALTIES = (
+    f"{PROMPT_TEMPLATE}\n\n{_SEPARATOR}\nПРИМЕР ГОТОВОГО ПОСТА (никто не пострадал — блок ⚠️ отсутствует):\n\n"
+    f"{EXAMPLE_WITHOUT_CASUALTIES}"
+)
 
-Тип события: {incident.event_type}
+
+def build_incident_data(incident: Incident) -> str:
+    return f"""Тип события: {incident.event_type}
 Дата: {incident.date_utc}
 Локация: {incident.location}
 Воздушное судно: {incident.aircraft}
 Оператор: {incident.operator or 'нет данных'}
 Людей на борту: {incident.persons_onboard or 'нет данных'}
-Сводка: {incident.summary}
+Сводка: {incident.summary}"""
+
+
+def build_incident_prompt(incident: Incident) -> str:
+    """Переменная часть промпта — данные инцидента; идёт после PROMPT_PREFIX."""
+    return f"""═══════════════════════════════
+ДАННЫЕ ДЛЯ ПОСТА:
+
+{build_incident_data(incident)}
 
 Напиши пост строго по шаблону, используя только факты из раздела "ДАННЫЕ ДЛЯ ПОСТА".
 """.strip()
+
+
+def build_structured_prompt(incident: Incident) -> str:
+    """Переменная часть промпта в режиме структурированного ответа: данные и формат JSON."""
+    return f"""═══════════════════════════════
+ДАННЫЕ ДЛЯ ПОСТА:
+
+{build_incident_data(incident)}
+
+Подготовь пост по шаблону, используя только факты из раздела "ДАННЫЕ ДЛЯ ПОСТА", но верни не готовый текст,
+а только JSON-объект с полями блоков шаблона (эмодзи, названия блоков и обязательные хештеги добавятся сами):
+{{"headline": "<заголовок после ✈️>", "details": "<текст блока Подробности>",
+"casualties": "<текст блока Пострадавшие или пустая строка>",
+"region_tags": ["<страна или регион на русском, слитно>"], "extra_tags": ["<другие хештеги>"]}}
+""".strip()
+
+
+def build_batch_prompt(incidents: list[Incident]) -> str:
+    """Переменная часть пакетного промпта: данные нескольких инцидентов и формат JSON-ответа."""
+    blocks = "\n\n".join(
+        f"--- incident_id: {incident.incident_id}\n{build_incident_data(incident)}" for incident in incidents
+    )
+    return f"""═══════════════════════════════
+ДАННЫЕ ДЛЯ ПОСТОВ ({len(incidents)} инцидентов):
+
+{blocks}
+
+Для КАЖДОГО инцидента напиши отдельный пост строго по шаблону, используя только его факты.
+Ответ — только JSON-объект без пояснений: {{"posts": {{"<incident_id>": "<текст поста>"}}}},
+по одному ключу на каждый incident_id из данных.
+""".strip()
+
+
+def build_user_prompt(incident: Incident) -> str:
+    return f"{PROMPT_PREFIX}\n\n{build_incident_prompt(incident)}"
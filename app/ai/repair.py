@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+"""
+Локальная починка почти валидных рерайтов.
+
+Часть отказов validate_rewrite исправляется без нового запроса к LLM:
+
+- нет обязательных хештегов — дописываем их в строку хештегов;
+- нет маркера ✈️ у заголовка или 📍 у блока «Подробности» — ставим;
+- Markdown, который Telegram (parse_mode=Markdown) не разбирает: **жирный**,
+  заголовки «## », зачёркивание, непарные * _ ` [ — из-за них sendMessage
+  отвечает «can't parse entities» и пост уходит вторым запросом без разметки;
+- чуть больше MAX_WORDS слов — убираем последние предложения самого
+  длинного блока, заголовок и хештеги не трогаем.
+
+Слишком короткий текст не дополняется: дописывать факты локально нечем.
+"""
+
+import re
+from dataclasses import dataclass
+
+from app.ai.validator import MAX_WORDS, MIN_WORDS, REQUIRED_EMOJIS, REQUIRED_HASHTAGS
+
+HEADLINE_MARKER, DETAILS_MARKER = REQUIRED_EMOJIS
+DETAILS_LABEL = "Подробности:"
+
+_DOUBLE_EMPHASIS = re.compile(r"(\*\*|__)(.+?)\1", re.DOTALL)
+_STRIKE = re.compile(r"~~(.+?)~~", re.DOTALL)
+_HEADING = re.compile(r"^[ \t]*#{1,6}[ \t]+", re.MULTILINE)
+_LINK = re.compile(r"\[[^\[\]\n]+\]\([^()\s]+\)")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+@dataclass(frozen=True)
+class RepairResult:
+    text: str
+    fixes: tuple[str, ...] = ()   # что исправлено: markdown, markers, hashtags, too_long
+
+
+def _strip_markdown(text: str) -> str:
+    text = _DOUBLE_EMPHASIS.sub(r"\2", text)
+    text = _STRIKE.sub(r"\1", text)
+    text = _HEADING.sub("", text)
+    # Непарная разметка ломает разбор всего сообщения — снимаем этот символ целиком
+    for char in ("*", "_", "`"):
+        if text.count(char) % 2:
+            text = text.replace(char, "")
+    if "[" in text or "]" in text:
+        text = _strip_stray_brackets(text)
+    return text
+
+
+def _strip_stray_brackets(text: str) -> str:
+    """Убирает [ и ] вне ссылок [текст](url): непарная скобка открывает ссылку, которой нет."""
+    parts: list[str] = []
+    last = 0
+    for match in _LINK.finditer(text):
+        parts.append(text[last:match.start()].replace("[", "").replace("]", ""))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(text[last:].replace("[", "").replace("]", ""))
+    return "".join(parts)
+
+
+def _is_tag_block(block: str) -> bool:
+    words = block.split()
+    # Строка хештегов, в которую модель могла дописать слово-другое без #
+    return bool(words) and 2 * sum(word.startswith("#") for word in words) >= len(words)
+
+
+def _fix_markers(blocks: list[str]) -> list[str]:
+    if HEADLINE_MARKER not in "\n\n".join(blocks):
+        # ✈ без вариационного селектора тоже встречается — заменяем, а не дублируем
+        blocks[0] = f"{HEADLINE_MARKER} {blocks[0].lstrip('✈').lstrip()}"
+    if DETAILS_MARKER not in "\n\n".join(blocks):
+        for index, block in enumerate(blocks[1:], start=1):
+            if block.lower().startswith(DETAILS_LABEL.lower()):
+                blocks[index] = f"{DETAILS_MARKER} {block}"
+                break
+        else:
+            if len(blocks) > 1 and not _is_tag_block(blocks[1]):
+                blocks[1] = f"{DETAILS_MARKER} {DETAILS_LABEL} {blocks[1]}"
+    return blocks
+
+
+def _fix_hashtags(blocks: list[str]) -> list[str]:
+    text = "\n\n".join(blocks)
+    missing = [tag for tag in REQUIRED_HASHTAGS if tag not in text]
+    if not missing:
+        return blocks
+    if len(blocks) > 1 and _is_tag_block(blocks[-1]):
+        blocks[-1] = " ".join([blocks[-1], *missing])
+    else:
+        blocks.append(" ".join(missing))
+    return blocks
+
+
+def _trim(blocks: list[str], max_words: int) -> list[str]:
+    excess = sum(len(block.split()) for block in blocks) - max_words
+    # Заголовок и хештеги не сокращаем; начинаем с самого длинного блока
+    body = [i for i in range(1, len(blocks)) if not _is_tag_block(blocks[i])]
+    for index in sorted(body, key=lambda i: len(blocks[i].split()), reverse=True):
+        if excess <= 0:
+            break
+        sentences = _SENTENCE_END.split(blocks[index])
+        while len(sentences) > 1 and excess > 0:
+            excess -= len(sentences.pop().split())
+        blocks[index] = " ".join(sentences)
+    return blocks
+
+
+def repair_rewrite(text: str, min_words: int = MIN_WORDS, max_words: int = MAX_WORDS) -> RepairResult:
+    """
+    Чинит то, что можно исправить локально; текст без проблем возвращается как есть.
+    В тексте короче min_words (порог validate_rewrite) снимается только Markdown:
+    маркеры и хештеги не сделают его валидным.
+    """
+    fixes: list[str] = []
+
+    cleaned = _strip_markdown(text)
+    if cleaned != text:
+        fixes.append("markdown")
+    if len(cleaned.split()) < min_words:
+        return RepairResult(text=cleaned, fixes=tuple(fixes))
+
+    blocks = [block.strip() for block in re.split(r"\n\s*\n", cleaned.strip()) if block.strip()]
+    if not blocks:
+        return RepairResult(text=text)
+
+    before = list(blocks)
+    blocks = _fix_markers(blocks)
+    if blocks != before:
+        fixes.append("markers")
+
+    before = list(blocks)
+    blocks = _fix_hashtags(blocks)
+    if blocks != before:
+        fixes.append("hashtags")
+
+    if sum(len(block.split()) for block in blocks) > max_words:
+        blocks = _trim(blocks, max_words)
+        fixes.append("too_long")
+
+    if not fixes:
+        return RepairResult(text=text)
+    return RepairResult(text="\n\n".join(blocks), fixes=tuple(fixes))
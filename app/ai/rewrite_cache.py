@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+"""
+Кэш ответов LLM, адресуемый содержимым запроса.
+
+Ключ — sha256 от (провайдер, модель, системный промпт, пользовательский
+промпт, temperature): тот же инцидент после ретрая, dry-run репетиции или
+деплоя даёт тот же ключ, а любая правка промпта или смена модели — новый.
+Записи живут в таблице rewrite_cache; вместе с текстом хранятся задержка
+и токены исходного вызова — это и есть экономия при попадании.
+
+Fallback-тексты сюда не попадают: кэшируются только ответы API, прошедшие
+validate_rewrite.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class RewriteCacheStore(Protocol):
+    """Хранилище ответов (реализуется IncidentRepository)."""
+
+    def get_cached_rewrite(self, cache_key: str) -> dict[str, Any] | None: ...
+
+    def save_cached_rewrite(
+        self,
+        cache_key: str,
+        provider: str,
+        model: str,
+        rewrite_text: str,
+        latency_ms: float,
+        tokens: int,
+        max_entries: int = 0,
+    ) -> None: ...
+
+    def delete_cached_rewrite(self, cache_key: str) -> None: ...
+
+
+def rewrite_cache_key(provider: str, model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+    payload = json.dumps([provider, model, system_prompt, user_prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedRewrite:
+    text: str
+    latency_ms: float
+    tokens: int
+
+
+class RewriteCache:
+    def __init__(self, store: RewriteCacheStore, ttl_seconds: float, max_entries: int) -> None:
+        self._store = store
+        self._ttl = max(0.0, ttl_seconds)
+        self._max_entries = max(0, max_entries)
+
+    def get(self, key: str) -> CachedRewrite | None:
+        try:
+            row = self._store.get_cached_rewrite(key)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("rewrite cache read failed: %s", exc)
+            return None
+        if row is None:
+            return None
+        if time.time() - float(row["created_at"]) >= self._ttl:
+            return None
+        return CachedRewrite(
+            text=row["rewrite_text"],
+            latency_ms=float(row["latency_ms"] or 0.0),
+            tokens=int(row["tokens"] or 0),
+        )
+
+    def put(self, key: str, provider: str, model: str, text: str, latency_ms: float, tokens: int) -> None:
+        try:
+            self._store.save_cached_rewrite(key, provider, model, text, latency_ms, tokens, self._max_entries)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("rewrite cache write failed: %s", exc)
+
+    def discard(self, key: str) -> None:
+        try:
+            self._store.delete_cached_rewrite(key)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("rewrite cache delete failed: %s", exc)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+"""
+Потоковые ответы chat/completions ("stream": true, Server-Sent Events).
+
+Без потока лимит слов проверялся только в validate_rewrite — после того как
+вся генерация уже оплачена ожиданием до 40 с. Здесь текст собирается по
+мере прихода дельт, и генерация обрывается, как только:
+
+- слов стало заметно больше MAX_WORDS (модель «разогналась», по умолчанию
+  порог — 2×MAX_WORDS; текст чуть длиннее лимита сокращает repair_rewrite);
+- истёк общий дедлайн запроса;
+- запрос отменён вызывающим (cancel-событие) — см. StreamCancelled.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+
+class StreamAborted(Exception):
+    """Генерация прервана. provider_fault — виноват провайдер (дедлайн), а не текст модели."""
+
+    def __init__(self, reason: str, provider_fault: bool) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.provider_fault = provider_fault
+
+
+class StreamCancelled(Exception):
+    """Запрос отменён вызывающим (например, проиграл хедж-гонку)."""
+
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[dict]:
+    """JSON из строк `data: ...`; комментарии (`: keep-alive`) пропускаются, `[DONE]` завершает поток."""
+    for line in lines:
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        if data:
+            yield json.loads(data)
+
+
+class WordCounter:
+    """Считает слова (как str.split) по кусочкам текста, не пересканируя уже полученное."""
+
+    def __init__(self) -> None:
+        self.words = 0
+        self._in_word = False
+
+    def feed(self, chunk: str) -> int:
+        for char in chunk:
+            if char.isspace():
+                self._in_word = False
+            elif not self._in_word:
+                self._in_word = True
+                self.words += 1
+        return self.words
+
+
+@dataclass
+class StreamStats:
+    streams: int = 0
+    aborted: int = 0
+    completion_tokens: int = 0
+    generation_seconds: float = 0.0  # от первого токена до конца потока
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.completion_tokens / self.generation_seconds if self.generation_seconds else 0.0
+
+
+class StreamStatsRecorder:
+    def __init__(self) -> None:
+        self._stats = StreamStats()
+        self._lock = threading.Lock()
+
+    def completed(self, completion_tokens: int, generation_seconds: float) -> None:
+        with self._lock:
+            self._stats.streams += 1
+            self._stats.completion_tokens += completion_tokens
+            self._stats.generation_seconds += generation_seconds
+
+    def aborted(self) -> None:
+        with self._lock:
+            self._stats.streams += 1
+            self._stats.aborted += 1
+
+    def snapshot(self) -> StreamStats:
+        with self._lock:
+            return StreamStats(**vars(self._stats))
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+"""
+Учёт токенов вызовов LLM.
+
+Провайдеры кэшируют совпадающий префикс промпта (context caching) и
+сообщают об этом в блоке usage, но по-разному:
+
+- DeepSeek: prompt_cache_hit_tokens / prompt_cache_miss_tokens;
+- OpenAI-совместимые (OpenRouter): prompt_tokens_details.cached_tokens.
+
+parse_usage сводит оба варианта к TokenUsage, estimate_tokens — оценка
+размера промпта до отправки. UsageLog копит суммы для
+строки в логе и пишет каждый вызов в таблицу llm_calls.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class LlmCallStore(Protocol):
+    """Хранилище вызовов (реализуется IncidentRepository)."""
+
+    def record_llm_call(
+        self,
+        provider: str,
+        model: str,
+        incident_id: str,
+        prompt_tokens: int,
+        cached_tokens: int,
+        completion_tokens: int,
+        latency_ms: float,
+        ttft_ms: float,
+    ) -> None: ...
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Грубая оценка числа токенов без токенизатора провайдера: ~3 символа на
+    токен — с запасом для кириллицы (латиница ближе к 4).
+    """
+    return len(text) // 3 + 1
+
+
+@dataclass(frozen=True)
+class TokenUsage:
+    prompt_tokens: int = 0
+    cached_tokens: int = 0       # часть prompt_tokens, взятая из кэша префикса провайдера
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_usage(usage: dict[str, Any] | None) -> TokenUsage:
+    usage = usage or {}
+    prompt = _int(usage.get("prompt_tokens"))
+    completion = _int(usage.get("completion_tokens"))
+    total = _int(usage.get("total_tokens"))
+    if not prompt and total > completion:
+        # Без prompt_tokens промпт восстанавливаем из total_tokens, чтобы сумма сошлась
+        prompt = total - completion
+    details = usage.get("prompt_tokens_details") or {}
+    cached = _int(usage.get("prompt_cache_hit_tokens")) or _int(details.get("cached_tokens"))
+    return TokenUsage(prompt_tokens=prompt, cached_tokens=min(cached, prompt), completion_tokens=completion)
+
+
+@dataclass
+class UsageTotals:
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+class UsageLog:
+    def __init__(self, provider: str, model: str, store: LlmCallStore | None = None) -> None:
+        self._provider = provider
+        self._model = model
+        self._store = store
+        self._totals = UsageTotals()
+        self._lock = threading.Lock()
+
+    def record(self, incident_id: str, usage: TokenUsage, latency_ms: float, ttft_ms: float) -> None:
+        with self._lock:
+            self._totals.calls += 1
+            self._totals.prompt_tokens += usage.prompt_tokens
+            self._totals.cached_tokens += usage.cached_tokens
+            self._totals.completion_tokens += usage.completion_tokens
+        if self._store is None:
+            return
+        try:
+            self._store.record_llm_call(
+                self._provider, self._model, incident_id, usage.prompt_tokens, usage.cached_tokens,
+                usage.completion_tokens, latency_ms, ttft_ms,
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("llm call record failed: %s", exc)
+
+    def totals(self) -> UsageTotals:
+        with self._lock:
+            return UsageTotals(**vars(self._totals))
+
+    def log(self) -> None:
+        t = self.totals()
+        if not t.calls:
+            return
+        logger.info(
+            "llm usage | provider=%s calls=%d prompt_tokens=%d cached_tokens=%d cache_hit=%.0f%% completion_tokens=%d",
+            self._provider, t.calls, t.prompt_tokens, t.cached_tokens, 100.0 * t.cache_hit_ratio,
+            t.completion_tokens,
+        )
@@ -3,13 +3,16 @@ from __future__ import annotations
 
 REQUIRED_HASHTAGS = ("#авиация", "#происшествие", "#небонаграни", "#авиабезопасность")
 REQUIRED_EMOJIS = ("✈️", "📍")  # ⚠️ опционален — только если есть пострадавшие
+MIN_WORDS = 60
+FALLBACK_MIN_WORDS = 40  # fallback-шаблон короче ответа модели
+MAX_WORDS = 350
 
 
-def validate_rewrite(text: str, min_words: int = 60) -> tuple[bool, str]:
+def validate_rewrite(text: str, min_words: int = MIN_WORDS) -> tuple[bool, str]:
     words = text.split()
     if len(words) < min_words:
         return False, f"too_short (got {len(words)}, need {min_words})"
-    if len(words) > 350:
+    if len(words) > MAX_WORDS:
         return False, f"too_long (got {len(words)})"
     if any(tag not in text for tag in REQUIRED_HASHTAGS):
         missing = [tag for tag in REQUIRED_HASHTAGS if tag not in text]
@@ -22,4 +25,4 @@ def validate_rewrite(text: str, min_words: int = 60) -> tuple[bool, str]:
 
 def validate_fallback(text: str) -> tuple[bool, str]:
     """Валидация для fallback-текста с мягким порогом."""
-    return validate_rewrite(text, min_words=40)
+    return validate_rewrite(text, min_words=FALLBACK_MIN_WORDS)
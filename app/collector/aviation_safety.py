@@ -1,32 +1,131 @@
 from __future__ import annotations
+
+import hashlib
 import logging
-import re
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Protocol
 
-from bs4 import BeautifulSoup
 import httpx
 
+from app.collector.detail_cache import CachedPage, DetailPageCache, canonical_url
+from app.collector.parsers import make_parser
+from app.collector.rate_limit import HostRateLimiter
+from app.domain.normalizer import build_incident_id
+from app.observability.metrics import LatencyTracker
+from app.transport.http import HttpTransport
+
 logger = logging.getLogger(__name__)
 
+# sequential — ленты по очереди до первой разобранной (прежнее поведение);
+# merge — все ленты параллельно, строки объединяются;
+# hedge — все ленты параллельно, побеждает первый хороший ответ
+FETCH_MODES = ("sequential", "merge", "hedge")
+
+
+class FeedStateStore(Protocol):
+    """Хранилище валидаторов условного GET (реализуется IncidentRepository)."""
+
+    def get_feed_state(self, feed_url: str) -> dict[str, str] | None: ...
+
+    def save_feed_state(
+        self,
+        feed_url: str,
+        etag: str,
+        last_modified: str,
+        body_hash: str,
+        high_water_mark: str = "",
+    ) -> None: ...
+
+
+@dataclass
+class SourceStats:
+    requests: int = 0
+    successes: int = 0
+    failures: int = 0
+    not_modified: int = 0
+    rows: int = 0
+
+
+@dataclass
+class _SourceResult:
+    rows: list[dict[str, str]] = field(default_factory=list)
+    not_modified: bool = False
+    state: tuple[str, str, str, str] = ("", "", "", "")
+
+
+class SourceDeadlineExceeded(TimeoutError):
+    """Лента не ответила целиком за source_deadline_seconds."""
+
+
+def _richness(row: dict[str, str]) -> int:
+    return sum(1 for value in row.values() if value)
+
+
+def _close_after(pool: ThreadPoolExecutor, stack: ExitStack) -> None:
+    pool.shutdown(wait=True)
+    stack.close()
+
 
 class AviationSafetyCollector:
-    def __init__(self, user_agent: str, feed_urls: list[str]) -> None:
+    def __init__(
+        self,
+        user_agent: str,
+        feed_urls: list[str],
+        rate_limiter: HostRateLimiter | None = None,
+        transport: HttpTransport | None = None,
+        feed_state: FeedStateStore | None = None,
+        parser_backend: str = "lxml",
+        fetch_mode: str = "sequential",
+        source_deadline_seconds: float = 20.0,
+        detail_cache: DetailPageCache | None = None,
+    ) -> None:
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"unknown ASN fetch mode: {fetch_mode!r} (expected one of {list(FETCH_MODES)})")
         self._headers = {"User-Agent": user_agent}
         self._feed_urls = feed_urls
+        self._rate_limiter = rate_limiter
+        self._transport = transport
+        self._feed_state = feed_state
+        self._parser = make_parser(parser_backend)
+        # Валидаторы последнего ответа; сохраняются только после успешного цикла
+        self._pending_feed_state: dict[str, tuple[str, str, str, str]] = {}
+        self._fetch_mode = fetch_mode
+        self._source_deadline = source_deadline_seconds
+        self._detail_cache = detail_cache
+        self._source_stats: dict[str, SourceStats] = {}
+        self._stats_lock = threading.Lock()
+        self.latency = LatencyTracker()
+
+    @property
+    def fetch_mode(self) -> str:
+        return self._fetch_mode
 
     def fetch_recent_incidents(self) -> list[dict[str, str]]:
+        if self._fetch_mode == "merge":
+            return self._fetch_merged()
+        if self._fetch_mode == "hedge":
+            return self._fetch_hedged()
+        return self._fetch_sequential()
+
+    def _fetch_sequential(self) -> list[dict[str, str]]:
         errors: list[str] = []
         had_success_response = False
-        with httpx.Client(headers=self._headers, timeout=20.0, follow_redirects=True) as client:
+        with self._client() as client:
             for url in self._feed_urls:
                 try:
-                    response = client.get(url)
-                    response.raise_for_status()
+                    result = self._fetch_source(client, url)
+                    # 304 или тот же хэш тела: лента не менялась — цикл заканчивается
+                    # до парсинга и до любой работы с БД.
+                    if result.not_modified:
+                        return []
                     had_success_response = True
-                    incidents = self._parse_source(response.text)
-                    if incidents:
-                        logger.info("collector fetched %d rows from %s", len(incidents), url)
-                        return incidents
+                    if result.rows:
+                        self._pending_feed_state[url] = result.state
+                        return result.rows
                     errors.append(f"{url}: parsed 0 incidents")
                 except Exception as exc:
                     errors.append(f"{url}: {exc}")
@@ -35,18 +134,359 @@ class AviationSafetyCollector:
             return []
         raise RuntimeError("ASN source unavailable. " + " | ".join(errors))
 
+    def _fetch_merged(self) -> list[dict[str, str]]:
+        """
+        Все ленты параллельно; строки объединяются по incident_id.
+
+        Для каждого инцидента берётся самая полная строка (больше непустых
+        полей), порядок — порядок первого появления с учётом порядка лент.
+        Лента с 304 просто не добавляет строк, лента, не уложившаяся в
+        дедлайн, считается упавшей.
+        """
+        errors: list[str] = []
+        results: dict[str, _SourceResult] = {}
+        for url, result in self._fetch_parallel():
+            if isinstance(result, Exception):
+                errors.append(f"{url}: {result}")
+            else:
+                results[url] = result
+
+        if not results:
+            raise RuntimeError("ASN source unavailable. " + " | ".join(errors))
+
+        merged: dict[str, dict[str, str]] = {}
+        for url in self._feed_urls:
+            result = results.get(url)
+            if result is None or result.not_modified:
+                continue
+            if not result.rows:
+                errors.append(f"{url}: parsed 0 incidents")
+                continue
+            self._pending_feed_state[url] = result.state
+            for row in result.rows:
+                key = build_incident_id(
+                    row.get("date_utc", ""), row.get("aircraft", ""), row.get("location", ""),
+                    row.get("source_url", ""),
+                )
+                current = merged.get(key)
+                if current is None or _richness(row) > _richness(current):
+                    merged[key] = row
+
+        if errors:
+            logger.warning("ASN merged fetch: some sources failed. %s", " | ".join(errors))
+        logger.info("collector merged %d rows from %d sources", len(merged), len(results))
+        return list(merged.values())
+
+    def _fetch_hedged(self) -> list[dict[str, str]]:
+        """
+        Все ленты параллельно, побеждает первый ответ со строками.
+
+        Медленная лента больше не держит цикл до таймаута — её ответ просто
+        не ждём. Per-host лимит сохраняется, так что запросы к одному хосту
+        стартуют с интервалом и сами собой образуют хедж-задержку.
+
+        304 победой не считается: ленты разные, и «не изменилась» у одной
+        не значит, что во второй нет новых строк. Пустой результат — только
+        если ни одна лента строк не дала.
+        """
+        errors: list[str] = []
+        had_success_response = False
+        not_modified = False
+        for url, result in self._fetch_parallel():
+            if isinstance(result, Exception):
+                errors.append(f"{url}: {result}")
+                continue
+            if result.not_modified:
+                not_modified = True
+                continue
+            had_success_response = True
+            if result.rows:
+                logger.info("hedged fetch won by %s", url)
+                self._pending_feed_state[url] = result.state
+                return result.rows
+            errors.append(f"{url}: parsed 0 incidents")
+        if not_modified:
+            return []
+        if had_success_response:
+            logger.warning("ASN source returned no parseable incidents. %s", " | ".join(errors))
+            return []
+        raise RuntimeError("ASN source unavailable. " + " | ".join(errors))
+
+    def _fetch_parallel(self) -> Iterator[tuple[str, "_SourceResult | Exception"]]:
+        """
+        Все ленты параллельно; (url, результат или ошибка) в порядке готовности.
+
+        Дедлайн — настенные часы от начала запроса к ленте (ожидание очереди
+        rate limiter не в счёт): ленту, не ответившую вовремя, не ждём и
+        отдаём как SourceDeadlineExceeded. Сам запрос обрывается в
+        _fetch_source на следующем чанке; клиент закрывается после
+        последнего из брошенных запросов.
+        """
+        started: dict[str, float] = {}
+        stack = ExitStack()
+        client = stack.enter_context(self._client())
+        pool = ThreadPoolExecutor(max_workers=len(self._feed_urls), thread_name_prefix="asn-feed")
+        try:
+            pending: dict[Future, str] = {
+                pool.submit(self._fetch_source, client, url, started): url for url in self._feed_urls
+            }
+            while pending:
+                now = time.monotonic()
+                expired = [
+                    future for future, url in pending.items()
+                    if url in started and now - started[url] >= self._source_deadline
+                ]
+                for future in expired:
+                    url = pending.pop(future)
+                    yield url, SourceDeadlineExceeded(f"no response within {self._source_deadline:g}s")
+                if not pending:
+                    break
+                # Ждём до ближайшего дедлайна среди начатых запросов
+                deadlines = [started[url] + self._source_deadline for url in pending.values() if url in started]
+                timeout = max(0.0, min(deadlines) - now) if deadlines else self._source_deadline
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        yield url, future.result()
+                    except Exception as exc:
+                        yield url, exc
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            threading.Thread(target=_close_after, args=(pool, stack), daemon=True).start()
+
+    def _fetch_source(self, client: Any, url: str, started_at: dict[str, float] | None = None) -> "_SourceResult":
+        """
+        Один условный GET ленты со статистикой источника; ошибки пробрасываются.
+
+        source_deadline_seconds — предел по настенным часам на весь ответ:
+        таймаут httpx ограничивает каждую операцию отдельно, и лента,
+        отдающая тело по байту, держала бы цикл сколько угодно.
+        """
+        stats = self._source_stats_for(url)
+        state = self._load_feed_state(url)
+        self._wait_turn(url)
+        started = time.monotonic()
+        if started_at is not None:
+            started_at[url] = started
+        try:
+            with client.stream(
+                "GET", url, headers=self._conditional_headers(state), timeout=self._source_deadline,
+            ) as response:
+                if response.status_code == 304:
+                    logger.info("feed not modified (304) | url=%s", url)
+                    result = _SourceResult(not_modified=True)
+                else:
+                    response.raise_for_status()
+                    content = self._read_body(response, started + self._source_deadline)
+                    body_hash = hashlib.sha256(content).hexdigest()
+                    if state and state.get("body_hash") == body_hash:
+                        logger.info("feed not modified (same body hash) | url=%s", url)
+                        result = _SourceResult(not_modified=True)
+                    else:
+                        rows = self._parse_source(content.decode(response.charset_encoding or "utf-8", "replace"))
+                        if rows:
+                            logger.info("collector fetched %d rows from %s", len(rows), url)
+                        result = _SourceResult(rows=rows, state=(
+                            response.headers.get("ETag", ""),
+                            response.headers.get("Last-Modified", ""),
+                            body_hash,
+                            rows[0]["source_url"] if rows else "",
+                        ))
+        except Exception:
+            with self._stats_lock:
+                stats.requests += 1
+                stats.failures += 1
+            raise
+        finally:
+            self.latency.record(url, time.monotonic() - started)
+        with self._stats_lock:
+            stats.requests += 1
+            stats.successes += 1
+            stats.not_modified += int(result.not_modified)
+            stats.rows += len(result.rows)
+        return result
+
+    def _read_body(self, response: Any, deadline: float) -> bytes:
+        chunks: list[bytes] = []
+        for chunk in response.iter_bytes():
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                raise SourceDeadlineExceeded(f"body not received within {self._source_deadline:g}s")
+        return b"".join(chunks)
+
+    def source_stats(self) -> dict[str, SourceStats]:
+        with self._stats_lock:
+            return {url: SourceStats(**vars(s)) for url, s in self._source_stats.items()}
+
+    def log_source_stats(self) -> None:
+        for url, s in self.source_stats().items():
+            latency = self.latency.summary(url)
+            logger.info(
+                "asn source | url=%s requests=%d ok=%d failed=%d not_modified=%d rows=%d p50=%.1fms max=%.1fms",
+                url, s.requests, s.successes, s.failures, s.not_modified, s.rows,
+                latency.p50_ms if latency else 0.0, latency.max_ms if latency else 0.0,
+            )
+
+    def _source_stats_for(self, url: str) -> SourceStats:
+        with self._stats_lock:
+            stats = self._source_stats.get(url)
+            if stats is None:
+                stats = self._source_stats[url] = SourceStats()
+            return stats
+
+    def iter_recent_incidents(
+        self,
+        is_known: Callable[[dict[str, str]], bool] | None = None,
+        stop_after_known: int = 3,
+    ) -> Iterator[dict[str, str]]:
+        """
+        Потоковый вариант fetch_recent_incidents: строки отдаются по мере разбора.
+
+        Ленты ASN отсортированы от новых к старым, поэтому чтение прекращается
+        на строке high-water mark (самая новая строка прошлого чистого цикла)
+        или на серии из stop_after_known подряд известных строк (is_known).
+        Остаток страницы не скачивается и не разбирается.
+        """
+        errors: list[str] = []
+        had_success_response = False
+        with self._client() as client:
+            for url in self._feed_urls:
+                yielded = 0
+                try:
+                    state = self._load_feed_state(url)
+                    high_water_mark = (state or {}).get("high_water_mark") or ""
+                    self._wait_turn(url)
+                    with client.stream("GET", url, headers=self._conditional_headers(state)) as response:
+                        if response.status_code == 304:
+                            logger.info("feed not modified (304) | url=%s", url)
+                            return
+                        response.raise_for_status()
+                        had_success_response = True
+                        newest = ""
+                        known_run = 0
+                        stop_reason = ""
+                        rows = self._parser.iter_feed(response.iter_bytes(), response.charset_encoding)
+                        for row in rows:
+                            newest = newest or row["source_url"]
+                            if row["source_url"] == high_water_mark:
+                                stop_reason = "high-water mark"
+                                break
+                            if is_known is not None and is_known(row):
+                                known_run += 1
+                                if known_run >= stop_after_known:
+                                    stop_reason = "known run"
+                                    break
+                            else:
+                                known_run = 0
+                            yielded += 1
+                            yield row
+                    if not newest:
+                        errors.append(f"{url}: parsed 0 incidents")
+                        continue
+                    logger.info(
+                        "collector streamed %d rows from %s | stop=%s", yielded, url, stop_reason or "end",
+                    )
+                    # Тело целиком не читалось — хэш не считаем, его роль играет high-water mark
+                    self._pending_feed_state[url] = (
+                        response.headers.get("ETag", ""),
+                        response.headers.get("Last-Modified", ""),
+                        "",
+                        newest,
+                    )
+                    return
+                except Exception as exc:
+                    if yielded:
+                        # Часть строк уже отдана: другой URL дал бы дубли, состояние не фиксируем
+                        logger.warning("feed stream interrupted after %d rows | url=%s error=%s", yielded, url, exc)
+                        return
+                    errors.append(f"{url}: {exc}")
+        if had_success_response:
+            logger.warning("ASN source returned no parseable incidents. %s", " | ".join(errors))
+            return
+        raise RuntimeError("ASN source unavailable. " + " | ".join(errors))
+
+    def commit_feed_state(self) -> None:
+        """
+        Сохраняет валидаторы ленты. Вызывается после цикла, в котором все
+        строки обработаны: иначе 304 спрятал бы необработанные и ретраи.
+        """
+        if self._feed_state is None:
+            return
+        for url, (etag, last_modified, body_hash, high_water_mark) in self._pending_feed_state.items():
+            self._feed_state.save_feed_state(url, etag, last_modified, body_hash, high_water_mark)
+        self._pending_feed_state.clear()
+
+    def _load_feed_state(self, url: str) -> dict[str, str] | None:
+        if self._feed_state is None:
+            return None
+        return self._feed_state.get_feed_state(url)
+
+    @staticmethod
+    def _conditional_headers(state: dict[str, str] | None) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if state:
+            if state.get("etag"):
+                headers["If-None-Match"] = state["etag"]
+            if state.get("last_modified"):
+                headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
     def fetch_incident_details(self, source_url: str) -> dict[str, str]:
         if not source_url:
             return {}
+        cache = self._detail_cache
+        url = canonical_url(source_url) if cache is not None else source_url
+        cached = self._lookup_detail_page(cache, url) if cache is not None else None
+        if cached is not None and cached.fresh:
+            return self._parse_incident_detail(cached.html)
         try:
-            with httpx.Client(headers=self._headers, timeout=20.0, follow_redirects=True) as client:
-                response = client.get(source_url)
+            self._wait_turn(url)
+            with self._client() as client:
+                response = client.get(url, headers=DetailPageCache.validators(cached))
+                if response.status_code == 304 and cached is not None:
+                    cache.revalidated(url)
+                    return self._parse_incident_detail(cached.html)
                 response.raise_for_status()
+            if cache is not None:
+                self._store_detail_page(cache, url, response)
             return self._parse_incident_detail(response.text)
         except Exception as exc:
+            if cached is not None:
+                logger.warning("serving stale incident details for %s: %s", source_url, exc)
+                cache.stale_served(url)
+                return self._parse_incident_detail(cached.html)
             logger.warning("failed to fetch incident details from %s: %s", source_url, exc)
             return {}
 
+    @staticmethod
+    def _lookup_detail_page(cache: DetailPageCache, url: str) -> CachedPage | None:
+        # Сбой чтения кэша (БД, битый zlib) — промах: страницу загружаем из сети
+        try:
+            return cache.lookup(url)
+        except Exception as exc:
+            logger.warning("failed to read cached incident details for %s: %s", url, exc)
+            return None
+
+    @staticmethod
+    def _store_detail_page(cache: DetailPageCache, url: str, response: Any) -> None:
+        # Сбой записи в кэш не должен терять уже загруженную страницу
+        try:
+            cache.store(url, response.text, response.headers.get("ETag", ""),
+                        response.headers.get("Last-Modified", ""))
+        except Exception as exc:
+            logger.warning("failed to cache incident details for %s: %s", url, exc)
+
+    def _client(self) -> Any:
+        if self._transport is not None:
+            return self._transport.session(headers=self._headers, timeout=20.0, follow_redirects=True)
+        return httpx.Client(headers=self._headers, timeout=20.0, follow_redirects=True)
+
+    def _wait_turn(self, url: str) -> None:
+        # Rate limiting между запросами к ASN (fix #3) — теперь per-host, а не глобальный sleep
+        if self._rate_limiter is not None:
+            self._rate_limiter.wait(url)
+
     def _parse_source(self, body: str) -> list[dict[str, str]]:
         payload = body.lstrip()
         if payload.startswith("<?xml") or "<rss" in payload[:300].lower():
@@ -54,173 +494,10 @@ class AviationSafetyCollector:
         return self._parse_incident_table(payload)
 
     def _parse_rss(self, xml_text: str) -> list[dict[str, str]]:
-        soup = BeautifulSoup(xml_text, "xml")
-        incidents: list[dict[str, str]] = []
-        seen_urls: set[str] = set()
-        for item in soup.find_all("item"):
-            link_node = item.find("link")
-            title_node = item.find("title")
-            date_node = item.find("pubDate")
-            link = (link_node.get_text(strip=True) if link_node else "").strip()
-            title = " ".join((title_node.get_text(" ", strip=True) if title_node else "").split())
-            pub_date = " ".join((date_node.get_text(" ", strip=True) if date_node else "").split())
-            if not link or not title or link in seen_urls:
-                continue
-            seen_urls.add(link)
-            incidents.append({"title": title, "event_type": "incident", "date_utc": pub_date,
-                               "location": "", "aircraft": "", "operator": "", "persons_onboard": "",
-                               "summary": title, "source_url": link})
-        return incidents
+        return self._parser.parse_rss(xml_text)
 
     def _parse_incident_table(self, html: str) -> list[dict[str, str]]:
-        soup = BeautifulSoup(html, "lxml")
-        incidents = self._parse_table_rows(soup)
-        if incidents:
-            return incidents
-        return self._parse_incident_links(soup)
-
-    def _parse_table_rows(self, soup) -> list[dict[str, str]]:
-        incidents = []
-        rows = soup.select("table.hp tr") or soup.select("table.list tr") or soup.select("table tr")
-        for row in rows:
-            cols = row.find_all("td")
-            if len(cols) < 4:
-                continue
-            anchor = row.find("a", href=True)
-            if not anchor:
-                continue
-            href = anchor.get("href", "")
-            source_url = href if href.startswith("http") else f"https://aviation-safety.net/{href.lstrip('/')}"
-            title = " ".join(cols[3].get_text(" ", strip=True).split())
-            date_text = cols[0].get_text(" ", strip=True)
-            location = cols[1].get_text(" ", strip=True)
-            aircraft = cols[2].get_text(" ", strip=True)
-            if not any([title, date_text, location, aircraft]):
-                continue
-            incidents.append({"title": title, "event_type": "incident", "date_utc": date_text,
-                               "location": location, "aircraft": aircraft, "operator": "",
-                               "persons_onboard": "", "summary": title, "source_url": source_url})
-        return incidents
-
-    def _parse_incident_links(self, soup) -> list[dict[str, str]]:
-        incidents = []
-        seen_urls: set[str] = set()
-        for anchor in soup.find_all("a", href=True):
-            href = anchor.get("href", "")
-            if not self._is_incident_link(href):
-                continue
-            source_url = href if href.startswith("http") else f"https://aviation-safety.net/{href.lstrip('/')}"
-            if source_url in seen_urls:
-                continue
-            seen_urls.add(source_url)
-            title = " ".join(anchor.get_text(" ", strip=True).split())
-            if not title:
-                continue
-            incidents.append({"title": title, "event_type": "incident", "date_utc": "",
-                               "location": "", "aircraft": "", "operator": "", "persons_onboard": "",
-                               "summary": title, "source_url": source_url})
-        return incidents
-
-    def _parse_incident_detail(self, html: str) -> dict[str, str]:  # noqa: PLR0912
-        soup = BeautifulSoup(html, "lxml")
-
-        title_node = soup.find("h1") or soup.find("title")
-        title = " ".join(title_node.get_text(" ", strip=True).split()) if title_node else ""
-
-        # Собираем все поля из таблицы фактов
-        fields: dict[str, str] = {}
-        for row in soup.select("table tr"):
-            cells = row.find_all(["th", "td"])
-            if len(cells) < 2:
-                continue
-            key = cells[0].get_text(" ", strip=True).lower().strip(": ")
-            val = " ".join(cells[1].get_text(" ", strip=True).split())
-            if val:
-                fields[key] = val
-
-        # Маппинг полей ASN -> наши поля
-        operator  = fields.get("owner/operator") or fields.get("operator") or ""
-        aircraft  = fields.get("type") or fields.get("aircraft type") or fields.get("aircraft") or ""
-        location  = fields.get("location") or ""
-        date_utc  = fields.get("date") or ""
-        time_utc  = fields.get("time") or ""
-        registration   = fields.get("registration") or ""
-        fatalities_raw = fields.get("fatalities") or ""
-        departure      = fields.get("departure airport") or ""
-        destination    = fields.get("destination airport") or ""
-        phase          = fields.get("phase") or ""
-        nature         = fields.get("nature") or ""
-        persons_onboard = ""
-
-        # Извлекаем число на борту из строки вида "Fatalities: 0 / Occupants: 1"
-        if fatalities_raw:
-            occ_match = re.search(r"[Oo]ccupants?[:\s]+(\d+)", fatalities_raw)
-            if occ_match:
-                persons_onboard = occ_match.group(1)
-            fat_match = re.search(r"[Ff]atalit\w+[:\s]+(\d+)", fatalities_raw)
-            fatalities = fat_match.group(1) if fat_match else ""
-        else:
-            fatalities = ""
-
-        # Narrative — ищем отдельный блок или параграфы достаточной длины
-        narrative = ""
-        # Сначала ищем явный заголовок "Narrative" на странице
-        for tag in soup.find_all(["h2", "h3", "b", "strong", "td", "th"]):
-            if "narrative" in tag.get_text(strip=True).lower():
-                # Берём следующий контент после заголовка
-                sibling = tag.find_next(["p", "td", "div"])
-                if sibling:
-                    candidate = " ".join(sibling.get_text(" ", strip=True).split())
-                    if len(candidate) >= 30:
-                        narrative = candidate
-                        break
-
-        # Если не нашли явный narrative — собираем параграфы
-        if not narrative:
-            parts = []
-            for node in soup.select("p"):
-                text = " ".join(node.get_text(" ", strip=True).split())
-                if len(text) >= 40:
-                    parts.append(text)
-            narrative = "\n".join(parts[:5]).strip()
-
-        # Собираем расширенный summary для промпта
-        summary_parts: list[str] = []
-        if narrative:
-            summary_parts.append(f"Нарратив: {narrative}")
-        if phase:
-            summary_parts.append(f"Фаза полёта: {phase}")
-        if nature:
-            summary_parts.append(f"Характер полёта: {nature}")
-        if departure:
-            summary_parts.append(f"Аэропорт вылета: {departure}")
-        if destination and destination != departure:
-            summary_parts.append(f"Аэропорт назначения: {destination}")
-        if fatalities:
-            summary_parts.append(f"Погибших: {fatalities}")
-
-        summary = "\n".join(summary_parts).strip()
-
-        # Обогащаем aircraft регистрацией если есть
-        if registration and aircraft and registration not in aircraft:
-            aircraft = f"{aircraft} (борт {registration})"
-
-        # Добавляем время к дате если есть
-        if time_utc and date_utc and time_utc not in date_utc:
-            date_utc = f"{date_utc}, {time_utc}"
-
-        result: dict[str, str] = {}
-        if title:           result["title"]           = title
-        if summary:         result["summary"]         = summary
-        if operator:        result["operator"]        = operator
-        if aircraft:        result["aircraft"]        = aircraft
-        if location:        result["location"]        = location
-        if date_utc:        result["date_utc"]        = date_utc
-        if persons_onboard: result["persons_onboard"] = persons_onboard
-        return result
+        return self._parser.parse_incident_table(html)
 
-    @staticmethod
-    def _is_incident_link(href: str) -> bool:
-        lowered = href.lower()
-        return ("/wikibase/" in lowered or "/database/record.php" in lowered
-                or "/database/db" in lowered or "/asndb/" in lowered)
+    def _parse_incident_detail(self, html: str) -> dict[str, str]:
+        return self._parser.parse_incident_detail(html)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+"""
+Кэш детальных страниц ASN.
+
+Failed-инциденты ретраятся до MAX_RETRY_ATTEMPTS раз, а после рестарта
+или --dry-run-reset те же страницы грузятся снова — каждый раз с паузой
+rate limiter и запросом к ASN. Кэш хранит сжатый HTML по каноническому
+source_url в таблице detail_cache:
+
+- свежая запись (моложе TTL) отдаётся без запроса;
+- устаревшая ревалидируется условным GET (ETag / Last-Modified): на 304
+  тело берётся из кэша, а TTL начинается заново;
+- при ошибке запроса отдаётся устаревшая копия, если она есть;
+- сверх max_entries вытесняются давно не читанные записи (LRU).
+"""
+
+import logging
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Protocol
+from urllib.parse import urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class DetailPageStore(Protocol):
+    """Хранилище страниц (реализуется IncidentRepository)."""
+
+    def get_detail_page(self, source_url: str) -> dict[str, Any] | None: ...
+
+    def save_detail_page(
+        self, source_url: str, body: bytes, etag: str, last_modified: str, max_entries: int = 0,
+    ) -> None: ...
+
+    def touch_detail_page(self, source_url: str, revalidated: bool = False) -> None: ...
+
+
+def canonical_url(url: str) -> str:
+    """Ключ кэша: схема и хост в нижнем регистре, без порта по умолчанию и #фрагмента."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    html: str
+    etag: str
+    last_modified: str
+    fresh: bool
+
+
+@dataclass
+class DetailCacheStats:
+    hits: int = 0            # свежая запись, запроса не было
+    revalidated: int = 0     # 304 на условный GET
+    misses: int = 0          # страница загружена целиком
+    stale_served: int = 0    # запрос упал, отдана устаревшая копия
+
+
+class DetailPageCache:
+    def __init__(self, store: DetailPageStore, ttl_seconds: float, max_entries: int) -> None:
+        self._store = store
+        self._ttl = max(0.0, ttl_seconds)
+        self._max_entries = max(0, max_entries)
+        self._stats = DetailCacheStats()
+        self._lock = threading.Lock()
+
+    def lookup(self, url: str) -> CachedPage | None:
+        row = self._store.get_detail_page(url)
+        if row is None:
+            return None
+        page = CachedPage(
+            html=zlib.decompress(row["body"]).decode("utf-8"),
+            etag=row.get("etag") or "",
+            last_modified=row.get("last_modified") or "",
+            fresh=time.time() - float(row["fetched_at"]) < self._ttl,
+        )
+        if page.fresh:
+            self._touch(url)
+            self._count("hits")
+        return page
+
+    @staticmethod
+    def validators(page: CachedPage | None) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if page is not None:
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def revalidated(self, url: str) -> None:
+        self._touch(url, revalidated=True)
+        self._count("revalidated")
+
+    def stale_served(self, url: str) -> None:
+        self._touch(url)
+        self._count("stale_served")
+
+    def store(self, url: str, html: str, etag: str, last_modified: str) -> None:
+        self._count("misses")
+        body = zlib.compress(html.encode("utf-8"), 6)
+        self._store.save_detail_page(url, body, etag, last_modified, self._max_entries)
+
+    def stats(self) -> DetailCacheStats:
+        with self._lock:
+            return DetailCacheStats(**vars(self._stats))
+
+    def log_stats(self) -> None:
+        s = self.stats()
+        logger.info(
+            "detail cache | hits=%d revalidated=%d misses=%d stale_served=%d avoided_requests=%d",
+            s.hits, s.revalidated, s.misses, s.stale_served, s.hits,
+        )
+
+    def _touch(self, url: str, revalidated: bool = False) -> None:
+        # Отметка чтения — учёт для LRU и TTL; её сбой не должен терять уже прочитанную страницу
+        try:
+            self._store.touch_detail_page(url, revalidated=revalidated)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("detail cache touch failed for %s: %s", url, exc)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self._stats, name, getattr(self._stats, name) + 1)
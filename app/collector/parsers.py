@@ -0,0 +1,625 @@
+from __future__ import annotations
+
+"""
+Бэкенды разбора страниц ASN: RSS, таблицы списков и страницы инцидента.
+
+- LxmlParser (по умолчанию) — lxml.etree / lxml.html напрямую и заранее
+  скомпилированные XPath-выражения, без промежуточного дерева BeautifulSoup;
+- SoupParser — прежняя реализация на BeautifulSoup, оставлена как запасной
+  вариант (ASN_PARSER_BACKEND=bs4).
+
+Оба бэкенда обязаны отдавать одинаковые словари: это проверяют тесты на
+фикстурах из tests/fixtures/asn. Правила текста те же, что у
+BeautifulSoup.get_text(" ", strip=True): строки обрезаются, пустые
+отбрасываются, содержимое <script>/<style> и комментарии не учитываются.
+"""
+
+import itertools
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Protocol
+
+from lxml import etree
+
+BASE_URL = "https://aviation-safety.net/"
+
+
+class AsnParser(Protocol):
+    def parse_rss(self, xml_text: str) -> list[dict[str, str]]: ...
+
+    def parse_incident_table(self, html: str) -> list[dict[str, str]]: ...
+
+    def parse_incident_detail(self, html: str) -> dict[str, str]: ...
+
+    def extract_incident_detail(self, html: str) -> IncidentDetail: ...
+
+    def iter_feed(self, chunks: Iterable[bytes], encoding: str | None = None) -> Iterator[dict[str, str]]: ...
+
+
+def is_incident_link(href: str) -> bool:
+    lowered = href.lower()
+    return ("/wikibase/" in lowered or "/database/record.php" in lowered
+            or "/database/db" in lowered or "/asndb/" in lowered)
+
+
+def absolute_url(href: str) -> str:
+    return href if href.startswith("http") else f"{BASE_URL}{href.lstrip('/')}"
+
+
+def _squash(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _list_row(title: str, date_text: str, location: str, aircraft: str, source_url: str) -> dict[str, str]:
+    return {"title": title, "event_type": "incident", "date_utc": date_text,
+            "location": location, "aircraft": aircraft, "operator": "",
+            "persons_onboard": "", "summary": title, "source_url": source_url}
+
+
+# "Fatalities: 0 / Occupants: 1" — оба числа одним проходом regex
+_FATALITIES_RE = re.compile(r"[Ff]atalit\w+[:\s]+(\d+)|[Oo]ccupants?[:\s]+(\d+)")
+
+
+def parse_fatalities(raw: str) -> tuple[int | None, int | None]:
+    """(погибшие, на борту) из поля Fatalities; первое вхождение каждого числа."""
+    fatalities: int | None = None
+    occupants: int | None = None
+    for match in _FATALITIES_RE.finditer(raw):
+        if match.group(1) is not None:
+            if fatalities is None:
+                fatalities = int(match.group(1))
+        elif occupants is None:
+            occupants = int(match.group(2))
+        if fatalities is not None and occupants is not None:
+            break
+    return fatalities, occupants
+
+
+@dataclass(frozen=True)
+class IncidentDetail:
+    """Разобранная страница инцидента ASN."""
+
+    title: str = ""
+    operator: str = ""
+    aircraft_type: str = ""
+    registration: str = ""
+    location: str = ""
+    date: str = ""
+    time: str = ""
+    phase: str = ""
+    nature: str = ""
+    departure: str = ""
+    destination: str = ""
+    fatalities: int | None = None
+    persons_onboard: int | None = None
+    narrative: str = ""
+
+    @classmethod
+    def from_fields(cls, title: str, fields: dict[str, str], narrative: str) -> "IncidentDetail":
+        """Маппинг таблицы фактов ASN в поля инцидента — общий для обоих бэкендов."""
+        fatalities, persons_onboard = parse_fatalities(fields.get("fatalities") or "")
+        return cls(
+            title=title,
+            operator=fields.get("owner/operator") or fields.get("operator") or "",
+            aircraft_type=fields.get("type") or fields.get("aircraft type") or fields.get("aircraft") or "",
+            registration=fields.get("registration") or "",
+            location=fields.get("location") or "",
+            date=fields.get("date") or "",
+            time=fields.get("time") or "",
+            phase=fields.get("phase") or "",
+            nature=fields.get("nature") or "",
+            departure=fields.get("departure airport") or "",
+            destination=fields.get("destination airport") or "",
+            fatalities=fatalities,
+            persons_onboard=persons_onboard,
+            narrative=narrative,
+        )
+
+    @property
+    def summary(self) -> str:
+        """Расширенный summary для промпта."""
+        parts: list[str] = []
+        if self.narrative:
+            parts.append(f"Нарратив: {self.narrative}")
+        if self.phase:
+            parts.append(f"Фаза полёта: {self.phase}")
+        if self.nature:
+            parts.append(f"Характер полёта: {self.nature}")
+        if self.departure:
+            parts.append(f"Аэропорт вылета: {self.departure}")
+        if self.destination and self.destination != self.departure:
+            parts.append(f"Аэропорт назначения: {self.destination}")
+        if self.fatalities is not None:
+            parts.append(f"Погибших: {self.fatalities}")
+        return "\n".join(parts).strip()
+
+    def to_dict(self) -> dict[str, str]:
+        """Словарь в формате строк ленты (пустые поля опускаются)."""
+        aircraft = self.aircraft_type
+        # Обогащаем aircraft регистрацией если есть
+        if self.registration and aircraft and self.registration not in aircraft:
+            aircraft = f"{aircraft} (борт {self.registration})"
+
+        # Добавляем время к дате если есть
+        date_utc = self.date
+        if self.time and date_utc and self.time not in date_utc:
+            date_utc = f"{date_utc}, {self.time}"
+
+        values = {
+            "title": self.title,
+            "summary": self.summary,
+            "operator": self.operator,
+            "aircraft": aircraft,
+            "location": self.location,
+            "date_utc": date_utc,
+            "persons_onboard": "" if self.persons_onboard is None else str(self.persons_onboard),
+            "registration": self.registration,
+            "fatalities": "" if self.fatalities is None else str(self.fatalities),
+        }
+        return {key: value for key, value in values.items() if value}
+
+
+# --- lxml -------------------------------------------------------------------
+
+def _class_xpath(cls: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+_X_TEXT = etree.XPath(
+    ".//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]",
+    smart_strings=False,
+)
+_X_RSS_ITEMS = etree.XPath("//*[local-name()='item']")
+_X_RSS_LINK = etree.XPath("(.//*[local-name()='link'])[1]")
+_X_RSS_TITLE = etree.XPath("(.//*[local-name()='title'])[1]")
+_X_RSS_DATE = etree.XPath("(.//*[local-name()='pubDate'])[1]")
+_X_ROWS_HP = etree.XPath(f"//table[{_class_xpath('hp')}]//tr")
+_X_ROWS_LIST = etree.XPath(f"//table[{_class_xpath('list')}]//tr")
+_X_ROWS_ANY = etree.XPath("//table//tr")
+_X_TD = etree.XPath(".//td")
+_X_FIRST_HREF = etree.XPath("(.//a[@href])[1]")
+_X_ANCHORS = etree.XPath("//a[@href]")
+
+
+_SKIP_TEXT_TAGS = frozenset({"script", "style", "template"})
+
+
+def _text(node: Any, separator: str = " ") -> str:
+    """Эквивалент BeautifulSoup get_text(separator, strip=True)."""
+    if not len(node) and node.tag not in _SKIP_TEXT_TAGS:
+        # Лист без дочерних элементов — типичная ячейка: XPath не нужен
+        return (node.text or "").strip()
+    return separator.join(part.strip() for part in _X_TEXT(node) if part.strip())
+
+
+def _first(nodes: list[Any]) -> Any | None:
+    return nodes[0] if nodes else None
+
+
+_ANCHOR_TAGS = frozenset({"h2", "h3", "b", "strong", "td", "th"})
+_BLOCK_TAGS = frozenset({"p", "td", "div"})
+# Только эти теги интересны разбору; остальные узлы lxml пропускает без Python-вызовов
+_DETAIL_TAGS = ("title", "h1", "table", "tr", "th", "td", "h2", "h3", "b", "strong", "p", "div")
+
+
+class _DetailWalk:
+    """
+    Один обход страницы инцидента.
+
+    За проход iterwalk (с фильтром по тегам) собираются заголовок, строки
+    таблицы фактов (первые две ячейки), якоря "Narrative", блоки p/td/div
+    в порядке документа и параграфы. Текст считается лениво и только для
+    тех элементов, которые реально нужны результату. Семантика совпадает
+    с прежним разбором (select("table tr"), find_next, select("p")).
+    """
+
+    def __init__(self, root: Any) -> None:
+        self._h1: Any | None = None
+        self._title: Any | None = None
+        self._table_depth = 0
+        self._open_rows: list[list[Any]] = []
+        self._rows: list[list[Any]] = []       # [число ячеек, первая, вторая]
+        self._anchors: list[int] = []          # порядковые номера якорей "narrative"
+        self._block_orders: list[int] = []
+        self._blocks: list[Any] = []
+        self._paragraphs: list[Any] = []
+        self._walk(root)
+
+    def _walk(self, root: Any) -> None:
+        order = 0
+        for event, element in etree.iterwalk(root, events=("start", "end"), tag=_DETAIL_TAGS):
+            tag = element.tag
+            if event == "end":
+                if tag == "table":
+                    self._table_depth -= 1
+                elif tag == "tr" and self._table_depth:
+                    self._open_rows.pop()
+                continue
+
+            order += 1
+            if tag == "table":
+                self._table_depth += 1
+            elif tag == "tr":
+                if self._table_depth:
+                    row = [0, None, None]
+                    self._open_rows.append(row)
+                    self._rows.append(row)
+            elif tag == "h1":
+                if self._h1 is None:
+                    self._h1 = element
+            elif tag == "title":
+                if self._title is None:
+                    self._title = element
+            elif tag == "p":
+                self._paragraphs.append(element)
+
+            if tag == "td" or tag == "th":
+                # Как row.find_all(["th", "td"]): ячейка учитывается во всех объемлющих строках
+                for row in self._open_rows:
+                    row[0] += 1
+                    if row[0] <= 2:
+                        row[row[0]] = element
+            if tag in _ANCHOR_TAGS and "narrative" in _text(element, "").lower():
+                self._anchors.append(order)
+            if tag in _BLOCK_TAGS:
+                self._block_orders.append(order)
+                self._blocks.append(element)
+
+    def result(self) -> IncidentDetail:
+        title_node = self._h1 if self._h1 is not None else self._title
+        title = _squash(_text(title_node)) if title_node is not None else ""
+
+        fields: dict[str, str] = {}
+        for count, key_cell, value_cell in self._rows:
+            if count < 2:
+                continue
+            key = _text(key_cell).lower().strip(": ")
+            val = _squash(_text(value_cell))
+            if val:
+                fields[key] = val
+
+        narrative = ""
+        for anchor in self._anchors:
+            # Аналог find_next: первый p/td/div после открывающего тега якоря
+            index = bisect_right(self._block_orders, anchor)
+            if index < len(self._blocks):
+                candidate = _squash(_text(self._blocks[index]))
+                if len(candidate) >= 30:
+                    narrative = candidate
+                    break
+
+        if not narrative:
+            parts = []
+            for node in self._paragraphs:
+                text = _squash(_text(node))
+                if len(text) >= 40:
+                    parts.append(text)
+            narrative = "\n".join(parts[:5]).strip()
+
+        return IncidentDetail.from_fields(title, fields, narrative)
+
+
+class LxmlParser:
+    def __init__(self) -> None:
+        self._xml_parser = etree.XMLParser(
+            encoding="utf-8", recover=True, resolve_entities=False, no_network=True,
+        )
+        # Обычные etree-элементы: без поиска класса HtmlElement на каждый узел
+        self._html_parser = etree.HTMLParser(no_network=True)
+
+    def parse_rss(self, xml_text: str) -> list[dict[str, str]]:
+        # Тело уже декодировано httpx — кодировку из <?xml ...?> перекрывает encoding парсера
+        root = etree.fromstring(xml_text.encode("utf-8"), self._xml_parser)
+        if root is None:
+            return []
+        return list(_unique_by_url(filter(None, map(self._rss_row, _X_RSS_ITEMS(root)))))
+
+    def parse_incident_table(self, html: str) -> list[dict[str, str]]:
+        root = self._html(html)
+        if root is None:
+            return []
+        return self._parse_table_rows(root) or self._parse_incident_links(root)
+
+    def parse_incident_detail(self, html: str) -> dict[str, str]:
+        return self.extract_incident_detail(html).to_dict()
+
+    def extract_incident_detail(self, html: str) -> IncidentDetail:
+        root = self._html(html)
+        if root is None:
+            return IncidentDetail()
+        return _DetailWalk(root).result()
+
+    def iter_feed(self, chunks: Iterable[bytes], encoding: str | None = None) -> Iterator[dict[str, str]]:
+        """
+        Потоковый разбор ленты по мере прихода байтов (XMLPullParser / HTMLPullParser).
+
+        Строки отдаются сразу, как только закрыт их элемент, поэтому потребитель
+        может остановиться на первых строках и не читать остаток страницы.
+        Строки таблиц table.hp / table.list идут потоком (берётся семейство,
+        встреченное первым); строки прочих таблиц и ссылки-фолбэк отдаются
+        в конце документа, если потоковых строк не нашлось.
+        """
+        chunks = iter(chunks)
+        head = b""
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= 512:
+                break
+        payload = head.lstrip()
+        stream = itertools.chain([head], chunks)
+        if payload.startswith(b"<?xml") or b"<rss" in payload[:300].lower():
+            yield from self._iter_rss(stream, encoding)
+        else:
+            yield from self._iter_html(stream, encoding)
+
+    def _iter_rss(self, chunks: Iterable[bytes], encoding: str | None) -> Iterator[dict[str, str]]:
+        # encoding — charset из Content-Type; без него действует <?xml encoding=...?>
+        parser = etree.XMLPullParser(
+            events=("end",), encoding=encoding, recover=True, resolve_entities=False, no_network=True,
+        )
+        seen_urls: set[str] = set()
+
+        def _drain() -> Iterator[dict[str, str]]:
+            for _, element in parser.read_events():
+                if not isinstance(element.tag, str) or element.tag.rpartition("}")[2] != "item":
+                    continue
+                row = self._rss_row(element)
+                # Разобранный item больше не нужен — дерево не растёт с длиной ленты
+                element.clear(keep_tail=True)
+                if row and row["source_url"] not in seen_urls:
+                    seen_urls.add(row["source_url"])
+                    yield row
+
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from _drain()
+        parser.close()
+        yield from _drain()
+
+    def _iter_html(self, chunks: Iterable[bytes], encoding: str | None) -> Iterator[dict[str, str]]:
+        parser = etree.HTMLPullParser(events=("end",), tag=("tr", "a"), no_network=True, encoding=encoding)
+        family: str | None = None
+        streamed = False
+        other_rows: list[dict[str, str]] = []
+        link_rows: list[dict[str, str]] = []
+
+        def _drain() -> Iterator[dict[str, str]]:
+            nonlocal family, streamed
+            for _, element in parser.read_events():
+                if element.tag == "a":
+                    row = self._link_row(element)
+                    if row:
+                        link_rows.append(row)
+                    continue
+                families = _table_families(element)
+                if not families:
+                    continue
+                row = self._table_row(element)
+                marked = "hp" if "hp" in families else "list" if "list" in families else None
+                if marked and family in (None, marked):
+                    family = marked
+                    if row:
+                        streamed = True
+                        yield row
+                elif not marked and row:
+                    other_rows.append(row)
+
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from _drain()
+        parser.close()
+        yield from _drain()
+
+        # Как в parse_incident_table: строки размеченных таблиц, иначе любых, иначе ссылки
+        if family is None:
+            yield from other_rows
+            if other_rows:
+                return
+        if not streamed:
+            yield from _unique_by_url(link_rows)
+
+    def _html(self, html: str) -> Any | None:
+        if not html.strip():
+            return None
+        try:
+            return etree.fromstring(html, self._html_parser)
+        except (etree.ParserError, ValueError):
+            return None
+
+    @staticmethod
+    def _rss_row(item: Any) -> dict[str, str] | None:
+        link_node = _first(_X_RSS_LINK(item))
+        title_node = _first(_X_RSS_TITLE(item))
+        date_node = _first(_X_RSS_DATE(item))
+        link = (_text(link_node, "") if link_node is not None else "").strip()
+        title = _squash(_text(title_node) if title_node is not None else "")
+        pub_date = _squash(_text(date_node) if date_node is not None else "")
+        if not link or not title:
+            return None
+        return _list_row(title, pub_date, "", "", link)
+
+    @staticmethod
+    def _table_row(row: Any) -> dict[str, str] | None:
+        cols = _X_TD(row)
+        if len(cols) < 4:
+            return None
+        anchor = _first(_X_FIRST_HREF(row))
+        if anchor is None:
+            return None
+        source_url = absolute_url(anchor.get("href", ""))
+        title = _squash(_text(cols[3]))
+        date_text = _text(cols[0])
+        location = _text(cols[1])
+        aircraft = _text(cols[2])
+        if not any([title, date_text, location, aircraft]):
+            return None
+        return _list_row(title, date_text, location, aircraft, source_url)
+
+    @staticmethod
+    def _link_row(anchor: Any) -> dict[str, str] | None:
+        href = anchor.get("href")
+        if href is None or not is_incident_link(href):
+            return None
+        # Пустой заголовок не отбрасываем здесь: ссылка всё равно занимает URL в дедупликации
+        return _list_row(_squash(_text(anchor)), "", "", "", absolute_url(href))
+
+    def _parse_table_rows(self, root: Any) -> list[dict[str, str]]:
+        rows = _X_ROWS_HP(root) or _X_ROWS_LIST(root) or _X_ROWS_ANY(root)
+        return [row for row in map(self._table_row, rows) if row]
+
+    def _parse_incident_links(self, root: Any) -> list[dict[str, str]]:
+        return list(_unique_by_url(filter(None, map(self._link_row, _X_ANCHORS(root)))))
+
+
+def _table_families(row: Any) -> set[str]:
+    """Классы hp / list объемлющих таблиц строки; "" — таблица без разметки."""
+    families: set[str] = set()
+    for ancestor in row.iterancestors("table"):
+        classes = (ancestor.get("class") or "").split()
+        families.update(cls for cls in classes if cls in ("hp", "list"))
+        families.add("")
+    return families
+
+
+def _unique_by_url(rows: Iterable[dict[str, str]]) -> Iterator[dict[str, str]]:
+    """Первая строка на каждый source_url; строки без заголовка только занимают URL."""
+    seen_urls: set[str] = set()
+    for row in rows:
+        if row["source_url"] in seen_urls:
+            continue
+        seen_urls.add(row["source_url"])
+        if row["title"]:
+            yield row
+
+
+# --- BeautifulSoup (fallback) -------------------------------------------------
+
+class SoupParser:
+    def parse_rss(self, xml_text: str) -> list[dict[str, str]]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(xml_text, "xml")
+        incidents: list[dict[str, str]] = []
+        seen_urls: set[str] = set()
+        for item in soup.find_all("item"):
+            link_node = item.find("link")
+            title_node = item.find("title")
+            date_node = item.find("pubDate")
+            link = (link_node.get_text(strip=True) if link_node else "").strip()
+            title = _squash(title_node.get_text(" ", strip=True) if title_node else "")
+            pub_date = _squash(date_node.get_text(" ", strip=True) if date_node else "")
+            if not link or not title or link in seen_urls:
+                continue
+            seen_urls.add(link)
+            incidents.append(_list_row(title, pub_date, "", "", link))
+        return incidents
+
+    def iter_feed(self, chunks: Iterable[bytes], encoding: str | None = None) -> Iterator[dict[str, str]]:
+        # BeautifulSoup не умеет разбирать поток: читаем тело целиком
+        payload = b"".join(chunks).decode(encoding or "utf-8", errors="replace").lstrip()
+        if payload.startswith("<?xml") or "<rss" in payload[:300].lower():
+            yield from self.parse_rss(payload)
+        else:
+            yield from self.parse_incident_table(payload)
+
+    def parse_incident_table(self, html: str) -> list[dict[str, str]]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "lxml")
+        return self._parse_table_rows(soup) or self._parse_incident_links(soup)
+
+    def parse_incident_detail(self, html: str) -> dict[str, str]:
+        return self.extract_incident_detail(html).to_dict()
+
+    def extract_incident_detail(self, html: str) -> IncidentDetail:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "lxml")
+
+        title_node = soup.find("h1") or soup.find("title")
+        title = _squash(title_node.get_text(" ", strip=True)) if title_node else ""
+
+        # Собираем все поля из таблицы фактов
+        fields: dict[str, str] = {}
+        for row in soup.select("table tr"):
+            cells = row.find_all(["th", "td"])
+            if len(cells) < 2:
+                continue
+            key = cells[0].get_text(" ", strip=True).lower().strip(": ")
+            val = _squash(cells[1].get_text(" ", strip=True))
+            if val:
+                fields[key] = val
+
+        # Narrative — ищем отдельный блок или параграфы достаточной длины
+        narrative = ""
+        # Сначала ищем явный заголовок "Narrative" на странице
+        for tag in soup.find_all(["h2", "h3", "b", "strong", "td", "th"]):
+            if "narrative" in tag.get_text(strip=True).lower():
+                # Берём следующий контент после заголовка
+                sibling = tag.find_next(["p", "td", "div"])
+                if sibling:
+                    candidate = _squash(sibling.get_text(" ", strip=True))
+                    if len(candidate) >= 30:
+                        narrative = candidate
+                        break
+
+        # Если не нашли явный narrative — собираем параграфы
+        if not narrative:
+            parts = []
+            for node in soup.select("p"):
+                text = _squash(node.get_text(" ", strip=True))
+                if len(text) >= 40:
+                    parts.append(text)
+            narrative = "\n".join(parts[:5]).strip()
+
+        return IncidentDetail.from_fields(title, fields, narrative)
+
+    @staticmethod
+    def _parse_table_rows(soup: Any) -> list[dict[str, str]]:
+        incidents = []
+        rows = soup.select("table.hp tr") or soup.select("table.list tr") or soup.select("table tr")
+        for row in rows:
+            cols = row.find_all("td")
+            if len(cols) < 4:
+                continue
+            anchor = row.find("a", href=True)
+            if not anchor:
+                continue
+            source_url = absolute_url(anchor.get("href", ""))
+            title = _squash(cols[3].get_text(" ", strip=True))
+            date_text = cols[0].get_text(" ", strip=True)
+            location = cols[1].get_text(" ", strip=True)
+            aircraft = cols[2].get_text(" ", strip=True)
+            if not any([title, date_text, location, aircraft]):
+                continue
+            incidents.append(_list_row(title, date_text, location, aircraft, source_url))
+        return incidents
+
+    @staticmethod
+    def _parse_incident_links(soup: Any) -> list[dict[str, str]]:
+        incidents = []
+        seen_urls: set[str] = set()
+        for anchor in soup.find_all("a", href=True):
+            href = anchor.get("href", "")
+            if not is_incident_link(href):
+                continue
+            source_url = absolute_url(href)
+            if source_url in seen_urls:
+                continue
+            seen_urls.add(source_url)
+            title = _squash(anchor.get_text(" ", strip=True))
+            if not title:
+                continue
+            incidents.append(_list_row(title, "", "", "", source_url))
+        return incidents
+
+
+PARSER_BACKENDS = {"lxml": LxmlParser, "bs4": SoupParser}
+
+
+def make_parser(backend: str = "lxml") -> AsnParser:
+    try:
+        return PARSER_BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(f"unknown ASN parser backend: {backend!r} (expected one of {sorted(PARSER_BACKENDS)})")
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+"""
+Ограничение частоты запросов к одному хосту (вежливость к ASN).
+
+Раньше задержка была глобальным time.sleep() между инцидентами и блокировала
+весь цикл. Теперь каждый поток резервирует себе слот на конкретном хосте:
+запросы к aviation-safety.net идут не чаще раза в min_interval секунд,
+а запросы к другим хостам (LLM, Telegram, фото) не ждут вовсе.
+"""
+
+import threading
+import time
+from typing import Callable
+from urllib.parse import urlsplit
+
+
+class HostRateLimiter:
+    def __init__(
+        self,
+        min_interval_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._interval = max(0.0, min_interval_seconds)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next_slot: dict[str, float] = {}
+
+    def wait(self, url: str) -> float:
+        """
+        Блокирует текущий поток до наступления слота для хоста из url.
+        Возвращает фактическую задержку в секундах.
+        """
+        host = urlsplit(url).netloc.lower()
+        if not host or self._interval <= 0:
+            return 0.0
+
+        # Резервируем слот под локом, а спим уже без него,
+        # чтобы потоки к другим хостам не ждали друг друга.
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self._interval
+
+        delay = slot - now
+        if delay > 0:
+            self._sleep(delay)
+        return max(delay, 0.0)
@@ -51,6 +51,47 @@ class Settings:
     date_window_days: int
     log_level: str                   # fix #4: уровень логирования
     json_logs: bool                  # fix #4: JSON-формат логов
+    # Параллелизм стадий конвейера process_once
+    detail_concurrency: int = 2
+    rewrite_concurrency: int = 3
+    photo_concurrency: int = 3
+    # Общий HTTP-пул для всех исходящих клиентов
+    http_max_connections: int = 20
+    http_max_connections_per_host: int = 4
+    http_keepalive_seconds: float = 30.0
+    http2: bool = True
+    db_pool_size: int = 5            # PostgreSQL: максимум соединений в пуле
+    repository_flush_every: int = 10  # сколько инцидентов копить в одной транзакции
+    asn_parser_backend: str = "lxml"  # lxml | bs4 — разбор страниц ASN
+    asn_streaming: bool = True       # потоковый разбор ленты с ранней остановкой
+    asn_stop_after_known: int = 3    # сколько известных строк подряд завершают чтение ленты
+    asn_fetch_mode: str = "sequential"  # sequential | merge | hedge — опрос ASN_FEED_URLS
+    asn_source_deadline_seconds: float = 20.0  # таймаут запроса к одной ленте
+    detail_cache_ttl_hours: float = 24.0  # сколько детальная страница считается свежей
+    detail_cache_max_entries: int = 2000  # 0 — кэш детальных страниц выключен
+    rewrite_cache_ttl_hours: float = 168.0  # сколько живёт закэшированный ответ LLM
+    rewrite_cache_max_entries: int = 1000   # 0 — кэш рерайтов выключен
+    photo_cache_hit_ttl_hours: float = 720.0  # сколько помним найденное фото
+    photo_cache_miss_ttl_hours: float = 24.0  # сколько помним, что фото нет
+    photo_cache_max_entries: int = 5000       # 0 — кэш поиска фото выключен
+    # Предохранитель LLM и переключение между DeepSeek и OpenRouter
+    llm_failover: bool = True
+    llm_breaker_failure_rate: float = 0.5   # доля ошибок/медленных ответов в окне для размыкания
+    llm_breaker_window: int = 10            # сколько последних вызовов учитывать
+    llm_breaker_min_calls: int = 4          # меньше вызовов в окне — цепь не размыкается
+    llm_breaker_slow_call_seconds: float = 20.0  # ответ дольше считается неудачей
+    llm_breaker_open_seconds: float = 120.0  # пауза до пробного запроса
+    llm_streaming: bool = True               # SSE-поток с обрывом по лимиту слов и дедлайну
+    llm_stream_deadline_seconds: float = 30.0  # общий дедлайн потокового ответа
+    llm_stream_abort_words: int = 700          # обрыв «разогнавшейся» генерации (2×MAX_WORDS)
+    llm_stream_read_timeout_seconds: float = 15.0  # максимум ожидания первого/очередного токена
+    llm_hedge: bool = False                  # дублировать медленный запрос второму провайдеру
+    llm_hedge_delay_seconds: float = 10.0    # фора основному, пока нет статистики его p90
+    llm_batch_max_items: int = 1             # >1 — пакетный рерайт до N инцидентов за запрос
+    llm_batch_token_budget: int = 4000       # оценка токенов данных инцидентов в одном пакете
+    llm_batch_linger_seconds: float = 2.0    # сколько ждать, пока пакет наберётся
+    llm_structured_output: bool = False      # JSON с полями поста, текст собирается локально
+    llm_prompt_token_budget: int = 0         # >0 — один пример и сжатый нарратив в пределах бюджета
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -79,4 +120,42 @@ class Settings:
             date_window_days=int(os.getenv("DATE_WINDOW_DAYS", "1")),
             log_level=os.getenv("LOG_LEVEL", "INFO").upper(),               # fix #4
             json_logs=_parse_bool("LOG_FORMAT_JSON", False),                # fix #4
+            detail_concurrency=int(os.getenv("PIPELINE_DETAIL_CONCURRENCY", "2")),
+            rewrite_concurrency=int(os.getenv("PIPELINE_REWRITE_CONCURRENCY", "3")),
+            photo_concurrency=int(os.getenv("PIPELINE_PHOTO_CONCURRENCY", "3")),
+            http_max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+            http_max_connections_per_host=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "4")),
+            http_keepalive_seconds=float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30")),
+            http2=_parse_bool("HTTP2", True),
+            db_pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            repository_flush_every=int(os.getenv("REPOSITORY_FLUSH_EVERY", "10")),
+            asn_parser_backend=os.getenv("ASN_PARSER_BACKEND", "lxml").strip().lower(),
+            asn_streaming=_parse_bool("ASN_STREAMING", True),
+            asn_stop_after_known=int(os.getenv("ASN_STOP_AFTER_KNOWN", "3")),
+            asn_fetch_mode=os.getenv("ASN_FETCH_MODE", "sequential").strip().lower(),
+            asn_source_deadline_seconds=float(os.getenv("ASN_SOURCE_DEADLINE_SECONDS", "20")),
+            detail_cache_ttl_hours=float(os.getenv("DETAIL_CACHE_TTL_HOURS", "24")),
+            detail_cache_max_entries=int(os.getenv("DETAIL_CACHE_MAX_ENTRIES", "2000")),
+            rewrite_cache_ttl_hours=float(os.getenv("REWRITE_CACHE_TTL_HOURS", "168")),
+            rewrite_cache_max_entries=int(os.getenv("REWRITE_CACHE_MAX_ENTRIES", "1000")),
+            photo_cache_hit_ttl_hours=float(os.getenv("PHOTO_CACHE_HIT_TTL_HOURS", "720")),
+            photo_cache_miss_ttl_hours=float(os.getenv("PHOTO_CACHE_MISS_TTL_HOURS", "24")),
+            photo_cache_max_entries=int(os.getenv("PHOTO_CACHE_MAX_ENTRIES", "5000")),
+            llm_failover=_parse_bool("LLM_FAILOVER", True),
+            llm_breaker_failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            llm_breaker_window=int(os.getenv("LLM_BREAKER_WINDOW", "10")),
+            llm_breaker_min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "4")),
+            llm_breaker_slow_call_seconds=float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "20")),
+            llm_breaker_open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "120")),
+            llm_streaming=_parse_bool("LLM_STREAMING", True),
+            llm_stream_deadline_seconds=float(os.getenv("LLM_STREAM_DEADLINE_SECONDS", "30")),
+            llm_stream_abort_words=int(os.getenv("LLM_STREAM_ABORT_WORDS", "700")),
+            llm_stream_read_timeout_seconds=float(os.getenv("LLM_STREAM_READ_TIMEOUT_SECONDS", "15")),
+            llm_hedge=_parse_bool("LLM_HEDGE", False),
+            llm_hedge_delay_seconds=float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "10")),
+            llm_batch_max_items=int(os.getenv("LLM_BATCH_MAX_ITEMS", "1")),
+            llm_batch_token_budget=int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "4000")),
+            llm_batch_linger_seconds=float(os.getenv("LLM_BATCH_LINGER_SECONDS", "2")),
+            llm_structured_output=_parse_bool("LLM_STRUCTURED_OUTPUT", False),
+            llm_prompt_token_budget=int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "0")),
         )
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+"""
+Разбор дат инцидентов ASN.
+
+Используется и фильтром по окну дат в process_once, и репозиторием
+для типизированной колонки incident_date.
+
+Частые формы ASN разбираются одним заранее скомпилированным regex и
+таблицей месяцев; остальное уходит в прежний перебор strptime. Результаты
+кэшируются по исходной строке.
+"""
+
+import re
+from datetime import date, datetime, time
+from functools import lru_cache
+from typing import NamedTuple
+
+
+def normalize_date_string(text: str) -> str:
+    """
+    Нормализует строку даты перед парсингом.
+    Заменяет 'GMT' на '+0000' для корректной кросс-платформенной обработки (fix #7).
+    """
+    return text.replace(" GMT", " +0000").strip()
+
+
+class IncidentMoment(NamedTuple):
+    """Дата инцидента и время суток, если оно есть в строке."""
+    day: date | None
+    time_of_day: time | None
+
+
+_NO_MOMENT = IncidentMoment(None, None)
+
+# Английские названия месяцев (C-локаль strptime): сокращения и полные
+_MONTHS = {
+    name.lower(): number
+    for number, names in enumerate(
+        [("Jan", "January"), ("Feb", "February"), ("Mar", "March"), ("Apr", "April"),
+         ("May", "May"), ("Jun", "June"), ("Jul", "July"), ("Aug", "August"),
+         ("Sep", "September"), ("Oct", "October"), ("Nov", "November"), ("Dec", "December")],
+        start=1,
+    )
+    for name in names
+}
+
+# "24 Feb 2026", "Tue, 24 Feb 2026 10:00:00 +0000", "Saturday 15 January 2026, 12:05 UTC".
+# До дня нет цифр — значит, это та же подстрока, что нашёл бы fallback-regex ниже.
+_DAY_MONTH_YEAR_RE = re.compile(r"\D*?([0-9]{1,2})\s+([A-Za-z]{3,9})\s+([0-9]{4})(.*)", re.DOTALL)
+_ISO_RE = re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})")
+_TIME_RE = re.compile(r",?\s+([0-9]{1,2}):([0-9]{2})(?::([0-9]{2}))?")
+_FALLBACK_RE = re.compile(r"(\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4})")
+
+
+@lru_cache(maxsize=4096)
+def parse_incident_moment(value: str) -> IncidentMoment:
+    """
+    Разбор строки даты ASN с памятью: одна и та же строка из списка,
+    детальной страницы и репозитория разбирается один раз.
+    """
+    text = normalize_date_string(value or "")
+    if not text:
+        return _NO_MOMENT
+    return _parse_fast(text) or IncidentMoment(_parse_strptime(text), None)
+
+
+def parse_incident_date(value: str) -> date | None:
+    return parse_incident_moment(value).day
+
+
+def _parse_fast(text: str) -> IncidentMoment | None:
+    """
+    Разбор частых форм ASN одним regex и таблицей месяцев.
+    None — форма не распознана или значения невалидны; тогда решает
+    _parse_strptime, поэтому результат всегда совпадает с ним.
+    """
+    m = _DAY_MONTH_YEAR_RE.match(text)
+    if m:
+        month = _MONTHS.get(m.group(2).lower())
+        if month is None:
+            return None
+        try:
+            day = date(int(m.group(3)), month, int(m.group(1)))
+        except ValueError:
+            return None
+        return IncidentMoment(day, _time_prefix(m.group(4)))
+
+    m = _ISO_RE.fullmatch(text)
+    if m:
+        try:
+            return IncidentMoment(date(int(m.group(1)), int(m.group(2)), int(m.group(3))), None)
+        except ValueError:
+            return None
+    return None
+
+
+def _time_prefix(rest: str) -> time | None:
+    m = _TIME_RE.match(rest)
+    if not m:
+        return None
+    try:
+        return time(int(m.group(1)), int(m.group(2)), int(m.group(3) or 0))
+    except ValueError:
+        return None
+
+
+def _parse_strptime(text: str) -> date | None:
+    """Прежний разбор перебором strptime — для форм, которые не взял _parse_fast."""
+    formats = [
+        "%d %b %Y",
+        "%d %B %Y",
+        "%Y-%m-%d",
+        "%a, %d %b %Y %H:%M:%S %z",   # RFC 2822 с +0000 (fix #7)
+        "%a, %d %b %Y %H:%M:%S GMT",  # fallback на случай если нормализация не сработала
+    ]
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+
+    # Fallback: извлечь подстроку вида '24 Feb 2026'
+    m = _FALLBACK_RE.search(text)
+    if m:
+        for fmt in ("%d %b %Y", "%d %B %Y"):
+            try:
+                return datetime.strptime(m.group(1), fmt).date()
+            except ValueError:
+                pass
+
+    return None
@@ -15,6 +15,9 @@ class Incident:
     persons_onboard: str
     summary: str
     source_url: str
+    # Заполняются с детальной страницы ASN (в RSS и таблице их нет)
+    registration: str = ""
+    fatalities: str = ""
 
 
 @dataclass(frozen=True)
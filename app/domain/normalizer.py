@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import hashlib
+import re
 from typing import Any
 
 from app.domain.models import Incident
@@ -12,6 +13,26 @@ def _safe_text(value: Any) -> str:
     return str(value).strip()
 
 
+_REGISTRATION_SUFFIX_RE = re.compile(r"\s*\(борт\s+([^)]+)\)\s*$")
+
+
+def split_aircraft(aircraft: str) -> tuple[str, str]:
+    """
+    Разделяет строку ВС, обогащённую детальным парсером, на тип и регистрацию:
+    'Piper PA-28-151 (борт N85RW)' -> ('Piper PA-28-151', 'N85RW').
+    """
+    m = _REGISTRATION_SUFFIX_RE.search(aircraft)
+    if not m:
+        return aircraft.strip(), ""
+    return aircraft[:m.start()].strip(), m.group(1).strip()
+
+
+def parse_count(value: str) -> int | None:
+    """Число людей из строки вида '150' или '2 (+1 on ground)'; иначе None."""
+    m = re.match(r"\s*(\d+)", value or "")
+    return int(m.group(1)) if m else None
+
+
 def build_incident_id(date_utc: str, aircraft: str, location: str, source_url: str) -> str:
     """
     Если есть source_url — хэшируем только его (стабильный идентификатор).
@@ -42,4 +63,6 @@ def normalize_incident(raw: dict[str, Any]) -> Incident:
         persons_onboard=_safe_text(raw.get("persons_onboard")),
         summary=_safe_text(raw.get("summary")),
         source_url=source_url,
+        registration=_safe_text(raw.get("registration")),
+        fatalities=_safe_text(raw.get("fatalities")),
     )
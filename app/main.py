@@ -1,28 +1,40 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import logging
-import re
 import time
 from dataclasses import dataclass, field
-from datetime import date, datetime, timedelta, timezone
-
-from app.ai.deepseek_client import DeepSeekClient
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from app.ai.batch import RewriteBatcher
+from app.ai.circuit_breaker import CircuitBreaker
+from app.ai.deepseek_client import DeepSeekClient, RewriteResult
+from app.ai.failover import FailoverRewriter
+from app.ai.prompt_builder import PromptBuilder
+from app.ai.rewrite_cache import RewriteCache
 from app.ai.validator import validate_fallback, validate_rewrite
 from app.bootstrap import load_dotenv
 from app.collector.aviation_safety import AviationSafetyCollector
+from app.collector.detail_cache import DetailPageCache
+from app.collector.rate_limit import HostRateLimiter
 from app.config import Settings
+from app.domain.dates import parse_incident_date as _parse_incident_date
 from app.domain.models import Incident
 from app.domain.normalizer import normalize_incident
 from app.observability.health import start_health_ticker, touch_health
 from app.observability.logging import setup_logging
+from app.photos.cache import PhotoLookupCache
 from app.photos.finder import PhotoFinder
+from app.pipeline.engine import Stage, StageOutcome, StagePipeline
 from app.publisher.telegram_client import TelegramPublisher
-from app.storage.repository import IncidentRepository
+from app.storage.repository import DRY_RUN_SKIP_MARKER, IncidentRepository
+from app.transport.http import HttpTransport
 
 logger = logging.getLogger("avia_bot")
 
-# Задержка между HTTP-запросами к ASN для избежания блокировки (fix #3)
+# Минимальный интервал между HTTP-запросами к одному хосту ASN (fix #3)
 ASN_REQUEST_DELAY_SECONDS = 1.5
 
 # Порог числа подряд идущих ошибок для отправки алерта (fix #8)
@@ -40,12 +52,28 @@ class CycleStats:
     skipped_dry_run: int = 0
     failed: int = 0
     consecutive_failures: int = 0
+    limit_reached: bool = False
+    # Кэш рерайтов: промахи — реальные вызовы API, saved_* — цена сэкономленных вызовов
+    rewrite_cache_hits: int = 0
+    rewrite_cache_misses: int = 0
+    rewrite_saved_ms: float = 0.0
+    rewrite_saved_tokens: int = 0
+    # Рерайты, исправленные repair_rewrite вместо повторного запроса к LLM
+    rewrite_repaired: int = 0
+
+    @property
+    def rewrite_cache_hit_ratio(self) -> float:
+        total = self.rewrite_cache_hits + self.rewrite_cache_misses
+        return self.rewrite_cache_hits / total if total else 0.0
 
     def summary(self) -> str:
         return (
             f"fetched={self.fetched} | new={self.new} | published={self.published} | "
             f"skipped_dedup={self.skipped_dedup} | skipped_date={self.skipped_date} | "
-            f"skipped_dry_run={self.skipped_dry_run} | failed={self.failed}"
+            f"skipped_dry_run={self.skipped_dry_run} | failed={self.failed} | "
+            f"rewrite_cache_hit_ratio={self.rewrite_cache_hit_ratio:.2f} | "
+            f"rewrite_saved_ms={self.rewrite_saved_ms:.0f} | rewrite_saved_tokens={self.rewrite_saved_tokens} | "
+            f"rewrite_repaired={self.rewrite_repaired}"
         )
 
 
@@ -61,50 +89,14 @@ def _merge_with_details(incident: Incident, details: dict[str, str]) -> Incident
         location=details.get("location") or incident.location,
         aircraft=details.get("aircraft") or incident.aircraft,
         operator=details.get("operator") or incident.operator,
-        persons_onboard=incident.persons_onboard,
+        persons_onboard=details.get("persons_onboard") or incident.persons_onboard,
         summary=details.get("summary") or incident.summary,
         source_url=incident.source_url,
+        registration=details.get("registration") or incident.registration,
+        fatalities=details.get("fatalities") or incident.fatalities,
     )
 
 
-def _normalize_date_string(text: str) -> str:
-    """
-    Нормализует строку даты перед парсингом.
-    Заменяет 'GMT' на '+0000' для корректной кросс-платформенной обработки (fix #7).
-    """
-    return text.replace(" GMT", " +0000").strip()
-
-
-def _parse_incident_date(value: str) -> date | None:
-    text = _normalize_date_string(value or "")
-    if not text:
-        return None
-
-    formats = [
-        "%d %b %Y",
-        "%d %B %Y",
-        "%Y-%m-%d",
-        "%a, %d %b %Y %H:%M:%S %z",   # RFC 2822 с +0000 (fix #7)
-        "%a, %d %b %Y %H:%M:%S GMT",  # fallback на случай если нормализация не сработала
-    ]
-    for fmt in formats:
-        try:
-            return datetime.strptime(text, fmt).date()
-        except ValueError:
-            continue
-
-    # Fallback: извлечь подстроку вида '24 Feb 2026'
-    m = re.search(r"(\d{1,2}\s+[A-Za-z]{3,9}\s+\d{4})", text)
-    if m:
-        for fmt in ("%d %b %Y", "%d %B %Y"):
-            try:
-                return datetime.strptime(m.group(1), fmt).date()
-            except ValueError:
-                pass
-
-    return None
-
-
 def _is_recent_incident(incident: Incident, days_back: int) -> bool:
     return _is_recent_date_value(incident.date_utc, days_back)
 
@@ -119,108 +111,311 @@ def _is_recent_date_value(date_value: str, days_back: int) -> bool:
     return earliest <= incident_day <= today
 
 
-def _build_rewriter(settings: Settings) -> DeepSeekClient:
-    provider_mode = settings.llm_provider
+def _build_transport(settings: Settings) -> HttpTransport:
+    return HttpTransport(
+        max_connections=settings.http_max_connections,
+        max_connections_per_host=settings.http_max_connections_per_host,
+        keepalive_expiry=settings.http_keepalive_seconds,
+        http2=settings.http2,
+    )
 
-    if provider_mode == "auto":
-        provider_mode = "openrouter" if settings.openrouter_api_key else "deepseek"
 
-    if provider_mode == "openrouter":
-        api_key = settings.openrouter_api_key
-        model = settings.openrouter_model
-        base_url = settings.openrouter_base_url
+def _provider_config(settings: Settings, provider_name: str) -> tuple[str, str, str, dict[str, str]]:
+    """api_key, model, base_url и заголовки провайдера."""
+    if provider_name == "openrouter":
         extra_headers = {
             "HTTP-Referer": settings.openrouter_site_url,
             "X-Title": settings.openrouter_app_name,
         }
-        provider_name = "openrouter"
-        if not api_key:
-            logger.warning("LLM_PROVIDER=openrouter, но OPENROUTER_API_KEY пуст. Будет использован fallback-рерайт.")
-    else:
-        api_key = settings.deepseek_api_key
-        model = settings.deepseek_model
-        base_url = settings.deepseek_base_url
-        extra_headers = {}
-        provider_name = "deepseek"
+        return settings.openrouter_api_key, settings.openrouter_model, settings.openrouter_base_url, extra_headers
+    return settings.deepseek_api_key, settings.deepseek_model, settings.deepseek_base_url, {}
+
+
+def _build_rewriter(
+    settings: Settings,
+    transport: HttpTransport | None = None,
+    repository: IncidentRepository | None = None,
+) -> DeepSeekClient | FailoverRewriter:
+    provider_mode = settings.llm_provider
+
+    if provider_mode == "auto":
+        provider_mode = "openrouter" if settings.openrouter_api_key else "deepseek"
+
+    provider_name = "openrouter" if provider_mode == "openrouter" else "deepseek"
+    api_key, model, base_url, _ = _provider_config(settings, provider_name)
+    if provider_name == "openrouter" and not api_key:
+        logger.warning("LLM_PROVIDER=openrouter, но OPENROUTER_API_KEY пуст. Будет использован fallback-рерайт.")
+
+    # Резервный провайдер — второй из известных, если для него задан ключ
+    providers = [provider_name]
+    standby = "deepseek" if provider_name == "openrouter" else "openrouter"
+    if settings.llm_failover and _provider_config(settings, standby)[0]:
+        providers.append(standby)
 
     logger.info(
-        "LLM provider mode: %s -> active: %s | model: %s | base_url: %s",
+        "LLM provider mode: %s -> active: %s | model: %s | base_url: %s | failover: %s",
         settings.llm_provider,
         provider_name,
         model,
         base_url,
+        ",".join(providers[1:]) or "-",
     )
 
-    return DeepSeekClient(
-        api_key=api_key,
-        model=model,
-        base_url=base_url,
-        provider_name=provider_name,
-        extra_headers=extra_headers,
-    )
+    cache = None
+    if repository is not None and settings.rewrite_cache_max_entries > 0:
+        cache = RewriteCache(
+            repository,
+            ttl_seconds=settings.rewrite_cache_ttl_hours * 3600,
+            max_entries=settings.rewrite_cache_max_entries,
+        )
+
+    prompt_builder = None
+    if settings.llm_prompt_token_budget > 0:
+        prompt_builder = PromptBuilder(settings.llm_prompt_token_budget)
+
+    clients = []
+    for name in providers:
+        api_key, model, base_url, extra_headers = _provider_config(settings, name)
+        breaker = CircuitBreaker(
+            name,
+            failure_rate=settings.llm_breaker_failure_rate,
+            window=settings.llm_breaker_window,
+            min_calls=settings.llm_breaker_min_calls,
+            slow_call_ms=settings.llm_breaker_slow_call_seconds * 1000,
+            open_seconds=settings.llm_breaker_open_seconds,
+        )
+        clients.append(DeepSeekClient(
+            api_key=api_key,
+            model=model,
+            base_url=base_url,
+            provider_name=name,
+            extra_headers=extra_headers,
+            transport=transport,
+            cache=cache,
+            breaker=breaker,
+            streaming=settings.llm_streaming,
+            stream_deadline_seconds=settings.llm_stream_deadline_seconds,
+            stream_abort_words=settings.llm_stream_abort_words,
+            stream_read_timeout_seconds=settings.llm_stream_read_timeout_seconds,
+            usage_store=repository,
+            structured_output=settings.llm_structured_output,
+            prompt_builder=prompt_builder,
+        ))
+
+    if len(clients) == 1:
+        return clients[0]
+    return FailoverRewriter(clients, hedge=settings.llm_hedge, hedge_delay_seconds=settings.llm_hedge_delay_seconds)
 
 
-def process_once(settings: Settings) -> CycleStats:
-    collector = AviationSafetyCollector(settings.user_agent, settings.asn_feed_urls)
-    repository = IncidentRepository(settings.database_url)
-    rewriter = _build_rewriter(settings)
-    photo_finder = PhotoFinder(user_agent=settings.user_agent)
+@dataclass
+class _IncidentJob:
+    """Состояние одного инцидента по мере прохождения стадий конвейера."""
+    incident: Incident
+    skip_reason: str = ""            # dedup | list_date | detail_date
+    rewrite: RewriteResult | None = None
+    photo_url: str | None = None
+
+
+def _prefilter(
+    incidents: list[Incident],
+    unseen: set[str],
+    settings: Settings,
+) -> Iterator[_IncidentJob]:
+    """Дешёвые проверки без сети: дедупликация (unseen — ещё не виденные ID) и дата из списка."""
+    queued: set[str] = set()
+
+    for incident in incidents:
+        job = _IncidentJob(incident=incident)
+        # Повтор того же ID в ленте тоже дубль: первый экземпляр ещё в работе
+        if incident.incident_id not in unseen or incident.incident_id in queued:
+            job.skip_reason = "dedup"
+        # Быстрый pre-filter по дате из списка (без загрузки детальной страницы)
+        elif incident.date_utc and not _is_recent_date_value(incident.date_utc, settings.date_window_days):
+            job.skip_reason = "list_date"
+        else:
+            queued.add(incident.incident_id)
+        yield job
+
+
+def _fetch_feed(
+    collector: AviationSafetyCollector,
+    known_ids: frozenset[str],
+    settings: Settings,
+) -> list[dict[str, Any]]:
+    """Строки ленты: потоково до первой серии известных ID (known_ids) или целиком."""
+    # Слияние и хеджирование сравнивают ленты целиком — потоковый режим только для sequential
+    if not settings.asn_streaming or settings.asn_fetch_mode != "sequential":
+        return collector.fetch_recent_incidents()
+
+    def _is_known(raw: dict[str, Any]) -> bool:
+        # Проверка в памяти: запрос к БД на каждую строку ленты свёл бы на нет пакетный filter_unseen
+        return normalize_incident(raw).incident_id in known_ids
+
+    return list(collector.iter_recent_incidents(_is_known, settings.asn_stop_after_known))
+
+
+def process_once(
+    settings: Settings,
+    transport: HttpTransport | None = None,
+    repository: IncidentRepository | None = None,
+    rewriter: DeepSeekClient | FailoverRewriter | None = None,
+) -> CycleStats:
+    """
+    rewriter из run_forever живёт между циклами: иначе предохранители и окно
+    задержек LLM обнулялись бы каждый цикл из 1–3 инцидентов.
+    """
+    if repository is None:
+        repository = IncidentRepository(settings.database_url, pool_size=settings.db_pool_size)
+
+    # Без внешнего транспорта (--once) пул живёт один цикл
+    if transport is not None:
+        return asyncio.run(_process_once_async(settings, transport, repository, rewriter))
+
+    transport = _build_transport(settings)
+    try:
+        return asyncio.run(_process_once_async(settings, transport, repository, rewriter))
+    finally:
+        transport.log_stats()
+        transport.close()
+
+
+async def _process_once_async(
+    settings: Settings,
+    transport: HttpTransport,
+    repository: IncidentRepository,
+    rewriter: DeepSeekClient | FailoverRewriter | None = None,
+) -> CycleStats:
+    detail_cache = None
+    if settings.detail_cache_max_entries > 0:
+        detail_cache = DetailPageCache(
+            repository,
+            ttl_seconds=settings.detail_cache_ttl_hours * 3600,
+            max_entries=settings.detail_cache_max_entries,
+        )
+    collector = AviationSafetyCollector(
+        settings.user_agent,
+        settings.asn_feed_urls,
+        rate_limiter=HostRateLimiter(ASN_REQUEST_DELAY_SECONDS),
+        transport=transport,
+        feed_state=repository,
+        parser_backend=settings.asn_parser_backend,
+        fetch_mode=settings.asn_fetch_mode,
+        source_deadline_seconds=settings.asn_source_deadline_seconds,
+        detail_cache=detail_cache,
+    )
+    if rewriter is None:
+        rewriter = _build_rewriter(settings, transport, repository)
+    batcher = None
+    if settings.llm_batch_max_items > 1:
+        batcher = RewriteBatcher(
+            rewriter,
+            max_items=settings.llm_batch_max_items,
+            token_budget=settings.llm_batch_token_budget,
+            linger_seconds=settings.llm_batch_linger_seconds,
+        )
+    photo_cache = None
+    if settings.photo_cache_max_entries > 0:
+        photo_cache = PhotoLookupCache(
+            repository,
+            hit_ttl_seconds=settings.photo_cache_hit_ttl_hours * 3600,
+            miss_ttl_seconds=settings.photo_cache_miss_ttl_hours * 3600,
+            max_entries=settings.photo_cache_max_entries,
+        )
+    photo_finder = PhotoFinder(user_agent=settings.user_agent, transport=transport, cache=photo_cache)
     publisher = TelegramPublisher(
         settings.telegram_bot_token,
         settings.telegram_channel,
         alert_chat_id=settings.telegram_alert_chat_id,  # fix #8
+        transport=transport,
     )
 
     stats = CycleStats()
 
-    raw_items = collector.fetch_recent_incidents()
+    known_ids = frozenset()
+    if settings.asn_streaming and settings.asn_fetch_mode == "sequential":
+        known_ids = await asyncio.to_thread(repository.known_ids)
+    raw_items = await asyncio.to_thread(_fetch_feed, collector, known_ids, settings)
     stats.fetched = len(raw_items)
     logger.info("fetched %d candidate incidents", stats.fetched)
+    collector.log_source_stats()
+
+    # Стадии выполняются параллельно, блокирующие клиенты уходят в пул потоков.
+    # Per-host лимит на ASN соблюдается внутри коллектора.
+    async def _details(job: _IncidentJob) -> _IncidentJob:
+        if job.skip_reason:
+            return job
+        details = await asyncio.to_thread(collector.fetch_incident_details, job.incident.source_url)
+        job.incident = _merge_with_details(job.incident, details)
+        if not _is_recent_incident(job.incident, settings.date_window_days):
+            job.skip_reason = "detail_date"
+        return job
+
+    async def _rewrite(job: _IncidentJob) -> _IncidentJob:
+        if job.skip_reason:
+            return job
+        if batcher is not None:
+            job.rewrite = await batcher.rewrite(job.incident)
+        else:
+            job.rewrite = await asyncio.to_thread(rewriter.rewrite, job.incident)
+        if job.rewrite.cached:
+            stats.rewrite_cache_hits += 1
+            stats.rewrite_saved_ms += job.rewrite.latency_ms
+            stats.rewrite_saved_tokens += job.rewrite.tokens
+        elif not job.rewrite.is_fallback:
+            stats.rewrite_cache_misses += 1
+        return job
+
+    async def _photo(job: _IncidentJob) -> _IncidentJob:
+        if job.skip_reason or settings.dry_run:
+            return job
+        # Ищем фото борта или модели ВС; без поля registration борт ищется в строке модели «(борт N85RW)»
+        job.photo_url = await asyncio.to_thread(
+            photo_finder.find_photo,
+            registration=job.incident.registration or job.incident.aircraft,
+            aircraft_model=job.incident.aircraft,
+        )
+        return job
 
-    for raw in raw_items:
+    async def _publish(outcome: StageOutcome[_IncidentJob]) -> bool:
+        # Вызывается строго в порядке ленты: здесь вся работа с БД,
+        # публикация и статистика — как в последовательной версии.
         if stats.published >= settings.max_publications_per_cycle:
             logger.info("publication limit reached for cycle: %d", settings.max_publications_per_cycle)
-            break
+            stats.limit_reached = True
+            return False
 
-        incident = normalize_incident(raw)
+        job = outcome.item
+        incident = job.incident
 
-        if repository.exists(incident.incident_id):
+        if job.skip_reason == "dedup":
             stats.skipped_dedup += 1
-            continue
-
-        # Быстрый pre-filter по дате из списка (без загрузки детальной страницы)
-        if incident.date_utc and not _is_recent_date_value(incident.date_utc, settings.date_window_days):
-            logger.info(
-                "skip by list date | id=%s date=%s",
-                incident.incident_id,
-                incident.date_utc,
-            )
-            stats.skipped_date += 1
-            continue
-
-        # Rate limiting между запросами к ASN (fix #3)
-        time.sleep(ASN_REQUEST_DELAY_SECONDS)
-
-        details = collector.fetch_incident_details(incident.source_url)
-        incident = _merge_with_details(incident, details)
-
-        if not _is_recent_incident(incident, settings.date_window_days):
+            return True
+        if job.skip_reason in ("list_date", "detail_date"):
             logger.info(
-                "skip by detail date | id=%s date=%s",
+                "skip by %s date | id=%s date=%s",
+                "list" if job.skip_reason == "list_date" else "detail",
                 incident.incident_id,
                 incident.date_utc,
             )
             stats.skipped_date += 1
-            continue
+            return True
 
         stats.new += 1
-        repository.save_discovered(incident)
+        # Записи uow (сброс пачки, commit) — в потоке: медленный fsync или ожидание
+        # соединения пула не должны останавливать рерайт и поиск фото
+        await asyncio.to_thread(uow.save_discovered, incident)
 
         try:
-            rewritten = rewriter.rewrite_incident(incident)
+            if outcome.error is not None:
+                raise outcome.error
+
+            rewritten = job.rewrite.text
+            # repair_rewrite применяет клиент LLM к ответу API до проверки и кэширования
+            if job.rewrite.repairs:
+                stats.rewrite_repaired += 1
 
             # Определяем, был ли использован fallback (fix #6)
-            is_fallback = not rewriter.is_api_rewrite_available()
+            is_fallback = job.rewrite.is_fallback
             validator_fn = validate_fallback if is_fallback else validate_rewrite
             valid, reason = validator_fn(rewritten)
 
@@ -235,43 +430,75 @@ def process_once(settings: Settings) -> CycleStats:
             # DRY_RUN: обрабатываем без публикации.
             # ВНИМАНИЕ: incident_id сохраняется в БД со статусом 'skipped'.
             # При следующем запуске без DRY_RUN этот инцидент НЕ будет опубликован,
-            # так как exists() вернёт True.
+            # так как filter_unseen считает статус 'skipped' терминальным.
             # Для сброса используйте --dry-run-reset или удалите запись из БД вручную. (fix #10)
             if settings.dry_run:
                 logger.info("DRY_RUN=true, skip publish | id=%s", incident.incident_id)
-                repository.mark_skipped(incident.incident_id, "dry_run_skip_publish")
+                await asyncio.to_thread(uow.mark_skipped, incident.incident_id, DRY_RUN_SKIP_MARKER)
                 stats.skipped_dry_run += 1
-                continue
+                return True
 
-            # Ищем фото борта или модели ВС
-            photo_url = photo_finder.find_photo(
-                registration=incident.aircraft,
-                aircraft_model=incident.aircraft,
-            )
-            if photo_url:
+            if job.photo_url:
                 logger.info("photo found | id=%s", incident.incident_id)
 
-            publisher.publish(rewritten, photo_url=photo_url)
-            repository.mark_published(incident.incident_id, rewritten)
+            await asyncio.to_thread(publisher.publish, rewritten, photo_url=job.photo_url)
+            await asyncio.to_thread(uow.mark_published, incident.incident_id, rewritten)
             stats.published += 1
             stats.consecutive_failures = 0
             logger.info("published | id=%s", incident.incident_id)
 
         except Exception as exc:  # noqa: BLE001
             logger.exception("failed to process incident | id=%s error=%s", incident.incident_id, exc)
-            repository.mark_failed(incident.incident_id, str(exc))
+            await asyncio.to_thread(uow.mark_failed, incident.incident_id, str(exc))
             stats.failed += 1
             stats.consecutive_failures += 1
 
             # Алерт при серии ошибок (fix #8)
             if stats.consecutive_failures >= ALERT_CONSECUTIVE_FAILURES_THRESHOLD:
-                publisher.send_alert(
+                await asyncio.to_thread(
+                    publisher.send_alert,
                     f"⚠️ {stats.consecutive_failures} подряд идущих ошибок публикации.\n"
-                    f"Последняя: `{exc}`"
+                    f"Последняя: `{exc}`",
                 )
 
+        return True
+
+    pipeline = StagePipeline(
+        [
+            Stage("details", _details, settings.detail_concurrency),
+            # В пакетном режиме воркеров не меньше размера пакета, иначе он не наберётся
+            Stage("rewrite", _rewrite, max(settings.rewrite_concurrency, settings.llm_batch_max_items)),
+            Stage("photo", _photo, settings.photo_concurrency),
+        ],
+        # Не готовим больше инцидентов, чем можем опубликовать за цикл
+        max_in_flight=settings.max_publications_per_cycle,
+    )
+    # Переходы состояний пишутся пачками; published фиксируется сразу после публикации
+    uow = repository.unit_of_work(flush_every=settings.repository_flush_every)
+    try:
+        incidents = [normalize_incident(raw) for raw in raw_items]
+        # Одна пачка на весь список вместо запроса к БД на каждую строку; в потоке — не держим цикл событий
+        unseen = set(await asyncio.to_thread(
+            repository.filter_unseen, [incident.incident_id for incident in incidents],
+        ))
+        await pipeline.run(_prefilter(incidents, unseen, settings), _publish)
+    finally:
+        # Как UnitOfWork.__exit__, но последний commit тоже вне цикла событий
+        await asyncio.to_thread(uow.flush)
+
+    # Валидаторы ленты фиксируем, только если ничего не осталось на следующий цикл
+    if stats.failed == 0 and not stats.limit_reached:
+        collector.commit_feed_state()
+
     # Итоговая статистика цикла (fix #9)
     logger.info("cycle complete | %s", stats.summary())
+    if detail_cache is not None:
+        detail_cache.log_stats()
+    photo_finder.log_stats()
+    repository.latency.log(logger, "repository")
+    rewriter.log_stats()
+    if batcher is not None:
+        batcher.log_stats()
 
     return stats
 
@@ -292,15 +519,23 @@ def run_forever(settings: Settings) -> None:
 
     start_health_ticker()  # fix #5: health check для Docker
 
+    # Один пул соединений и один репозиторий (с тёплым индексом ID) на весь процесс
+    transport = _build_transport(settings)
+    repository = IncidentRepository(settings.database_url, pool_size=settings.db_pool_size)
+    # Предохранители и статистика задержек LLM должны переживать цикл опроса
+    rewriter = _build_rewriter(settings, transport, repository)
+
     publisher = TelegramPublisher(
         settings.telegram_bot_token,
         settings.telegram_channel,
         alert_chat_id=settings.telegram_alert_chat_id,
+        transport=transport,
     )
 
     while True:
         try:
-            process_once(settings)
+            process_once(settings, transport=transport, repository=repository, rewriter=rewriter)
+            transport.log_stats()
             consecutive_cycle_failures = 0
             touch_health()  # fix #5: обновляем health-файл после успешного цикла
         except Exception as exc:  # noqa: BLE001
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+"""
+Лёгкие in-process метрики латентности.
+
+Без внешних зависимостей: храним последние N замеров на операцию
+и отдаём перцентили в лог. Используется репозиторием и сетевыми клиентами.
+"""
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class LatencySummary:
+    count: int
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 500) -> None:
+        self._window = window
+        self._samples: dict[str, deque[float]] = {}
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self._window)
+            samples.append(seconds * 1000.0)
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def summary(self, name: str) -> LatencySummary | None:
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+            count = self._counts.get(name, 0)
+        if not samples:
+            return None
+        return LatencySummary(
+            count=count,
+            p50_ms=_percentile(samples, 0.50),
+            p90_ms=_percentile(samples, 0.90),
+            p99_ms=_percentile(samples, 0.99),
+            max_ms=samples[-1],
+        )
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return sorted(self._samples)
+
+    def log(self, logger: logging.Logger, prefix: str) -> None:
+        for name in self.names():
+            s = self.summary(name)
+            if s is None:
+                continue
+            logger.info(
+                "%s latency | op=%s count=%d p50=%.1fms p90=%.1fms p99=%.1fms max=%.1fms",
+                prefix, name, s.count, s.p50_ms, s.p90_ms, s.p99_ms, s.max_ms,
+            )
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+"""
+Кэш поиска фото ВС.
+
+Одни и те же регистрации и особенно модели (Cessna 172, Piper PA-28,
+Boeing 737) встречаются постоянно, а PhotoFinder каждый раз ходит в
+Planespotters и Wikimedia Commons с таймаутом 10 с. Кэш хранит результат
+поиска в таблице photo_cache по ключу «источник:нормализованный ключ»
+(регистрация для Planespotters, _simplify_model для Wikimedia):
+
+- найденное фото живёт hit_ttl_seconds;
+- «фото нет» запоминается на более короткий miss_ttl_seconds — фото
+  могут загрузить позже;
+- ошибки запроса (5xx, таймауты) не кэшируются; 404 Planespotters —
+  это «фото нет», а не ошибка;
+- сверх max_entries вытесняются давно не читанные записи (LRU).
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoLookupStore(Protocol):
+    """Хранилище результатов поиска (реализуется IncidentRepository)."""
+
+    def get_photo_lookup(self, lookup_key: str) -> dict[str, Any] | None: ...
+
+    def save_photo_lookup(self, lookup_key: str, source: str, photo_url: str, max_entries: int = 0) -> None: ...
+
+
+def photo_lookup_key(source: str, key: str) -> str:
+    return f"{source}:{' '.join(key.split()).lower()}"
+
+
+@dataclass(frozen=True)
+class CachedPhoto:
+    url: str | None          # None — негативная запись: у источника фото нет
+
+
+@dataclass
+class PhotoCacheStats:
+    hits: int = 0            # найденное фото из кэша, запроса не было
+    negative_hits: int = 0   # «фото нет» из кэша, запроса не было
+    misses: int = 0          # записи нет или устарела — запрос к источнику
+
+
+class PhotoLookupCache:
+    def __init__(
+        self,
+        store: PhotoLookupStore,
+        hit_ttl_seconds: float,
+        miss_ttl_seconds: float,
+        max_entries: int,
+    ) -> None:
+        self._store = store
+        self._hit_ttl = max(0.0, hit_ttl_seconds)
+        self._miss_ttl = max(0.0, miss_ttl_seconds)
+        self._max_entries = max(0, max_entries)
+        self._stats: dict[str, PhotoCacheStats] = {}
+        self._lock = threading.Lock()
+
+    def get(self, source: str, key: str) -> CachedPhoto | None:
+        try:
+            row = self._store.get_photo_lookup(photo_lookup_key(source, key))
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("photo cache read failed: %s", exc)
+            row = None
+        if row is not None:
+            url = row.get("photo_url") or ""
+            ttl = self._hit_ttl if url else self._miss_ttl
+            if time.time() - float(row["fetched_at"]) < ttl:
+                self._count(source, "hits" if url else "negative_hits")
+                return CachedPhoto(url=url or None)
+        self._count(source, "misses")
+        return None
+
+    def put(self, source: str, key: str, url: str | None) -> None:
+        try:
+            self._store.save_photo_lookup(photo_lookup_key(source, key), source, url or "", self._max_entries)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("photo cache write failed: %s", exc)
+
+    def stats(self) -> dict[str, PhotoCacheStats]:
+        with self._lock:
+            return {source: PhotoCacheStats(**vars(s)) for source, s in self._stats.items()}
+
+    def log_stats(self) -> None:
+        for source, s in sorted(self.stats().items()):
+            logger.info(
+                "photo cache | source=%s hits=%d negative_hits=%d misses=%d",
+                source, s.hits, s.negative_hits, s.misses,
+            )
+
+    def _count(self, source: str, name: str) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(source, PhotoCacheStats())
+            setattr(stats, name, getattr(stats, name) + 1)
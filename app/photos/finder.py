@@ -7,14 +7,21 @@ from __future__ import annotations
 1. Planespotters.net API — фото конкретного борта по регистрации (N85RW)
 2. Wikimedia Commons API — generic фото модели ВС (Piper PA-28)
 3. None — если ничего не найдено, публикуем без фото
+
+С PhotoLookupCache результаты обоих источников (и отсутствие фото)
+запоминаются, повторный поиск того же борта или модели идёт без запросов.
 """
 
 import logging
 import re
 import urllib.parse
+from typing import Any, Callable
 
 import httpx
 
+from app.photos.cache import PhotoLookupCache
+from app.transport.http import HttpTransport
+
 logger = logging.getLogger(__name__)
 
 # Planespotters отдаёт фото конкретного борта по регистрации
@@ -26,10 +33,20 @@ _WIKIMEDIA_SEARCH_URL = "https://commons.wikimedia.org/w/api.php"
 # User-Agent обязателен для Wikimedia API
 _USER_AGENT = "avia_bot/1.0 (https://github.com/sgmy7777/avia_bot)"
 
+PLANESPOTTERS = "planespotters"
+WIKIMEDIA = "wikimedia"
+
 
 class PhotoFinder:
-    def __init__(self, user_agent: str = _USER_AGENT) -> None:
+    def __init__(
+        self,
+        user_agent: str = _USER_AGENT,
+        transport: HttpTransport | None = None,
+        cache: PhotoLookupCache | None = None,
+    ) -> None:
         self._headers = {"User-Agent": user_agent}
+        self._transport = transport
+        self._cache = cache
 
     def find_photo(self, registration: str, aircraft_model: str) -> str | None:
         """
@@ -44,14 +61,17 @@ class PhotoFinder:
 
         # 1. Пробуем Planespotters по регистрации
         if reg:
-            url = self._planespotters(reg)
+            url = self._lookup(PLANESPOTTERS, reg.upper(), self._planespotters)
             if url:
                 logger.info("photo found on planespotters | reg=%s", reg)
                 return url
 
         # 2. Пробуем Wikimedia по модели ВС
-        if aircraft_model:
-            url = self._wikimedia(aircraft_model)
+        # Упрощаем модель для лучшего поиска
+        # "Piper PA-28-151 Cherokee Warrior (борт N85RW)" -> "Piper PA-28 Cherokee"
+        query = self._simplify_model(aircraft_model) if aircraft_model else ""
+        if query:
+            url = self._lookup(WIKIMEDIA, query, self._wikimedia)
             if url:
                 logger.info("photo found on wikimedia | model=%s", aircraft_model)
                 return url
@@ -59,76 +79,88 @@ class PhotoFinder:
         logger.info("no photo found | reg=%s model=%s", reg, aircraft_model)
         return None
 
-    def _planespotters(self, registration: str) -> str | None:
-        try:
-            url = _PLANESPOTTERS_URL.format(reg=registration.upper())
-            with httpx.Client(headers=self._headers, timeout=10.0) as client:
-                resp = client.get(url)
-                resp.raise_for_status()
-                data = resp.json()
-
-            photos = data.get("photos", [])
-            if not photos:
-                return None
-
-            # Берём первое фото, предпочитаем medium или large
-            photo = photos[0]
-            thumbnail = photo.get("thumbnail_large", {})
-            src = thumbnail.get("src") or photo.get("thumbnail", {}).get("src")
-            return src or None
+    def log_stats(self) -> None:
+        if self._cache is not None:
+            self._cache.log_stats()
 
+    def _lookup(self, source: str, key: str, fetch: Callable[[str], str | None]) -> str | None:
+        if self._cache is not None:
+            cached = self._cache.get(source, key)
+            if cached is not None:
+                return cached.url
+        try:
+            url = fetch(key)
         except Exception as exc:  # noqa: BLE001
-            logger.debug("planespotters error for %s: %s", registration, exc)
+            # Ошибку (таймаут, 5xx) не кэшируем: это не ответ «фото нет»
+            logger.debug("%s error for %s: %s", source, key, exc)
             return None
+        if self._cache is not None:
+            self._cache.put(source, key, url)
+        return url
 
-    def _wikimedia(self, aircraft_model: str) -> str | None:
-        try:
-            # Упрощаем модель для лучшего поиска
-            # "Piper PA-28-151 Cherokee Warrior (борт N85RW)" -> "Piper PA-28 Cherokee"
-            query = self._simplify_model(aircraft_model)
-            if not query:
-                return None
-
-            params = {
-                "action": "query",
-                "format": "json",
-                "generator": "search",
-                "gsrnamespace": "6",  # File namespace
-                "gsrsearch": f"{query} aircraft",
-                "gsrlimit": "5",
-                "prop": "imageinfo",
-                "iiprop": "url|mime",
-                "iiurlwidth": "800",
-            }
-
-            with httpx.Client(headers=self._headers, timeout=10.0) as client:
-                resp = client.get(_WIKIMEDIA_SEARCH_URL, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-
-            pages = data.get("query", {}).get("pages", {})
-            if not pages:
+    def _planespotters(self, registration: str) -> str | None:
+        url = _PLANESPOTTERS_URL.format(reg=registration.upper())
+        with self._client() as client:
+            resp = client.get(url)
+            # 404 — Planespotters не знает борт: это ответ «фото нет», его кэшируем.
+            # 5xx и сетевые ошибки поднимаются и не кэшируются
+            if resp.status_code == 404:
                 return None
+            resp.raise_for_status()
+            data = resp.json()
 
-            for page in pages.values():
-                imageinfo = page.get("imageinfo", [])
-                if not imageinfo:
-                    continue
-                info = imageinfo[0]
-                mime = info.get("mime", "")
-                # Только JPEG и PNG, без SVG и иконок
-                if mime not in ("image/jpeg", "image/png"):
-                    continue
-                url = info.get("thumburl") or info.get("url")
-                if url:
-                    return url
-
+        photos = data.get("photos", [])
+        if not photos:
             return None
 
-        except Exception as exc:  # noqa: BLE001
-            logger.debug("wikimedia error for %s: %s", aircraft_model, exc)
+        # Берём первое фото, предпочитаем medium или large
+        photo = photos[0]
+        thumbnail = photo.get("thumbnail_large", {})
+        src = thumbnail.get("src") or photo.get("thumbnail", {}).get("src")
+        return src or None
+
+    def _wikimedia(self, query: str) -> str | None:
+        params = {
+            "action": "query",
+            "format": "json",
+            "generator": "search",
+            "gsrnamespace": "6",  # File namespace
+            "gsrsearch": f"{query} aircraft",
+            "gsrlimit": "5",
+            "prop": "imageinfo",
+            "iiprop": "url|mime",
+            "iiurlwidth": "800",
+        }
+
+        with self._client() as client:
+            resp = client.get(_WIKIMEDIA_SEARCH_URL, params=params)
+            resp.raise_for_status()
+            data = resp.json()
+
+        pages = data.get("query", {}).get("pages", {})
+        if not pages:
             return None
 
+        for page in pages.values():
+            imageinfo = page.get("imageinfo", [])
+            if not imageinfo:
+                continue
+            info = imageinfo[0]
+            mime = info.get("mime", "")
+            # Только JPEG и PNG, без SVG и иконок
+            if mime not in ("image/jpeg", "image/png"):
+                continue
+            url = info.get("thumburl") or info.get("url")
+            if url:
+                return url
+
+        return None
+
+    def _client(self) -> Any:
+        if self._transport is not None:
+            return self._transport.session(headers=self._headers, timeout=10.0)
+        return httpx.Client(headers=self._headers, timeout=10.0)
+
     @staticmethod
     def _extract_registration(text: str) -> str:
         """Извлекает регистрацию из строки вида 'Piper PA-28 (борт N85RW)'."""
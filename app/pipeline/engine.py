@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+"""
+Конвейер обработки инцидентов на asyncio.
+
+Каждая стадия — пул из N воркеров, читающих свою asyncio.Queue и пишущих
+в очередь следующей стадии. Пока LLM переписывает инцидент #1, для #2 уже
+грузится детальная страница, а для #3 ищется фото.
+
+Результаты отдаются потребителю строго в исходном порядке: стадии могут
+завершаться вразнобой, но consume() вызывается для seq=0, 1, 2, ...
+Это сохраняет детерминированный порядок публикаций и лимит на цикл:
+как только consume() вернул False, конвейер останавливается.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, Iterable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_END = object()
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    concurrency: int = 1
+
+
+@dataclass(frozen=True)
+class StageOutcome(Generic[T]):
+    """Итог прохода элемента через конвейер: результат или исключение стадии."""
+    item: T
+    error: BaseException | None = None
+    failed_stage: str = ""
+
+
+class StagePipeline:
+    def __init__(self, stages: list[Stage], max_in_flight: int) -> None:
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+        self._stages = stages
+        self._max_in_flight = max(1, max_in_flight)
+
+    async def run(
+        self,
+        items: Iterable[Any],
+        consume: Callable[[StageOutcome[Any]], Awaitable[bool]],
+    ) -> int:
+        """
+        Прогоняет items через стадии и вызывает consume() в исходном порядке.
+        consume() возвращает False, чтобы остановить конвейер (например, лимит публикаций).
+        Возвращает число обработанных потребителем элементов.
+        """
+        loop = asyncio.get_running_loop()
+        results: dict[int, asyncio.Future] = {}
+
+        def _slot(seq: int) -> asyncio.Future:
+            fut = results.get(seq)
+            if fut is None:
+                fut = results[seq] = loop.create_future()
+            return fut
+
+        # Окно элементов «в полёте» ограничивает лишнюю работу после остановки.
+        window = asyncio.Semaphore(self._max_in_flight)
+        queues: list[asyncio.Queue] = [asyncio.Queue() for _ in self._stages]
+
+        async def _feed() -> None:
+            seq = 0
+            for item in items:
+                await window.acquire()
+                _slot(seq)
+                await queues[0].put((seq, item))
+                seq += 1
+            _slot(seq).set_result(_END)
+
+        async def _work(index: int) -> None:
+            stage = self._stages[index]
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            while True:
+                seq, item = await inbox.get()
+                try:
+                    result = await stage.handler(item)
+                except Exception as exc:  # noqa: BLE001
+                    _slot(seq).set_result(StageOutcome(item=item, error=exc, failed_stage=stage.name))
+                else:
+                    if outbox is None:
+                        _slot(seq).set_result(StageOutcome(item=result))
+                    else:
+                        await outbox.put((seq, result))
+                finally:
+                    inbox.task_done()
+
+        tasks = [asyncio.create_task(_feed(), name="pipeline-feed")]
+        for index, stage in enumerate(self._stages):
+            for n in range(max(1, stage.concurrency)):
+                tasks.append(asyncio.create_task(_work(index), name=f"pipeline-{stage.name}-{n}"))
+
+        consumed = 0
+        try:
+            seq = 0
+            while True:
+                slot = _slot(seq)
+                feeder = tasks[0]
+                # Если генератор items упал — пробрасываем ошибку, а не ждём вечно.
+                await asyncio.wait({slot, feeder}, return_when=asyncio.FIRST_COMPLETED)
+                if not slot.done():
+                    feeder.result()
+                    await slot
+                outcome = slot.result()
+                if outcome is _END:
+                    break
+                consumed += 1
+                keep_going = await consume(outcome)
+                window.release()
+                results.pop(seq, None)
+                seq += 1
+                if not keep_going:
+                    logger.debug("pipeline stopped by consumer at seq=%d", seq)
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return consumed
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
 import logging
+from typing import Any
 
 import httpx
 
+from app.transport.http import HttpTransport
+
 logger = logging.getLogger(__name__)
 
 
 class TelegramPublisher:
-    def __init__(self, bot_token: str, channel: str, alert_chat_id: str = "") -> None:
+    def __init__(
+        self,
+        bot_token: str,
+        channel: str,
+        alert_chat_id: str = "",
+        transport: HttpTransport | None = None,
+    ) -> None:
         self._bot_token = bot_token
         self._channel = channel
         self._alert_chat_id = alert_chat_id
+        self._transport = transport
 
     def publish(self, text: str, photo_url: str | None = None) -> None:
         if not self._bot_token:
@@ -54,7 +64,7 @@ class TelegramPublisher:
             "parse_mode": "Markdown",
         }
 
-        with httpx.Client(timeout=30.0) as client:
+        with self._client(timeout=30.0) as client:
             response = client.post(url, json=payload)
 
             if response.is_success:
@@ -74,7 +84,7 @@ class TelegramPublisher:
         self,
         chat_id: str,
         text: str,
-        client: httpx.Client | None = None,
+        client: Any = None,
     ) -> None:
         url = f"https://api.telegram.org/bot{self._bot_token}/sendMessage"
         payload = {
@@ -84,10 +94,10 @@ class TelegramPublisher:
             "disable_web_page_preview": True,
         }
 
-        def _post(c: httpx.Client) -> httpx.Response:
+        def _post(c: Any) -> httpx.Response:
             return c.post(url, json=payload)
 
-        def _post_no_parse(c: httpx.Client) -> httpx.Response:
+        def _post_no_parse(c: Any) -> httpx.Response:
             return c.post(url, json={
                 "chat_id": chat_id,
                 "text": text,
@@ -104,7 +114,7 @@ class TelegramPublisher:
                 if response.is_success:
                     return
         else:
-            with httpx.Client(timeout=20.0) as c:
+            with self._client(timeout=20.0) as c:
                 response = _post(c)
                 if response.is_success:
                     return
@@ -121,6 +131,11 @@ class TelegramPublisher:
             f"status={response.status_code}; chat_id={chat_id}; details={details}"
         )
 
+    def _client(self, timeout: float) -> Any:
+        if self._transport is not None:
+            return self._transport.session(timeout=timeout)
+        return httpx.Client(timeout=timeout)
+
     @staticmethod
     def _extract_telegram_error(response: httpx.Response) -> str:
         try:
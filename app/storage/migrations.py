@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+"""
+Версионные миграции схемы для SQLite и PostgreSQL.
+
+Раньше _ensure_schema выполнял CREATE TABLE IF NOT EXISTS и ALTER TABLE
+(с проглатыванием исключений) при каждом создании репозитория. Теперь:
+
+- таблица schema_version хранит применённые версии;
+- migrate() вызывается один раз при старте; если схема актуальна —
+  это один SELECT без DDL и без блокировок;
+- в PostgreSQL миграции выполняются под pg_advisory_xact_lock,
+  чтобы реплики не применяли их одновременно.
+
+Все миграции идемпотентны: существующие базы без schema_version
+(созданные старым _ensure_schema) проходят их без ошибок.
+Новая миграция — новый элемент в конце MIGRATIONS с версией на 1 больше.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable
+
+from app.domain.dates import parse_incident_date
+from app.domain.normalizer import split_aircraft
+
+if TYPE_CHECKING:
+    from app.storage.repository import IncidentRepository
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory lock: произвольная константа, одинаковая для всех реплик
+_PG_MIGRATION_LOCK_KEY = 0x61766961  # "avia"
+
+DRY_RUN_SKIP_MARKER = "dry_run_skip_publish"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[["IncidentRepository", Any], None]
+
+
+def typed_incident_fields(
+    date_utc: str, aircraft: str, registration: str
+) -> tuple[str | None, str | None, str | None]:
+    """(incident_date ISO, registration, aircraft_type) для типизированных колонок."""
+    parsed = parse_incident_date(date_utc)
+    aircraft_type, suffix_registration = split_aircraft(aircraft)
+    return (
+        parsed.isoformat() if parsed else None,
+        registration or suffix_registration or None,
+        aircraft_type or None,
+    )
+
+
+def _columns(repo: "IncidentRepository", cur: Any, table: str) -> set[str]:
+    if repo._is_pg:
+        cur.execute(
+            """SELECT column_name FROM information_schema.columns
+               WHERE table_schema = current_schema() AND table_name = %s""",
+            (table,),
+        )
+        return {row["column_name"] for row in repo._fetchall(cur)}
+    cur.execute(f"PRAGMA table_info({table})")
+    return {row["name"] for row in repo._fetchall(cur)}
+
+
+def _add_missing_columns(repo: "IncidentRepository", cur: Any, table: str, columns: list[tuple[str, str]]) -> list[str]:
+    existing = _columns(repo, cur, table)
+    added = []
+    for col, definition in columns:
+        if col not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {col} {definition}")
+            added.append(col)
+    return added
+
+
+def _create_incidents(repo: "IncidentRepository", cur: Any) -> None:
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS incidents (
+            incident_id     TEXT    PRIMARY KEY,
+            title           TEXT    NOT NULL,
+            date_utc        TEXT,
+            location        TEXT,
+            aircraft        TEXT,
+            source_url      TEXT,
+            rewrite_text    TEXT,
+            status          TEXT    NOT NULL,
+            first_seen_at   TEXT    NOT NULL,
+            published_at    TEXT,
+            retry_count     INTEGER NOT NULL DEFAULT 0,
+            last_error      TEXT
+        )
+    """)
+    # Базы, созданные до появления ретраев
+    _add_missing_columns(repo, cur, "incidents", [
+        ("retry_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("last_error", "TEXT"),
+    ])
+
+
+def _create_feed_state(repo: "IncidentRepository", cur: Any) -> None:
+    # Валидаторы HTTP-кэша для лент ASN (ETag / Last-Modified / хэш тела)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS feed_state (
+            feed_url        TEXT    PRIMARY KEY,
+            etag            TEXT,
+            last_modified   TEXT,
+            body_hash       TEXT,
+            updated_at      TEXT    NOT NULL
+        )
+    """)
+
+
+def _typed_incident_columns(repo: "IncidentRepository", cur: Any) -> None:
+    # Типизированные колонки: дата как DATE, а не свободный текст, и поля ВС.
+    added = _add_missing_columns(repo, cur, "incidents", [
+        ("incident_date", "DATE" if repo._is_pg else "TEXT"),
+        ("registration", "TEXT"),
+        ("aircraft_type", "TEXT"),
+        ("fatalities", "INTEGER"),
+        ("persons_onboard", "INTEGER"),
+    ])
+    if not added:
+        return
+
+    # Backfill уже сохранённых строк тем же разбором, что и save_discovered
+    ph = repo._ph()
+    cur.execute("SELECT incident_id, date_utc, aircraft FROM incidents")
+    rows = []
+    for row in repo._fetchall(cur):
+        incident_date, registration, aircraft_type = typed_incident_fields(
+            row["date_utc"] or "", row["aircraft"] or "", ""
+        )
+        rows.append((incident_date, registration, aircraft_type, row["incident_id"]))
+    repo._executemany(
+        cur,
+        f"""UPDATE incidents SET incident_date = {ph}, registration = {ph}, aircraft_type = {ph}
+            WHERE incident_id = {ph}""",
+        rows,
+    )
+
+
+def _incident_indexes(repo: "IncidentRepository", cur: Any) -> None:
+    # Индексы под get_stats, reset_dry_run_skipped, выборки по окну дат и по борту.
+    # Частичные индексы поддерживают и SQLite, и PostgreSQL.
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents (status)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_first_seen_at ON incidents (first_seen_at)",
+        """CREATE INDEX IF NOT EXISTS idx_incidents_incident_date ON incidents (incident_date)
+           WHERE incident_date IS NOT NULL""",
+        """CREATE INDEX IF NOT EXISTS idx_incidents_registration ON incidents (registration)
+           WHERE registration IS NOT NULL""",
+        f"""CREATE INDEX IF NOT EXISTS idx_incidents_dry_run ON incidents (incident_id)
+           WHERE status = 'skipped' AND rewrite_text = '{DRY_RUN_SKIP_MARKER}'""",
+        """CREATE INDEX IF NOT EXISTS idx_incidents_failed ON incidents (retry_count)
+           WHERE status = 'failed'""",
+    ):
+        cur.execute(statement)
+
+
+def _feed_high_water_mark(repo: "IncidentRepository", cur: Any) -> None:
+    # Самая новая строка ленты на момент последнего чистого цикла (потоковый режим)
+    _add_missing_columns(repo, cur, "feed_state", [("high_water_mark", "TEXT")])
+
+
+def _create_detail_cache(repo: "IncidentRepository", cur: Any) -> None:
+    # Сжатые детальные страницы ASN: TTL по fetched_at, LRU-вытеснение по accessed_at
+    blob, real = ("BYTEA", "DOUBLE PRECISION") if repo._is_pg else ("BLOB", "REAL")
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS detail_cache (
+            source_url      TEXT    PRIMARY KEY,
+            body            {blob}  NOT NULL,
+            etag            TEXT,
+            last_modified   TEXT,
+            fetched_at      {real}  NOT NULL,
+            accessed_at     {real}  NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_detail_cache_accessed_at ON detail_cache (accessed_at)")
+
+
+def _create_rewrite_cache(repo: "IncidentRepository", cur: Any) -> None:
+    # Ответы LLM по хэшу промпта; latency_ms и tokens — цена исходного вызова
+    real = "DOUBLE PRECISION" if repo._is_pg else "REAL"
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS rewrite_cache (
+            cache_key       TEXT    PRIMARY KEY,
+            provider        TEXT    NOT NULL,
+            model           TEXT    NOT NULL,
+            rewrite_text    TEXT    NOT NULL,
+            latency_ms      {real}  NOT NULL DEFAULT 0,
+            tokens          INTEGER NOT NULL DEFAULT 0,
+            created_at      {real}  NOT NULL,
+            accessed_at     {real}  NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_rewrite_cache_accessed_at ON rewrite_cache (accessed_at)")
+
+
+def _create_llm_calls(repo: "IncidentRepository", cur: Any) -> None:
+    # Учёт вызовов LLM: токены (в т.ч. из кэша префикса у провайдера) и задержка
+    real = "DOUBLE PRECISION" if repo._is_pg else "REAL"
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS llm_calls (
+            called_at           {real}  NOT NULL,
+            provider            TEXT    NOT NULL,
+            model               TEXT    NOT NULL,
+            incident_id         TEXT    NOT NULL DEFAULT '',
+            prompt_tokens       INTEGER NOT NULL DEFAULT 0,
+            cached_tokens       INTEGER NOT NULL DEFAULT 0,
+            completion_tokens   INTEGER NOT NULL DEFAULT 0,
+            latency_ms          {real}  NOT NULL DEFAULT 0,
+            ttft_ms             {real}  NOT NULL DEFAULT 0
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_calls_called_at ON llm_calls (called_at)")
+
+
+def _create_photo_cache(repo: "IncidentRepository", cur: Any) -> None:
+    # Результаты поиска фото по источнику и ключу; пустой photo_url — «фото нет» (негативная запись)
+    real = "DOUBLE PRECISION" if repo._is_pg else "REAL"
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS photo_cache (
+            lookup_key      TEXT    PRIMARY KEY,
+            source          TEXT    NOT NULL,
+            photo_url       TEXT    NOT NULL DEFAULT '',
+            fetched_at      {real}  NOT NULL,
+            accessed_at     {real}  NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_photo_cache_accessed_at ON photo_cache (accessed_at)")
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "create_incidents", _create_incidents),
+    Migration(2, "create_feed_state", _create_feed_state),
+    Migration(3, "typed_incident_columns", _typed_incident_columns),
+    Migration(4, "incident_indexes", _incident_indexes),
+    Migration(5, "feed_high_water_mark", _feed_high_water_mark),
+    Migration(6, "create_detail_cache", _create_detail_cache),
+    Migration(7, "create_rewrite_cache", _create_rewrite_cache),
+    Migration(8, "create_llm_calls", _create_llm_calls),
+    Migration(9, "create_photo_cache", _create_photo_cache),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _current_version(repo: "IncidentRepository", cur: Any) -> int:
+    if repo._is_pg:
+        cur.execute("SELECT to_regclass('schema_version') IS NOT NULL AS present")
+    else:
+        cur.execute(
+            "SELECT COUNT(*) AS present FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        )
+    if not repo._fetchone(cur)["present"]:
+        return 0
+    cur.execute("SELECT MAX(version) AS version FROM schema_version")
+    row = repo._fetchone(cur)
+    return (row or {}).get("version") or 0
+
+
+def migrate(repo: "IncidentRepository") -> int:
+    """Применяет недостающие миграции. Возвращает число применённых."""
+    with repo._conn("schema_check") as conn:
+        current = _current_version(repo, conn.cursor())
+    if current >= LATEST_VERSION:
+        return 0
+
+    ph = repo._ph()
+    applied = 0
+    with repo._conn("migrate") as conn:
+        cur = conn.cursor()
+        if repo._is_pg:
+            # Снимается автоматически при commit/rollback
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_PG_MIGRATION_LOCK_KEY,))
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version     INTEGER PRIMARY KEY,
+                name        TEXT    NOT NULL,
+                applied_at  TEXT    NOT NULL
+            )
+        """)
+        # Повторная проверка под локом: другая реплика могла успеть раньше
+        current = _current_version(repo, cur)
+        for migration in MIGRATIONS:
+            if migration.version <= current:
+                continue
+            logger.info("applying schema migration | version=%d name=%s", migration.version, migration.name)
+            migration.apply(repo, cur)
+            cur.execute(
+                f"INSERT INTO schema_version (version, name, applied_at) VALUES ({ph},{ph},{ph})",
+                (migration.version, migration.name, datetime.now(timezone.utc).isoformat()),
+            )
+            applied += 1
+    return applied
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+"""
+Общий HTTP-транспорт для всех исходящих клиентов.
+
+Раньше каждый запрос создавал и закрывал свой httpx.Client, то есть платил
+за новый TCP- и TLS-handshake. HttpTransport создаётся один раз в run_forever
+и раздаётся коллектору, LLM-клиенту, поиску фото и Telegram:
+
+- keep-alive пул соединений (httpx.Limits);
+- лимит параллельных запросов на хост (семафор поверх пула); слот ждём
+  не дольше pool-таймаута запроса, затем httpx.PoolTimeout;
+- HTTP/2, если установлен пакет h2 (иначе — HTTP/1.1 без ошибок);
+- сжатие ответов (Accept-Encoding по доступным декодерам).
+
+Через trace-расширение httpcore считаем по каждому хосту запросы,
+новые TCP-соединения и TLS-handshake'и — видно, сколько экономит пул.
+"""
+
+import importlib.util
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _accept_encoding() -> str:
+    encodings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        encodings.append("br")
+    return ", ".join(encodings)
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    connections: int = 0     # новые TCP-соединения
+    tls_handshakes: int = 0
+    errors: int = 0
+
+    @property
+    def reused(self) -> int:
+        """Сколько запросов ушло по уже открытому соединению."""
+        return max(0, self.requests - self.connections)
+
+
+class HttpTransport:
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_connections_per_host: int = 4,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+    ) -> None:
+        self._http2 = http2 and _http2_available()
+        if http2 and not self._http2:
+            logger.info("http2 disabled: package 'h2' is not installed")
+        self._client = httpx.Client(
+            http2=self._http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            headers={"Accept-Encoding": _accept_encoding()},
+        )
+        self._per_host = max(1, max_connections_per_host)
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._stats: dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def session(
+        self,
+        timeout: float,
+        headers: dict[str, str] | None = None,
+        follow_redirects: bool = False,
+    ) -> "HttpSession":
+        """Лёгкая обёртка с настройками конкретного клиента поверх общего пула."""
+        return HttpSession(self, timeout=timeout, headers=headers or {}, follow_redirects=follow_redirects)
+
+    def stats(self) -> dict[str, HostStats]:
+        with self._lock:
+            return {host: HostStats(**vars(s)) for host, s in self._stats.items()}
+
+    def log_stats(self) -> None:
+        for host, s in sorted(self.stats().items()):
+            logger.info(
+                "http transport | host=%s requests=%d connections=%d tls_handshakes=%d reused=%d errors=%d",
+                host, s.requests, s.connections, s.tls_handshakes, s.reused, s.errors,
+            )
+
+    def close(self) -> None:
+        self._client.close()
+
+    def _host_stats(self, host: str) -> HostStats:
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats[host] = HostStats()
+        return stats
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self._per_host)
+            return slot
+
+    def _trace_for(self, host: str):
+        def _trace(event: str, info: dict[str, Any]) -> None:
+            if event == "connection.connect_tcp.complete":
+                with self._lock:
+                    self._host_stats(host).connections += 1
+            elif event == "connection.start_tls.complete":
+                with self._lock:
+                    self._host_stats(host).tls_handshakes += 1
+        return _trace
+
+    def _record(self, host: str, ok: bool) -> None:
+        with self._lock:
+            stats = self._host_stats(host)
+            stats.requests += 1
+            if not ok:
+                stats.errors += 1
+
+    @contextmanager
+    def _send(self, method: str, url: str, stream: bool, **kwargs: Any) -> Iterator[httpx.Response]:
+        host = urlsplit(url).netloc.lower()
+        extensions = {"trace": self._trace_for(host)}
+        slot = self._slot(host)
+        # Без таймаута зависший хост держал бы все слоты, а остальные ждали бы вечно
+        wait = httpx.Timeout(kwargs.get("timeout", self._client.timeout)).pool
+        if not slot.acquire(timeout=wait):
+            self._record(host, ok=False)
+            raise httpx.PoolTimeout(
+                f"no free slot for {host} within {wait:g}s",
+                request=self._client.build_request(method, url),
+            )
+        ok = False
+        try:
+            if stream:
+                with self._client.stream(method, url, extensions=extensions, **kwargs) as response:
+                    ok = True
+                    yield response
+            else:
+                response = self._client.request(method, url, extensions=extensions, **kwargs)
+                ok = True
+                yield response
+        finally:
+            slot.release()
+            self._record(host, ok)
+
+
+class HttpSession:
+    """
+    Интерфейс как у httpx.Client (get/post/stream + контекстный менеджер),
+    чтобы клиенты работали одинаково с общим пулом и без него.
+    Выход из контекста пул не закрывает.
+    """
+
+    def __init__(
+        self,
+        transport: HttpTransport,
+        timeout: float,
+        headers: dict[str, str],
+        follow_redirects: bool,
+    ) -> None:
+        self._transport = transport
+        self._timeout = timeout
+        self._headers = headers
+        self._follow_redirects = follow_redirects
+
+    def __enter__(self) -> "HttpSession":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        return None
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        with self._transport._send(method, url, stream=False, **self._options(kwargs)) as response:
+            return response
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs: Any) -> Iterator[httpx.Response]:
+        with self._transport._send(method, url, stream=True, **self._options(kwargs)) as response:
+            yield response
+
+    def _options(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        headers = {**self._headers, **(kwargs.pop("headers", None) or {})}
+        kwargs.setdefault("timeout", self._timeout)
+        kwargs.setdefault("follow_redirects", self._follow_redirects)
+        return {"headers": headers, **kwargs}
@@ -0,0 +1,202 @@
+"""
+Микро-бенчмарк горячих путей разбора и нормализации ASN.
+
+    python benchmarks/hot_paths.py [--repeat 200] [--backend lxml]
+        [--output results.json] [--baseline benchmarks/baseline.json] [--tolerance 0.25]
+        [--min-delta-us 2.0] [--min-delta-kib 16]
+
+Фикстуры — benchmarks/fixtures/asn (см. record_fixtures.py). Для каждого
+случая: пропускная способность (вызовов/с), перцентили времени вызова
+и пиковая память (tracemalloc) одного прохода по входам.
+
+Результат пишется в JSON. С --baseline каждый случай сравнивается с
+сохранённым прогоном: если p50 или пиковая память выросли больше чем на
+--tolerance, случай помечается как регрессия и скрипт выходит с кодом 1.
+Для микросекундных случаев относительный рост — это шум таймера
+(1.3 -> 1.8 мкс — уже +38%), поэтому регрессией считается только рост
+больше --min-delta-us мкс для p50 и --min-delta-kib КиБ для памяти.
+Новую базу записывает --output benchmarks/baseline.json.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.collector.aviation_safety import AviationSafetyCollector  # noqa: E402
+from app.domain.dates import (  # noqa: E402
+    _parse_fast,
+    _parse_strptime,
+    normalize_date_string,
+    parse_incident_date,
+)
+from app.domain.normalizer import build_incident_id, normalize_incident  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "asn"
+
+
+@dataclass(frozen=True)
+class CaseResult:
+    name: str
+    inputs: int              # входов в одном проходе
+    calls: int               # всего замеренных вызовов
+    calls_per_second: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+    max_us: float
+    peak_kib: float          # пик памяти за один проход по всем входам
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def load_cases(backend: str) -> list[tuple[str, Callable[[Any], Any], list[Any]]]:
+    collector = AviationSafetyCollector("bench", [], parser_backend=backend)
+    rss = (FIXTURES / "rss.xml").read_text(encoding="utf-8")
+    year = (FIXTURES / "year.html").read_text(encoding="utf-8")
+    details = [path.read_text(encoding="utf-8") for path in sorted((FIXTURES / "details").glob("*.html"))]
+
+    rows = collector._parse_rss(rss) + collector._parse_incident_table(year)
+    detail_rows = [collector._parse_incident_detail(html) for html in details]
+    dates = [row["date_utc"] for row in rows + detail_rows if row.get("date_utc")]
+    id_args = [(row["date_utc"], row["aircraft"], row["location"], row["source_url"]) for row in rows]
+    # Строки без source_url: хэш от даты/ВС/места, как у записей без ссылки
+    id_args += [(date_utc, aircraft, location, "") for date_utc, aircraft, location, _ in id_args]
+
+    return [
+        ("_parse_rss", collector._parse_rss, [rss]),
+        ("_parse_incident_table", collector._parse_incident_table, [year]),
+        ("_parse_incident_detail", collector._parse_incident_detail, details),
+        ("normalize_incident", normalize_incident, rows),
+        ("build_incident_id", lambda args: build_incident_id(*args), id_args),
+        ("_parse_incident_date", parse_incident_date, dates),
+        # Без LRU-кэша и прежний перебор strptime — для сравнения с _parse_incident_date
+        ("_parse_incident_date_nocache", _parse_date_uncached, dates),
+        ("_parse_incident_date_strptime", lambda value: _parse_strptime(normalize_date_string(value)), dates),
+    ]
+
+
+def _parse_date_uncached(value: str) -> Any:
+    text = normalize_date_string(value)
+    moment = _parse_fast(text)
+    return moment.day if moment else _parse_strptime(text)
+
+
+def measure(name: str, fn: Callable[[Any], Any], inputs: list[Any], repeat: int) -> CaseResult:
+    for value in inputs:
+        fn(value)  # прогрев
+
+    clock = time.perf_counter_ns
+    samples: list[float] = []
+    started = clock()
+    for _ in range(repeat):
+        for value in inputs:
+            t0 = clock()
+            fn(value)
+            samples.append((clock() - t0) / 1000.0)
+    elapsed = (clock() - started) / 1e9
+
+    tracemalloc.start()
+    for value in inputs:
+        fn(value)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return CaseResult(
+        name=name,
+        inputs=len(inputs),
+        calls=len(samples),
+        calls_per_second=len(samples) / elapsed if elapsed else 0.0,
+        p50_us=_percentile(samples, 0.50),
+        p90_us=_percentile(samples, 0.90),
+        p99_us=_percentile(samples, 0.99),
+        max_us=samples[-1],
+        peak_kib=peak / 1024.0,
+    )
+
+
+def compare(
+    results: list[CaseResult],
+    baseline: dict[str, Any],
+    tolerance: float,
+    min_delta_us: float = 2.0,
+    min_delta_kib: float = 16.0,
+) -> list[str]:
+    """
+    Описания регрессий относительно baseline (пустой список — всё в пределах допуска).
+    Рост должен превышать и tolerance, и абсолютный порог метрики.
+    """
+    previous = {case["name"]: case for case in baseline.get("cases", [])}
+    floors = {"p50_us": min_delta_us, "peak_kib": min_delta_kib}
+    regressions: list[str] = []
+    for result in results:
+        old = previous.get(result.name)
+        if old is None:
+            continue
+        for metric, floor in floors.items():
+            before, after = old[metric], getattr(result, metric)
+            if before > 0 and after > before * (1.0 + tolerance) and after - before > floor:
+                regressions.append(f"{result.name}: {metric} {before:.1f} -> {after:.1f} (+{after / before - 1:.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--backend", default="lxml", help="бэкенд разбора: lxml | bs4")
+    parser.add_argument("--output", type=Path, help="куда записать результаты в JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост p50 / памяти (доля)")
+    parser.add_argument("--min-delta-us", type=float, default=2.0, help="рост p50 меньше этого (мкс) — шум")
+    parser.add_argument("--min-delta-kib", type=float, default=16.0, help="рост памяти меньше этого (КиБ) — шум")
+    args = parser.parse_args()
+
+    results = [measure(name, fn, inputs, args.repeat) for name, fn, inputs in load_cases(args.backend)]
+
+    print(f"{'case':<30} {'inputs':>6} {'calls/s':>11} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'peak KiB':>9}")
+    for r in results:
+        print(f"{r.name:<30} {r.inputs:>6} {r.calls_per_second:>11.0f} {r.p50_us:>9.1f} "
+              f"{r.p90_us:>9.1f} {r.p99_us:>9.1f} {r.peak_kib:>9.1f}")
+
+    report = {
+        "backend": args.backend,
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": [asdict(r) for r in results],
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(
+            results,
+            json.loads(args.baseline.read_text(encoding="utf-8")),
+            args.tolerance,
+            min_delta_us=args.min_delta_us,
+            min_delta_kib=args.min_delta_kib,
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Сравнение бэкендов разбора ASN: время и пиковая память на фикстурах.
+
+    python benchmarks/parse_bench.py [--repeat 200]
+
+Фикстуры берутся из tests/fixtures/asn; для реалистичного объёма списки
+и RSS размножаются до ~100 строк, как на главной ASN.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.collector.parsers import LxmlParser, SoupParser  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "asn"
+
+
+def _inflate(payload: str, open_tag: str, close_tag: str, copies: int) -> str:
+    """Повторяет блок между первым open_tag и последним close_tag."""
+    start = payload.index(open_tag)
+    end = payload.rindex(close_tag) + len(close_tag)
+    return payload[:start] + payload[start:end] * copies + payload[end:]
+
+
+def load_cases() -> list[tuple[str, str, str]]:
+    rss = (FIXTURES / "rss.xml").read_text(encoding="utf-8")
+    table = (FIXTURES / "list_hp.html").read_text(encoding="utf-8")
+    detail = (FIXTURES / "detail.html").read_text(encoding="utf-8")
+    nested = (FIXTURES / "detail_nested.html").read_text(encoding="utf-8")
+    return [
+        ("rss x100", "parse_rss", _inflate(rss, "<item>", "</item>", 20)),
+        ("table x100", "parse_incident_table", _inflate(table, "<tr>\n    <td>15", "</tr>\n  <tr>\n    <td colspan", 50)),
+        ("detail", "parse_incident_detail", detail),
+        ("detail nest", "parse_incident_detail", nested),
+    ]
+
+
+def measure(parser: object, method: str, payload: str, repeat: int) -> tuple[float, float]:
+    fn = getattr(parser, method)
+    fn(payload)  # прогрев
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload)
+    per_call_ms = (time.perf_counter() - started) / repeat * 1000.0
+
+    tracemalloc.start()
+    fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_call_ms, peak / 1024.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    backends = {"bs4": SoupParser(), "lxml": LxmlParser()}
+    print(f"{'case':<12} {'backend':<6} {'ms/call':>9} {'peak KiB':>9}")
+    for name, method, payload in load_cases():
+        results = {}
+        for backend, impl in backends.items():
+            results[backend] = measure(impl, method, payload, args.repeat)
+            ms, kib = results[backend]
+            print(f"{name:<12} {backend:<6} {ms:>9.3f} {kib:>9.1f}")
+        speedup = results["bs4"][0] / max(results["lxml"][0], 1e-9)
+        memory = results["bs4"][1] / max(results["lxml"][1], 1e-9)
+        print(f"{name:<12} {'gain':<6} {speedup:>8.1f}x {memory:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
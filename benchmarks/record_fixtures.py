@@ -0,0 +1,201 @@
+"""
+Фикстуры ASN реального объёма для benchmarks/hot_paths.py.
+
+    python benchmarks/record_fixtures.py            # детерминированная генерация
+    python benchmarks/record_fixtures.py --live     # запись с aviation-safety.net
+
+Результат — benchmarks/fixtures/asn: rss.xml, year.html (страница asndb/year)
+и details/*.html. Сгенерированные страницы повторяют разметку ASN и объём
+живых страниц (RSS ~50 записей, год ~400 строк, detail-страницы с таблицей
+фактов, нарративом и обвесом сайта), чтобы замеры не зависели от сети.
+--live перезаписывает их настоящими страницами; между запросами та же пауза,
+что и у бота.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+OUTPUT = Path(__file__).resolve().parent / "fixtures" / "asn"
+
+RSS_ITEMS = 50
+YEAR_ROWS = 400
+DETAIL_PAGES = 36
+
+_TYPES = [
+    "Airbus A320-214", "Boeing 737-8 MAX", "Cessna 172S Skyhawk", "Piper PA-28-181 Archer",
+    "ATR 72-600", "Embraer ERJ-190LR", "Bombardier CRJ900", "Beechcraft King Air 350",
+    "de Havilland Canada DHC-6 Twin Otter", "Robinson R44 Raven II", "Boeing 787-9 Dreamliner",
+]
+_PLACES = [
+    "Cairo International Airport (CAI)", "Oslo-Gardermoen Airport (OSL)", "near São Paulo-Campo de Marte",
+    "Anchorage-Merrill Field, AK", "Frankfurt Airport (FRA)", "Lukla-Tenzing-Hillary Airport",
+    "Toronto-Pearson International Airport, ON", "near Kraków", "Dubai International Airport (DXB)",
+]
+_OPERATORS = ["EgyptAir", "Norwegian Air Shuttle", "Private", "Lufthansa", "Air Canada", "Tara Air"]
+_PHASES = ["Take off", "Initial climb", "En route", "Approach", "Landing", "Taxi", "Standing"]
+_EVENTS = [
+    "Engine shutdown after bird strike", "Runway excursion on landing", "Gear-up landing",
+    "Tail strike on rotation", "Loss of control in flight", "Collision with terrain",
+    "Hard landing, nose gear collapse", "Cabin depressurisation, diversion",
+]
+_SENTENCE = (
+    "The {type} operated by {operator} was involved in an occurrence during the {phase} phase "
+    "at {place}. The crew declared an emergency and the aircraft sustained {damage} damage. "
+)
+
+
+def _site_chrome(title: str, body: str) -> str:
+    menu = "".join(f'<a href="/database/{n}">Section {n}</a> ' for n in range(40))
+    return (
+        f"<!DOCTYPE html>\n<html>\n<head><title>{title}</title>\n"
+        f"<script>var ads = {list(range(200))};</script>\n"
+        f"<style>{'td { padding: 2px; } ' * 40}</style></head>\n"
+        f'<body>\n<div class="menu">{menu}</div>\n{body}\n'
+        f'<div class="footer">{"<p>Copyright Flight Safety Foundation</p>" * 5}</div>\n</body>\n</html>\n'
+    )
+
+
+def _incident(rng: random.Random, number: int, day: date) -> dict[str, str]:
+    return {
+        "id": str(512000 + number),
+        "date": day,
+        "type": rng.choice(_TYPES),
+        "place": rng.choice(_PLACES),
+        "operator": rng.choice(_OPERATORS),
+        "phase": rng.choice(_PHASES),
+        "event": rng.choice(_EVENTS),
+        "reg": f"{rng.choice(['SU', 'LN', 'N', 'D', 'C'])}-{rng.randrange(100, 999)}",
+        "occupants": str(rng.randrange(1, 220)),
+        "fatalities": str(rng.choice([0, 0, 0, 1, 2])),
+    }
+
+
+def _incidents() -> list[dict[str, str]]:
+    rng = random.Random(2026)
+    newest = date(2026, 12, 31)
+    return [_incident(rng, n, newest - timedelta(days=n * 365 // YEAR_ROWS)) for n in range(YEAR_ROWS)]
+
+
+def build_rss(incidents: list[dict[str, str]]) -> str:
+    items = []
+    for inc in incidents[:RSS_ITEMS]:
+        published = format_datetime(datetime(inc["date"].year, inc["date"].month, inc["date"].day, 12,
+                                             tzinfo=timezone.utc), usegmt=True)
+        items.append(
+            "  <item>\n"
+            f"    <title>{inc['type']} {inc['event'].lower()}, {inc['place']}</title>\n"
+            f"    <link>https://aviation-safety.net/wikibase/{inc['id']}</link>\n"
+            f"    <pubDate>{published}</pubDate>\n"
+            f"    <description><![CDATA[<p>{inc['event']}.</p>]]></description>\n"
+            "  </item>\n"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">\n<channel>\n'
+        "  <title>Aviation Safety Network</title>\n  <link>https://aviation-safety.net/</link>\n"
+        + "".join(items) + "</channel>\n</rss>\n"
+    )
+
+
+def build_year_page(incidents: list[dict[str, str]]) -> str:
+    rows = ["  <tr><th>Date</th><th>Location</th><th>Type</th><th>Description</th></tr>"]
+    for n, inc in enumerate(incidents):
+        rows.append(
+            "  <tr>"
+            f"<td>{inc['date'].strftime('%d %b %Y')}</td>"
+            f"<td>{inc['place']}, <span>{inc['operator']}</span></td>"
+            f"<td>{inc['type']}</td>"
+            f"<td><a href=\"/wikibase/{inc['id']}\">{inc['event']}</a></td>"
+            "</tr>"
+        )
+        if n % 50 == 49:
+            rows.append('  <tr><td colspan="4">Advertisement</td></tr>')
+    table = '<table class="hp">\n' + "\n".join(rows) + "\n</table>"
+    return _site_chrome(f"ASN Safety Database {incidents[0]['date'].year}", table)
+
+
+def build_detail_page(inc: dict[str, str]) -> str:
+    facts = [
+        ("Date", inc["date"].strftime("%A %d %B %Y")), ("Time", "12:05 UTC"), ("Type", inc["type"]),
+        ("Owner/operator", inc["operator"]), ("Registration", inc["reg"]), ("MSN", inc["id"][-4:]),
+        ("Fatalities", f"Fatalities: {inc['fatalities']} / Occupants: {inc['occupants']}"),
+        ("Other fatalities", "0"), ("Aircraft damage", "Substantial"), ("Location", inc["place"]),
+        ("Phase", inc["phase"]), ("Nature", "Passenger - Scheduled"),
+        ("Departure airport", inc["place"]), ("Destination airport", "Frankfurt Airport (FRA/EDDF)"),
+    ]
+    rows = "\n".join(
+        f'  <tr><td class="caption">{key}:</td><td class="desc">{value}</td></tr>' for key, value in facts
+    )
+    sentence = _SENTENCE.format(type=inc["type"], operator=inc["operator"], phase=inc["phase"].lower(),
+                                place=inc["place"], damage="substantial")
+    narrative = "".join(f"<p>{sentence * 3}</p>" for _ in range(4))
+    body = (
+        f'<div class="pagetitle"><h1>{inc["event"]} {inc["type"]} {inc["reg"]}</h1></div>\n'
+        f"<table>\n{rows}\n</table>\n"
+        f'<span class="caption"><b>Narrative:</b></span>\n<div class="narrative">{narrative}</div>\n'
+        f'<table class="sources">{"<tr><td>Source</td><td>https://example.org/report</td></tr>" * 6}</table>'
+    )
+    return _site_chrome(f"ASN Wikibase Occurrence # {inc['id']}", body)
+
+
+def write_synthetic() -> None:
+    incidents = _incidents()
+    _write("rss.xml", build_rss(incidents))
+    _write("year.html", build_year_page(incidents))
+    for inc in incidents[:DETAIL_PAGES]:
+        _write(f"details/{inc['id']}.html", build_detail_page(inc))
+
+
+def record_live(delay_seconds: float) -> None:
+    import httpx
+
+    from app.collector.parsers import LxmlParser
+    from app.config import Settings
+
+    settings = Settings.from_env()
+    year = date.today().year
+    with httpx.Client(headers={"User-Agent": settings.user_agent}, timeout=20.0, follow_redirects=True) as client:
+        rss = client.get("https://aviation-safety.net/rss.xml")
+        rss.raise_for_status()
+        _write("rss.xml", rss.text)
+        time.sleep(delay_seconds)
+        page = client.get(f"https://aviation-safety.net/asndb/year/{year}")
+        page.raise_for_status()
+        _write("year.html", page.text)
+        for row in LxmlParser().parse_incident_table(page.text)[:DETAIL_PAGES]:
+            time.sleep(delay_seconds)
+            detail = client.get(row["source_url"])
+            detail.raise_for_status()
+            _write(f"details/{row['source_url'].rstrip('/').rsplit('/', 1)[-1]}.html", detail.text)
+
+
+def _write(name: str, payload: str) -> None:
+    path = OUTPUT / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(payload, encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="записать страницы с aviation-safety.net")
+    parser.add_argument("--delay", type=float, default=1.5, help="пауза между запросами в --live, с")
+    args = parser.parse_args()
+
+    if args.live:
+        record_live(args.delay)
+    else:
+        write_synthetic()
+    print(f"fixtures written to {OUTPUT}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import asyncio
+import dataclasses
+
+from app.ai.batch import RewriteBatcher
+from app.ai.deepseek_client import RewriteResult
+from app.domain.models import Incident
+
+
+def _incident(incident_id: str) -> Incident:
+    return Incident(
+        incident_id=incident_id,
+        title="Test incident",
+        event_type="incident",
+        date_utc="2026-01-01",
+        location="Cairo",
+        aircraft="Airbus A320",
+        operator="Air Test",
+        persons_onboard="150",
+        summary="Engine issue",
+        source_url=f"https://aviation-safety.net/wikibase/{incident_id}",
+    )
+
+
+class _FakeBatchRewriter:
+    def __init__(self, answered: set[str]) -> None:
+        self.batches: list[list[str]] = []
+        self.singles: list[str] = []
+        self._answered = answered
+
+    def rewrite_batch(self, incidents):
+        self.batches.append([i.incident_id for i in incidents])
+        return {
+            i.incident_id: RewriteResult(text=f"batch {i.incident_id}", is_fallback=False, provider="fake")
+            for i in incidents
+            if i.incident_id in self._answered
+        }
+
+    def rewrite(self, incident):
+        self.singles.append(incident.incident_id)
+        return RewriteResult(text=f"single {incident.incident_id}", is_fallback=False, provider="fake")
+
+
+def _run(batcher: RewriteBatcher, incidents: list[Incident]) -> list[str]:
+    async def _all():
+        return await asyncio.gather(*(batcher.rewrite(i) for i in incidents))
+
+    return [r.text for r in asyncio.run(_all())]
+
+
+def test_batcher_groups_up_to_max_items_and_retries_missing_singly() -> None:
+    rewriter = _FakeBatchRewriter(answered={"1", "2", "4"})
+    batcher = RewriteBatcher(rewriter, max_items=3, token_budget=100_000, linger_seconds=0.01)
+
+    texts = _run(batcher, [_incident(str(n)) for n in range(1, 6)])
+
+    assert rewriter.batches == [["1", "2", "3"], ["4", "5"]]
+    assert sorted(rewriter.singles) == ["3", "5"]
+    assert texts == ["batch 1", "batch 2", "single 3", "batch 4", "single 5"]
+
+
+def test_batcher_splits_batches_by_token_budget() -> None:
+    from app.ai.prompt_templates import build_incident_prompt
+    from app.ai.usage import estimate_tokens
+
+    rewriter = _FakeBatchRewriter(answered={"1", "2", "3", "4"})
+    long_one = dataclasses.replace(_incident("3"), summary="x" * 3000)
+    budget = 2 * estimate_tokens(build_incident_prompt(_incident("1"))) + 10
+    batcher = RewriteBatcher(rewriter, max_items=10, token_budget=budget, linger_seconds=0.01)
+
+    _run(batcher, [_incident("1"), _incident("2"), long_one, _incident("4")])
+
+    # Длинный инцидент не влез ни к соседям до, ни к соседям после — ушёл один
+    assert rewriter.batches == [["1", "2"]]
+    assert sorted(rewriter.singles) == ["3", "4"]
@@ -0,0 +1,190 @@
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from app.ai.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.ai.deepseek_client import DeepSeekClient
+from app.ai.failover import FailoverRewriter
+from tests.test_deepseek_client import _DummyResponse, _incident
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _ScriptedClient:
+    """httpx.Client, отвечающий по URL: base_url -> очередь ответов."""
+
+    def __init__(self, responses: dict[str, list]) -> None:
+        self._responses = responses
+        self.calls: list[str] = []
+
+    def __enter__(self) -> "_ScriptedClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def post(self, url: str, headers: dict, json: dict):  # noqa: A002
+        self.calls.append(url)
+        for prefix, queue in self._responses.items():
+            if url.startswith(prefix):
+                response = queue.pop(0) if len(queue) > 1 else queue[0]
+                if isinstance(response, Exception):
+                    raise response
+                return response
+        raise AssertionError(f"unexpected url {url}")
+
+
+def _ok(text: str = "ok rewrite") -> _DummyResponse:
+    return _DummyResponse(200, {"choices": [{"message": {"content": text}}]})
+
+
+def test_breaker_opens_on_failure_rate_and_recovers_after_probe() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("deepseek", failure_rate=0.5, window=4, min_calls=4, open_seconds=60, clock=clock)
+
+    for failed in (False, True, False, True):
+        assert breaker.allow()
+        breaker.record_failure("timeout") if failed else breaker.record_success(100.0)
+
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+
+    clock.now = 61
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+    # Пока проба в полёте, остальные вызовы не пропускаются
+    assert breaker.allow() is False
+    breaker.record_success(100.0)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_counts_slow_calls_and_reopens_on_failed_probe() -> None:
+    clock = _Clock()
+    breaker = CircuitBreaker("deepseek", window=2, min_calls=2, slow_call_ms=1000, open_seconds=10, clock=clock)
+
+    breaker.record_success(1500.0)
+    breaker.record_success(1500.0)
+    assert breaker.state == OPEN
+
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_failure("status=503")
+    assert breaker.state == OPEN
+    clock.now = 15
+    assert breaker.state == OPEN
+
+
+def test_client_recovers_from_402_without_restart(monkeypatch) -> None:
+    clock = _Clock()
+    scripted = _ScriptedClient({"https://api.deepseek.com": [_DummyResponse(402, {"error": "balance"}), _ok()]})
+    monkeypatch.setattr(httpx, "Client", lambda timeout: scripted)
+    breaker = CircuitBreaker("deepseek", open_seconds=120, clock=clock)
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1", breaker=breaker)
+
+    assert client.rewrite(_incident()).is_fallback is True
+    assert client.rewrite(_incident()).is_fallback is True
+    assert len(scripted.calls) == 1
+
+    clock.now = 121
+    assert client.rewrite(_incident()).text == "ok rewrite"
+    assert breaker.state == CLOSED
+
+
+def test_failover_switches_provider_while_primary_circuit_open(monkeypatch) -> None:
+    scripted = _ScriptedClient({
+        "https://api.deepseek.com": [httpx.ReadTimeout("timeout")],
+        "https://openrouter.ai": [_ok("from openrouter")],
+    })
+    monkeypatch.setattr(httpx, "Client", lambda timeout: scripted)
+    primary = DeepSeekClient(
+        "key", "deepseek-chat", "https://api.deepseek.com/v1",
+        breaker=CircuitBreaker("deepseek", window=2, min_calls=2),
+    )
+    standby = DeepSeekClient("key", "deepseek/deepseek-chat", "https://openrouter.ai/api/v1", provider_name="openrouter")
+    rewriter = FailoverRewriter([primary, standby])
+
+    results = [rewriter.rewrite(_incident()) for _ in range(4)]
+
+    assert all(r.text == "from openrouter" and r.provider == "openrouter" for r in results)
+    # После двух таймаутов цепь DeepSeek разомкнута — дальше запросы идут только в OpenRouter
+    assert sum(url.startswith("https://api.deepseek.com") for url in scripted.calls) == 2
+    assert rewriter.is_api_rewrite_available() is True
+
+
+class _TimedClient:
+    """Клиент с заданной задержкой ответа; отмену замечает, как потоковый запрос."""
+
+    def __init__(self, name: str, delay: float, text: str) -> None:
+        from app.observability.metrics import LatencyTracker
+
+        self.provider_name = name
+        self.latency = LatencyTracker()
+        self._delay = delay
+        self._text = text
+        self.cancelled = False
+
+    def is_api_rewrite_available(self) -> bool:
+        return True
+
+    def rewrite(self, incident, cancel=None):
+        from app.ai.deepseek_client import RewriteResult
+
+        if cancel is not None and cancel.wait(self._delay):
+            self.cancelled = True
+            return RewriteResult(text="fallback", is_fallback=True, provider=self.provider_name)
+        return RewriteResult(text=self._text, is_fallback=False, provider=self.provider_name)
+
+    def log_stats(self) -> None:
+        pass
+
+
+def _valid_text() -> str:
+    return DeepSeekClient("", "deepseek-chat", "https://api.deepseek.com/v1").rewrite_incident(_incident())
+
+
+def test_hedge_sends_to_standby_when_primary_is_slow_and_cancels_loser() -> None:
+    import time
+
+    primary = _TimedClient("deepseek", delay=2.0, text=_valid_text())
+    standby = _TimedClient("openrouter", delay=0.0, text=_valid_text())
+    rewriter = FailoverRewriter([primary, standby], hedge=True, hedge_delay_seconds=0.05)
+
+    result = rewriter.rewrite(_incident())
+
+    assert result.provider == "openrouter"
+    time.sleep(0.05)
+    assert primary.cancelled is True
+    assert rewriter._hedged == 1 and rewriter._wins == {"openrouter": 1}
+
+
+def test_hedge_skips_standby_when_primary_answers_in_time() -> None:
+    primary = _TimedClient("deepseek", delay=0.0, text=_valid_text())
+    standby = _TimedClient("openrouter", delay=0.0, text=_valid_text())
+    rewriter = FailoverRewriter([primary, standby], hedge=True, hedge_delay_seconds=1.0)
+
+    assert rewriter.rewrite(_incident()).provider == "deepseek"
+    assert rewriter._hedged == 0
+
+
+def test_hedge_prefers_valid_answer_over_first_answer() -> None:
+    primary = _TimedClient("deepseek", delay=0.2, text=_valid_text())
+    standby = _TimedClient("openrouter", delay=0.0, text="слишком коротко")
+    rewriter = FailoverRewriter([primary, standby], hedge=True, hedge_delay_seconds=0.05)
+
+    assert rewriter.rewrite(_incident()).provider == "deepseek"
+
+
+def test_hedge_delay_follows_primary_p90() -> None:
+    primary = _TimedClient("deepseek", delay=0.0, text="")
+    rewriter = FailoverRewriter([primary, _TimedClient("openrouter", 0.0, "")], hedge=True, hedge_delay_seconds=10)
+    assert rewriter.hedge_delay() == 10
+
+    for seconds in (1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 3.0):
+        primary.latency.record("completion", seconds)
+    assert rewriter.hedge_delay() == pytest.approx(1.0)
@@ -1,3 +1,6 @@
+import time
+from contextlib import contextmanager
+
 import pytest
 
 pytest.importorskip("bs4")
@@ -114,3 +117,347 @@ def test_parse_incident_detail_extracts_summary() -> None:
     assert details["title"] == "Airbus A320 incident"
     assert details["operator"] == "Air Test"
     assert "detailed narrative" in details["summary"]
+
+
+_RSS = """<?xml version="1.0" encoding="UTF-8"?>
+<rss><channel>
+  <item>
+    <title>Airbus A320 incident near Cairo</title>
+    <link>https://aviation-safety.net/database/record.php?id=20260115-0</link>
+    <pubDate>Sat, 15 Jan 2026 12:00:00 GMT</pubDate>
+  </item>
+</channel></rss>
+"""
+
+
+class _FeedResponse:
+    def __init__(self, status_code: int, body: str = "", headers: dict | None = None) -> None:
+        self.status_code = status_code
+        self.text = body
+        self.content = body.encode("utf-8")
+        self.headers = headers or {}
+        self.charset_encoding = None
+        self.bytes_read = 0
+
+    def iter_bytes(self):
+        for start in range(0, len(self.content), 64):
+            self.bytes_read += 64
+            yield self.content[start:start + 64]
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"status={self.status_code}")
+
+
+class _FeedClient:
+    def __init__(self, responses: list) -> None:
+        self._responses = responses
+        self.sent_headers: list[dict] = []
+
+    def __enter__(self) -> "_FeedClient":
+        return self
+
+    def __exit__(self, *args) -> None:
+        return None
+
+    def get(self, url: str, headers: dict | None = None, **kwargs) -> _FeedResponse:
+        self.sent_headers.append(headers or {})
+        response = self._responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    @contextmanager
+    def stream(self, method: str, url: str, headers: dict | None = None, **kwargs):
+        yield self.get(url, headers=headers)
+
+
+class _MemoryFeedState:
+    def __init__(self) -> None:
+        self.rows: dict[str, dict] = {}
+
+    def get_feed_state(self, feed_url: str):
+        return self.rows.get(feed_url)
+
+    def save_feed_state(self, feed_url, etag, last_modified, body_hash, high_water_mark="") -> None:
+        self.rows[feed_url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_hash": body_hash,
+            "high_water_mark": high_water_mark,
+        }
+
+
+def _collector_with(monkeypatch, responses: list, store: _MemoryFeedState):
+    import httpx
+
+    client = _FeedClient(responses)
+    monkeypatch.setattr(httpx, "Client", lambda **kwargs: client)
+    collector = AviationSafetyCollector("test-agent", ["https://aviation-safety.net/rss.xml"], feed_state=store)
+    return collector, client
+
+
+def test_conditional_get_sends_validators_and_stops_on_304(monkeypatch) -> None:
+    store = _MemoryFeedState()
+    headers = {"ETag": '"abc"', "Last-Modified": "Sat, 15 Jan 2026 12:00:00 GMT"}
+    collector, client = _collector_with(monkeypatch, [_FeedResponse(200, _RSS, headers), _FeedResponse(304)], store)
+
+    assert len(collector.fetch_recent_incidents()) == 1
+    collector.commit_feed_state()
+    assert collector.fetch_recent_incidents() == []
+
+    assert client.sent_headers[0] == {}
+    assert client.sent_headers[1] == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Sat, 15 Jan 2026 12:00:00 GMT",
+    }
+
+
+def test_conditional_get_body_hash_fallback(monkeypatch) -> None:
+    store = _MemoryFeedState()
+    collector, _ = _collector_with(monkeypatch, [_FeedResponse(200, _RSS), _FeedResponse(200, _RSS)], store)
+
+    assert len(collector.fetch_recent_incidents()) == 1
+    collector.commit_feed_state()
+    # Сервер игнорирует валидаторы, но тело то же — парсинг не нужен
+    assert collector.fetch_recent_incidents() == []
+
+
+def test_feed_state_not_committed_without_explicit_commit(monkeypatch) -> None:
+    store = _MemoryFeedState()
+    collector, _ = _collector_with(monkeypatch, [_FeedResponse(200, _RSS), _FeedResponse(200, _RSS)], store)
+
+    collector.fetch_recent_incidents()
+    # Цикл не завершился чисто — следующий опрос должен снова отдать строки
+    assert len(collector.fetch_recent_incidents()) == 1
+
+
+def _rss_feed(ids: list[int]) -> str:
+    items = "".join(
+        f"<item><title>Incident {i}</title><link>https://aviation-safety.net/wikibase/{i}</link></item>"
+        for i in ids
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss><channel>{items}</channel></rss>'
+
+
+def test_streaming_stops_at_high_water_mark(monkeypatch) -> None:
+    store = _MemoryFeedState()
+    first = _FeedResponse(200, _rss_feed([3, 2, 1]))
+    second = _FeedResponse(200, _rss_feed([5, 4, 3, 2, 1] + list(range(100, 400))))
+    collector, _ = _collector_with(monkeypatch, [first, second], store)
+
+    assert len(list(collector.iter_recent_incidents())) == 3
+    collector.commit_feed_state()
+    assert store.rows["https://aviation-safety.net/rss.xml"]["high_water_mark"].endswith("/3")
+
+    rows = list(collector.iter_recent_incidents())
+
+    assert [row["source_url"].rsplit("/", 1)[1] for row in rows] == ["5", "4"]
+    # Хвост ленты не скачивался
+    assert second.bytes_read < len(second.content)
+
+
+def test_streaming_stops_after_run_of_known_rows(monkeypatch) -> None:
+    store = _MemoryFeedState()
+    collector, _ = _collector_with(monkeypatch, [_FeedResponse(200, _rss_feed([9, 8, 7, 6, 5, 4]))], store)
+    known = {"7", "6", "5", "4"}
+
+    rows = list(collector.iter_recent_incidents(
+        lambda row: row["source_url"].rsplit("/", 1)[1] in known, stop_after_known=2,
+    ))
+
+    assert [row["source_url"].rsplit("/", 1)[1] for row in rows] == ["9", "8", "7"]
+
+
+class _SourcesClient(_FeedClient):
+    """Ответ по URL; delay — задержка ответа в секундах."""
+
+    def __init__(self, sources: dict[str, tuple[float, _FeedResponse | Exception]]) -> None:
+        super().__init__([])
+        self._sources = sources
+
+    def get(self, url: str, headers: dict | None = None, **kwargs) -> _FeedResponse:
+        import time
+
+        delay, response = self._sources[url]
+        time.sleep(delay)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+_YEAR_PAGE = """<html><body><table class="hp">
+  <tr><td>15 Jan 2026</td><td>Cairo</td><td>Airbus A320</td>
+      <td><a href="/wikibase/2">Incident 2</a></td></tr>
+  <tr><td>14 Jan 2026</td><td>Oslo</td><td>Boeing 737</td>
+      <td><a href="/wikibase/7">Incident 7</a></td></tr>
+</table></body></html>"""
+
+
+def _sources_collector(
+    monkeypatch, sources: dict, mode: str, deadline: float = 20.0, store=None,
+) -> AviationSafetyCollector:
+    import httpx
+
+    client = _SourcesClient(sources)
+    monkeypatch.setattr(httpx, "Client", lambda **kwargs: client)
+    return AviationSafetyCollector(
+        "test-agent", list(sources), fetch_mode=mode, source_deadline_seconds=deadline, feed_state=store,
+    )
+
+
+def test_merge_mode_combines_sources_and_keeps_richest_row(monkeypatch) -> None:
+    import httpx
+
+    collector = _sources_collector(monkeypatch, {
+        "https://aviation-safety.net/rss.xml": (0.0, _FeedResponse(200, _rss_feed([3, 2]))),
+        "https://aviation-safety.net/asndb/year/2026": (0.0, _FeedResponse(200, _YEAR_PAGE)),
+        "https://aviation-safety.net/database/": (0.0, httpx.ConnectError("down")),
+    }, "merge")
+
+    rows = collector.fetch_recent_incidents()
+
+    assert [row["source_url"].rsplit("/", 1)[1] for row in rows] == ["3", "2", "7"]
+    # Строка из таблицы года полнее строки RSS для того же инцидента
+    assert rows[1]["location"] == "Cairo"
+    stats = collector.source_stats()
+    assert stats["https://aviation-safety.net/database/"].failures == 1
+    assert stats["https://aviation-safety.net/rss.xml"].rows == 2
+
+
+def test_hedge_mode_returns_first_good_response(monkeypatch) -> None:
+    import time
+
+    collector = _sources_collector(monkeypatch, {
+        "https://aviation-safety.net/rss.xml": (1.0, _FeedResponse(200, _rss_feed([3, 2]))),
+        "https://aviation-safety.net/asndb/year/2026": (0.0, _FeedResponse(200, _YEAR_PAGE)),
+    }, "hedge")
+
+    started = time.monotonic()
+    rows = collector.fetch_recent_incidents()
+
+    assert time.monotonic() - started < 0.5
+    assert [row["source_url"].rsplit("/", 1)[1] for row in rows] == ["2", "7"]
+
+
+class _TrickleResponse(_FeedResponse):
+    def iter_bytes(self):
+        import time
+
+        for start in range(0, len(self.content), 16):
+            time.sleep(0.05)
+            yield self.content[start:start + 16]
+
+
+def test_merge_mode_enforces_wall_clock_source_deadline(monkeypatch) -> None:
+    import time
+
+    collector = _sources_collector(monkeypatch, {
+        "https://aviation-safety.net/rss.xml": (0.0, _FeedResponse(200, _rss_feed([3, 2]))),
+        "https://aviation-safety.net/asndb/year/2026": (0.0, _TrickleResponse(200, _YEAR_PAGE)),
+        "https://aviation-safety.net/database/": (2.0, _FeedResponse(200, _YEAR_PAGE)),
+    }, "merge", deadline=0.3)
+
+    started = time.monotonic()
+    rows = collector.fetch_recent_incidents()
+
+    assert time.monotonic() - started < 1.0
+    assert [row["source_url"].rsplit("/", 1)[1] for row in rows] == ["3", "2"]
+
+
+def test_trickling_feed_is_cut_off_at_source_deadline(monkeypatch) -> None:
+    collector = _sources_collector(monkeypatch, {
+        "https://aviation-safety.net/asndb/year/2026": (0.0, _TrickleResponse(200, _YEAR_PAGE)),
+    }, "sequential", deadline=0.2)
+
+    # Каждый чанк приходит быстрее таймаута чтения, но тело целиком — дольше дедлайна
+    with pytest.raises(RuntimeError, match="not received within"):
+        collector.fetch_recent_incidents()
+
+
+def test_hedge_mode_does_not_stop_on_304_from_one_feed(monkeypatch) -> None:
+    collector = _sources_collector(monkeypatch, {
+        "https://aviation-safety.net/rss.xml": (0.0, _FeedResponse(304)),
+        "https://aviation-safety.net/asndb/year/2026": (0.2, _FeedResponse(200, _YEAR_PAGE)),
+    }, "hedge")
+
+    rows = collector.fetch_recent_incidents()
+
+    assert [row["source_url"].rsplit("/", 1)[1] for row in rows] == ["2", "7"]
+
+
+def test_unknown_fetch_mode_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        AviationSafetyCollector("test-agent", ["https://example.com"], fetch_mode="race")
+
+
+class _MemoryDetailStore:
+    def __init__(self) -> None:
+        self.rows: dict[str, dict] = {}
+
+    def get_detail_page(self, source_url: str):
+        row = self.rows.get(source_url)
+        return dict(row) if row else None
+
+    def save_detail_page(self, source_url, body, etag, last_modified, max_entries=0) -> None:
+        self.rows[source_url] = {"body": body, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+
+    def touch_detail_page(self, source_url: str, revalidated: bool = False) -> None:
+        if revalidated:
+            self.rows[source_url]["fetched_at"] = time.time()
+
+
+_DETAIL = """<html><body><h1>Airbus A320 incident</h1>
+<table><tr><th>Operator</th><td>Air Test</td></tr></table></body></html>"""
+
+
+def _cached_collector(monkeypatch, responses: list, ttl_seconds: float = 3600.0, store=None):
+    import httpx
+
+    from app.collector.detail_cache import DetailPageCache
+
+    client = _FeedClient(responses)
+    monkeypatch.setattr(httpx, "Client", lambda **kwargs: client)
+    cache = DetailPageCache(store or _MemoryDetailStore(), ttl_seconds=ttl_seconds, max_entries=100)
+    collector = AviationSafetyCollector("test-agent", ["https://example.com"], detail_cache=cache)
+    return collector, client, cache
+
+
+def test_detail_cache_serves_fresh_page_without_request(monkeypatch) -> None:
+    collector, client, cache = _cached_collector(monkeypatch, [_FeedResponse(200, _DETAIL)])
+
+    first = collector.fetch_incident_details("https://Aviation-Safety.net/wikibase/1#narrative")
+    second = collector.fetch_incident_details("https://aviation-safety.net/wikibase/1")
+
+    assert first == second
+    assert first["operator"] == "Air Test"
+    assert len(client.sent_headers) == 1
+    assert (cache.stats().hits, cache.stats().misses) == (1, 1)
+
+
+def test_detail_cache_revalidates_stale_page(monkeypatch) -> None:
+    responses = [_FeedResponse(200, _DETAIL, {"ETag": '"d1"'}), _FeedResponse(304), RuntimeError("down")]
+    collector, client, cache = _cached_collector(monkeypatch, responses, ttl_seconds=0.0)
+
+    collector.fetch_incident_details("https://aviation-safety.net/wikibase/1")
+    revalidated = collector.fetch_incident_details("https://aviation-safety.net/wikibase/1")
+    stale = collector.fetch_incident_details("https://aviation-safety.net/wikibase/1")
+
+    assert client.sent_headers[1] == {"If-None-Match": '"d1"'}
+    assert revalidated["operator"] == stale["operator"] == "Air Test"
+    stats = cache.stats()
+    assert (stats.misses, stats.revalidated, stats.stale_served) == (1, 1, 1)
+
+
+def test_detail_cache_read_error_falls_back_to_network(monkeypatch) -> None:
+    class _BrokenStore(_MemoryDetailStore):
+        def get_detail_page(self, source_url: str):
+            raise RuntimeError("database is locked")
+
+    collector, client, cache = _cached_collector(monkeypatch, [_FeedResponse(200, _DETAIL)], store=_BrokenStore())
+
+    details = collector.fetch_incident_details("https://aviation-safety.net/wikibase/1")
+
+    assert details["operator"] == "Air Test"
+    assert len(client.sent_headers) == 1
+    assert cache.stats().misses == 1
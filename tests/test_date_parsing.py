@@ -43,3 +43,33 @@ def test_is_recent_date_value_rss_gmt(monkeypatch) -> None:
     rss_date = yesterday.strftime("%a, %d %b %Y 10:00:00 GMT")
 
     assert _is_recent_date_value(rss_date, days_back=1) is True
+
+
+_COMPAT_CORPUS = [
+    "15 Jan 2026", "5 jan 2026", "05 JANUARY 2026", "31 Feb 2026", "00 Jan 2026", "32 Jan 2026",
+    "15 Sept 2026", "115 Jan 2026", "15 Jan 20261", "15  Jan\t2026", "15 Jan 0999",
+    "2026-01-15", "2026-1-5", "2026-13-01", "2026-02-30", "2026-001-05",
+    "Sat, 15 Jan 2026 12:00:00 GMT", "Sat, 15 Jan 2026 12:00:00 +0000", "Sat, 15 Jan 2026 25:00:00 +0000",
+    "Sat, 15 Jan 2026 12:00:00 +9900", "Xyz, 15 Jan 2026 12:00:00 +0000", "Sat, 15 Jan 2026 12:00:00\tGMT",
+    "Saturday 15 January 2026, 12:05 UTC", "Thursday 13 January 2026 17:45", "24 Feb 2026, 17:32",
+    "Published: 15 Jan 2026 at 12:00", "1 2 Jan 2026", "Jan 15 2026", "٢ Jan 2026", "no date", "",
+]
+
+
+@pytest.mark.parametrize("raw", _COMPAT_CORPUS)
+def test_fast_parser_matches_strptime_parser(raw: str) -> None:
+    from app.domain.dates import _parse_strptime, normalize_date_string, parse_incident_date
+
+    text = normalize_date_string(raw)
+    assert parse_incident_date(raw) == (_parse_strptime(text) if text else None)
+
+
+def test_parse_incident_moment_returns_time_of_day() -> None:
+    from datetime import time
+
+    from app.domain.dates import parse_incident_moment
+
+    assert parse_incident_moment("Tue, 24 Feb 2026 10:00:00 GMT") == (date(2026, 2, 24), time(10, 0))
+    assert parse_incident_moment("24 Feb 2026, 17:32") == (date(2026, 2, 24), time(17, 32))
+    assert parse_incident_moment("24 Feb 2026") == (date(2026, 2, 24), None)
+    assert parse_incident_moment("2026-02-24").time_of_day is None
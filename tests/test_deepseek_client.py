@@ -111,3 +111,288 @@ def test_rewrite_sends_openrouter_headers(monkeypatch) -> None:
 
     assert client_mock.last_headers["HTTP-Referer"] == "https://example.com"
     assert client_mock.last_headers["X-Title"] == "avia_bot"
+
+
+def _cached_client(tmp_path, monkeypatch, response: _DummyResponse):
+    from app.ai.rewrite_cache import RewriteCache
+    from app.storage.repository import IncidentRepository
+
+    client_mock = _DummyClient(response)
+    monkeypatch.setattr(httpx, "Client", lambda timeout: client_mock)
+    repo = IncidentRepository(f"sqlite:///{tmp_path}/test.db")
+    cache = RewriteCache(repo, ttl_seconds=3600, max_entries=10)
+    return DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1", cache=cache), client_mock, repo
+
+
+def _valid_rewrite() -> str:
+    return DeepSeekClient("", "deepseek-chat", "https://api.deepseek.com/v1").rewrite_incident(_incident())
+
+
+def test_rewrite_cache_hit_skips_api(tmp_path, monkeypatch) -> None:
+    payload = {"choices": [{"message": {"content": _valid_rewrite()}}], "usage": {"total_tokens": 420}}
+    client, client_mock, _ = _cached_client(tmp_path, monkeypatch, _DummyResponse(200, payload))
+
+    first = client.rewrite(_incident())
+    second = client.rewrite(_incident())
+
+    assert client_mock.calls == 1
+    assert first.cached is False and first.tokens == 420
+    assert second.cached is True
+    assert second.text == first.text
+    assert second.tokens == 420
+
+
+def test_rewrite_cache_does_not_store_fallback(tmp_path, monkeypatch) -> None:
+    client, client_mock, _ = _cached_client(tmp_path, monkeypatch, _DummyResponse(500, text="boom"))
+
+    assert client.rewrite(_incident()).is_fallback is True
+    assert client.rewrite(_incident()).cached is False
+    assert client_mock.calls == 2
+
+
+def test_rewrite_cache_discards_invalid_entry(tmp_path, monkeypatch) -> None:
+    payload = {"choices": [{"message": {"content": "too short"}}]}
+    client, client_mock, repo = _cached_client(tmp_path, monkeypatch, _DummyResponse(200, payload))
+    saved: list[str] = []
+    save = repo.save_cached_rewrite
+    monkeypatch.setattr(repo, "save_cached_rewrite", lambda key, *a, **kw: (saved.append(key), save(key, *a, **kw)))
+
+    client.rewrite(_incident())
+    result = client.rewrite(_incident())
+
+    # Ответ не прошёл validate_rewrite — в кэш не попал, API спрошено повторно
+    assert saved == []
+    assert result.cached is False
+    assert client_mock.calls == 2
+
+
+def _sse_client(monkeypatch, deltas: list[str], usage: dict | None = None):
+    import json as _json
+
+    events = [{"choices": [{"delta": {"content": d}}]} for d in deltas]
+    if usage:
+        events.append({"choices": [], "usage": usage})
+    body = ": keep-alive\n\n" + "".join(f"data: {_json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+    seen: list[dict] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(_json.loads(request.content))
+        return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+    real_client = httpx.Client
+    monkeypatch.setattr(httpx, "Client", lambda timeout: real_client(transport=httpx.MockTransport(handler)))
+    return seen
+
+
+def test_streaming_rewrite_assembles_deltas(monkeypatch) -> None:
+    seen = _sse_client(monkeypatch, ["✈️ Airbus ", "A320 ", "rewrite"], usage={"completion_tokens": 3, "total_tokens": 90})
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1", streaming=True)
+
+    result = client.rewrite(_incident())
+
+    assert result.text == "✈️ Airbus A320 rewrite"
+    assert result.is_fallback is False
+    assert result.tokens == 90
+    assert seen[0]["stream"] is True
+    assert client.latency.summary("ttft").count == 1
+
+
+def test_streaming_rewrite_aborts_runaway_generation(monkeypatch) -> None:
+    _sse_client(monkeypatch, ["слово " * 50] * 16)
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1", streaming=True)
+
+    result = client.rewrite(_incident())
+
+    assert result.is_fallback is True
+    assert client._stream_stats.snapshot().aborted == 1
+    # Ошибка модели, а не провайдера: цепь предохранителя остаётся замкнутой
+    assert client.is_api_rewrite_available() is True
+
+
+def test_streaming_slightly_long_answer_is_trimmed_not_replaced(monkeypatch) -> None:
+    from app.ai.validator import MAX_WORDS
+
+    sentence = "Экипаж сообщил о проблеме с двигателем и вернулся. "
+    deltas = ["✈️ Airbus A320 вернулся в Каир\n\n📍 Подробности: "] + [sentence] * 44 + [
+        "\n\n#авиация #происшествие #небонаграни #авиабезопасность",
+    ]
+    assert 355 < len("".join(deltas).split()) < 2 * MAX_WORDS
+    _sse_client(monkeypatch, deltas)
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1", streaming=True)
+
+    result = client.rewrite(_incident())
+
+    assert result.is_fallback is False
+    assert result.repairs == ("too_long",)
+    assert len(result.text.split()) <= MAX_WORDS
+    assert result.text.startswith("✈️ Airbus A320 вернулся в Каир")
+    assert client._stream_stats.snapshot().aborted == 0
+
+
+def test_word_counter_matches_split_across_chunks() -> None:
+    from app.ai.streaming import WordCounter
+
+    text = "  ✈️ Boeing 737-8\nMAX  совершил\tпосадку  "
+    counter = WordCounter()
+    for i in range(0, len(text), 3):
+        counter.feed(text[i:i + 3])
+    assert counter.words == len(text.split())
+
+
+def test_parse_usage_reads_provider_cache_fields() -> None:
+    from app.ai.usage import parse_usage
+
+    deepseek = parse_usage({
+        "prompt_tokens": 1200, "completion_tokens": 180, "total_tokens": 1380,
+        "prompt_cache_hit_tokens": 1024, "prompt_cache_miss_tokens": 176,
+    })
+    openrouter = parse_usage({
+        "prompt_tokens": 1200, "completion_tokens": 180, "prompt_tokens_details": {"cached_tokens": 1152},
+    })
+
+    assert (deepseek.cached_tokens, deepseek.total_tokens) == (1024, 1380)
+    assert openrouter.cached_tokens == 1152
+    assert parse_usage(None).total_tokens == 0
+
+
+def test_rewrite_sends_stable_prefix_before_incident_data(tmp_path, monkeypatch) -> None:
+    import dataclasses
+
+    from app.ai.prompt_templates import PROMPT_PREFIX
+    from app.storage.repository import IncidentRepository
+
+    payloads: list[dict] = []
+
+    class _RecordingClient(_DummyClient):
+        def post(self, url: str, headers: dict, json: dict) -> _DummyResponse:  # noqa: A002
+            payloads.append(json)
+            return super().post(url, headers, json)
+
+    usage = {"prompt_tokens": 1200, "completion_tokens": 150, "prompt_cache_hit_tokens": 1024}
+    client_mock = _RecordingClient(_DummyResponse(200, {"choices": [{"message": {"content": "ok"}}], "usage": usage}))
+    monkeypatch.setattr(httpx, "Client", lambda timeout: client_mock)
+    repo = IncidentRepository(f"sqlite:///{tmp_path}/test.db")
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1", usage_store=repo)
+
+    client.rewrite(_incident())
+    client.rewrite(dataclasses.replace(_incident(), incident_id="other", location="Oslo"))
+
+    first, second = (p["messages"] for p in payloads)
+    assert first[:2] == second[:2]
+    assert first[1]["content"] == PROMPT_PREFIX
+    assert "Cairo" in first[2]["content"] and "Oslo" in second[2]["content"]
+
+    (row,) = repo.get_llm_usage()
+    assert row["calls"] == 2
+    assert row["prompt_tokens"] == 2400
+    assert row["cached_tokens"] == 2048
+
+
+def test_rewrite_batch_keeps_valid_posts_and_skips_the_rest(monkeypatch) -> None:
+    import dataclasses
+    import json as _json
+
+    valid = _valid_rewrite()
+    posts = {"a": valid, "b": "слишком коротко"}  # "c" в ответе нет
+    usage = {"prompt_tokens": 1500, "completion_tokens": 900}
+    payload = {"choices": [{"message": {"content": _json.dumps({"posts": posts})}}], "usage": usage}
+    client_mock = _DummyClient(_DummyResponse(200, payload))
+    monkeypatch.setattr(httpx, "Client", lambda timeout: client_mock)
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1")
+    incidents = [dataclasses.replace(_incident(), incident_id=i) for i in ("a", "b", "c")]
+
+    results = client.rewrite_batch(incidents)
+
+    assert client_mock.calls == 1
+    assert list(results) == ["a"]
+    assert results["a"].text == valid
+    assert results["a"].tokens == 800
+
+
+def test_structured_output_is_rendered_locally(monkeypatch) -> None:
+    import json as _json
+
+    sent: list[dict] = []
+    content = _json.dumps({
+        "headline": "Airbus A320 Air Test вернулся в Каир из-за отказа двигателя",
+        "details": "1 января 2026 года у Airbus A320 авиакомпании Air Test отказал двигатель после взлета.",
+        "casualties": "",
+        "region_tags": ["Египет"],
+        "extra_tags": [],
+    }, ensure_ascii=False)
+
+    class _RecordingClient(_DummyClient):
+        def post(self, url: str, headers: dict, json: dict) -> _DummyResponse:  # noqa: A002
+            sent.append(json)
+            return super().post(url, headers, json)
+
+    client_mock = _RecordingClient(_DummyResponse(200, {"choices": [{"message": {"content": content}}]}))
+    monkeypatch.setattr(httpx, "Client", lambda timeout: client_mock)
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1", structured_output=True)
+
+    result = client.rewrite(_incident())
+
+    assert sent[0]["response_format"] == {"type": "json_object"}
+    assert result.text.startswith("✈️ Airbus A320 Air Test вернулся в Каир")
+    assert "#Египет #небонаграни" in result.text
+
+
+def test_structured_output_unparsable_falls_back_without_retry(monkeypatch) -> None:
+    client_mock = _DummyClient(_DummyResponse(200, {"choices": [{"message": {"content": "не JSON"}}]}))
+    monkeypatch.setattr(httpx, "Client", lambda timeout: client_mock)
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1", structured_output=True)
+
+    result = client.rewrite(_incident())
+
+    assert result.is_fallback is True
+    assert client_mock.calls == 1
+
+
+def test_prompt_builder_compacts_prompt_and_cache_key(monkeypatch) -> None:
+    import dataclasses
+
+    from app.ai.prompt_builder import PromptBuilder
+    from app.ai.prompt_templates import PROMPT_PREFIX, PROMPT_PREFIX_WITHOUT_CASUALTIES
+
+    payloads: list[dict] = []
+
+    class _RecordingClient(_DummyClient):
+        def post(self, url: str, headers: dict, json: dict) -> _DummyResponse:  # noqa: A002
+            payloads.append(json)
+            return super().post(url, headers, json)
+
+    client_mock = _RecordingClient(_DummyResponse(200, {"choices": [{"message": {"content": "ok"}}]}))
+    monkeypatch.setattr(httpx, "Client", lambda timeout: client_mock)
+    incident = dataclasses.replace(_incident(), summary="Нарратив: Engine issue. Engine issue. Crew returned.")
+    plain = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1")
+    compact = DeepSeekClient(
+        "key", "deepseek-chat", "https://api.deepseek.com/v1", prompt_builder=PromptBuilder(3000),
+    )
+
+    plain.rewrite(incident)
+    compact.rewrite(incident)
+
+    full, short = (p["messages"] for p in payloads)
+    assert full[1]["content"] == PROMPT_PREFIX
+    assert short[1]["content"] == PROMPT_PREFIX_WITHOUT_CASUALTIES
+    assert short[2]["content"].count("Engine issue.") == 1
+    assert plain._cache_key(incident) != compact._cache_key(incident)
+    assert any(name.startswith("prompt_le_") for name in compact.latency.names())
+
+
+def test_rewrite_batch_repairs_near_valid_posts(monkeypatch) -> None:
+    import dataclasses
+    import json
+
+    body = " ".join(["слово"] * 80)
+    post = f"**LATAM A320 прервал взлёт**\n\nПодробности: {body}\n\n#авиация #происшествие"
+    content = json.dumps({"posts": {"abc": post, "def": post}})
+    client_mock = _DummyClient(_DummyResponse(200, {"choices": [{"message": {"content": content}}]}))
+    monkeypatch.setattr(httpx, "Client", lambda timeout: client_mock)
+    client = DeepSeekClient("key", "deepseek-chat", "https://api.deepseek.com/v1")
+
+    results = client.rewrite_batch([_incident(), dataclasses.replace(_incident(), incident_id="def")])
+
+    assert set(results) == {"abc", "def"}
+    assert results["abc"].repairs == ("markdown", "markers", "hashtags")
+    assert results["abc"].text.startswith("✈️ LATAM A320 прервал взлёт\n\n📍 Подробности:")
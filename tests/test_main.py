@@ -53,3 +53,260 @@ def test_is_recent_incident_window_today_and_yesterday() -> None:
     assert _is_recent_incident(i_today, 1) is True
     assert _is_recent_incident(i_yday, 1) is True
     assert _is_recent_incident(i_old, 1) is False
+
+
+class _FakeCollector:
+    def __init__(self, rows: list[dict]) -> None:
+        self._rows = rows
+
+    def fetch_recent_incidents(self) -> list[dict]:
+        return self._rows
+
+    def iter_recent_incidents(self, is_known=None, stop_after_known: int = 3):
+        return iter(self._rows)
+
+    def fetch_incident_details(self, source_url: str) -> dict:
+        return {}
+
+    def commit_feed_state(self) -> None:
+        pass
+
+    def log_source_stats(self) -> None:
+        pass
+
+
+class _FakeRewriter:
+    def rewrite(self, incident: Incident):
+        import random
+        import time as _time
+
+        from app.ai.deepseek_client import RewriteResult
+
+        # Рерайты завершаются вразнобой — порядок публикаций должен сохраниться
+        _time.sleep(random.random() / 100)
+        return RewriteResult(text=f"post {incident.title}", is_fallback=False, provider="fake")
+
+    def rewrite_batch(self, incidents: list[Incident]):
+        from app.ai.deepseek_client import RewriteResult
+
+        # Половину пакета «модель» пропускает — она уходит в одиночные вызовы
+        return {
+            i.incident_id: RewriteResult(text=f"post {i.title}", is_fallback=False, provider="fake")
+            for i in incidents[::2]
+        }
+
+    def log_stats(self) -> None:
+        pass
+
+
+class _FakePublisher:
+    published: list[str] = []
+
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def publish(self, text: str, photo_url: str | None = None) -> None:
+        _FakePublisher.published.append(text)
+
+    def send_alert(self, message: str) -> None:
+        pass
+
+
+@pytest.mark.parametrize("batch_items", ["1", "4"])
+def test_process_once_publishes_in_feed_order_and_respects_limit(tmp_path, monkeypatch, batch_items) -> None:
+    import app.main as main_module
+    from app.config import Settings
+
+    today = datetime.now(timezone.utc).date().strftime("%d %b %Y")
+    rows = [
+        {"title": f"t{i}", "date_utc": today, "source_url": f"https://aviation-safety.net/wikibase/{i}"}
+        for i in range(8)
+    ]
+    monkeypatch.setattr(main_module, "AviationSafetyCollector", lambda *a, **kw: _FakeCollector(rows))
+    monkeypatch.setattr(main_module, "_build_rewriter", lambda *a, **kw: _FakeRewriter())
+    monkeypatch.setattr(main_module, "TelegramPublisher", _FakePublisher)
+    monkeypatch.setattr(main_module.PhotoFinder, "find_photo", lambda self, **kw: None)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/avia.db")
+    monkeypatch.setenv("MAX_PUBLICATIONS_PER_CYCLE", "5")
+    monkeypatch.setenv("LLM_BATCH_MAX_ITEMS", batch_items)
+    monkeypatch.setenv("LLM_BATCH_LINGER_SECONDS", "0.01")
+    monkeypatch.setenv("DRY_RUN", "false")
+    _FakePublisher.published = []
+
+    stats = main_module.process_once(Settings.from_env())
+
+    assert _FakePublisher.published == [f"post t{i}" for i in range(5)]
+    assert stats.published == 5
+    assert stats.new == 5
+
+
+def test_build_rewriter_adds_standby_provider_when_both_keys_set(monkeypatch) -> None:
+    import app.main as main_module
+    from app.ai.failover import FailoverRewriter
+    from app.config import Settings
+
+    monkeypatch.setenv("LLM_PROVIDER", "deepseek")
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "ds-key")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "or-key")
+    rewriter = main_module._build_rewriter(Settings.from_env())
+    assert isinstance(rewriter, FailoverRewriter)
+    assert [c.provider_name for c in rewriter._clients] == ["deepseek", "openrouter"]
+
+    monkeypatch.setenv("LLM_FAILOVER", "false")
+    assert main_module._build_rewriter(Settings.from_env()).provider_name == "deepseek"
+
+
+def test_process_once_keeps_breaker_state_across_cycles(tmp_path, monkeypatch) -> None:
+    import httpx
+
+    import app.main as main_module
+    from app.ai.circuit_breaker import OPEN
+    from app.ai.deepseek_client import DeepSeekClient
+    from app.config import Settings
+
+    calls: list[str] = []
+
+    def _unavailable(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    today = datetime.now(timezone.utc).date().strftime("%d %b %Y")
+    cycles = [
+        [{"title": f"c{c}t{i}", "date_utc": today, "source_url": f"https://aviation-safety.net/wikibase/{c}{i}"}
+         for i in range(2)]
+        for c in range(3)
+    ]
+    feed = iter(cycles)
+    monkeypatch.setattr(main_module, "AviationSafetyCollector", lambda *a, **kw: _FakeCollector(next(feed)))
+    monkeypatch.setattr(main_module, "TelegramPublisher", _FakePublisher)
+    monkeypatch.setattr(main_module.PhotoFinder, "find_photo", lambda self, **kw: None)
+    monkeypatch.setattr(
+        DeepSeekClient, "_client",
+        lambda self, timeout=40.0: httpx.Client(transport=httpx.MockTransport(_unavailable)),
+    )
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/avia.db")
+    monkeypatch.setenv("LLM_PROVIDER", "deepseek")
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "ds-key")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "")
+    monkeypatch.setenv("LLM_STREAMING", "false")
+    monkeypatch.setenv("LLM_BATCH_MAX_ITEMS", "1")
+    monkeypatch.setenv("LLM_BREAKER_MIN_CALLS", "4")
+    monkeypatch.setenv("REWRITE_CACHE_MAX_ENTRIES", "0")
+    settings = Settings.from_env()
+    rewriter = main_module._build_rewriter(settings)
+
+    for _ in cycles:
+        main_module.process_once(settings, rewriter=rewriter)
+
+    # Два цикла по два отказа набирают min_calls, третий цикл в API уже не ходит
+    assert rewriter._breaker.state == OPEN
+    assert len(calls) == 4
+
+
+def test_process_once_hedge_delay_uses_latency_from_earlier_cycles(tmp_path, monkeypatch) -> None:
+    import httpx
+
+    import app.main as main_module
+    from app.ai.deepseek_client import DeepSeekClient
+    from app.ai.failover import HEDGE_MIN_SAMPLES
+    from app.config import Settings
+
+    def _fast(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "короткий ответ"}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+        })
+
+    today = datetime.now(timezone.utc).date().strftime("%d %b %Y")
+    cycles = [
+        [{"title": f"c{c}t{i}", "date_utc": today, "source_url": f"https://aviation-safety.net/wikibase/{c}{i}"}
+         for i in range(2)]
+        for c in range(3)
+    ]
+    feed = iter(cycles)
+    monkeypatch.setattr(main_module, "AviationSafetyCollector", lambda *a, **kw: _FakeCollector(next(feed)))
+    monkeypatch.setattr(main_module, "TelegramPublisher", _FakePublisher)
+    monkeypatch.setattr(main_module.PhotoFinder, "find_photo", lambda self, **kw: None)
+    monkeypatch.setattr(
+        DeepSeekClient, "_client",
+        lambda self, timeout=40.0: httpx.Client(transport=httpx.MockTransport(_fast)),
+    )
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/avia.db")
+    monkeypatch.setenv("LLM_PROVIDER", "deepseek")
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "ds-key")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "or-key")
+    monkeypatch.setenv("LLM_HEDGE", "true")
+    monkeypatch.setenv("LLM_HEDGE_DELAY_SECONDS", "10")
+    monkeypatch.setenv("LLM_STREAMING", "false")
+    monkeypatch.setenv("LLM_BATCH_MAX_ITEMS", "1")
+    monkeypatch.setenv("REWRITE_CACHE_MAX_ENTRIES", "0")
+    settings = Settings.from_env()
+    rewriter = main_module._build_rewriter(settings)
+
+    for _ in cycles:
+        main_module.process_once(settings, rewriter=rewriter)
+
+    # В каждом цикле по два ответа — порог набирается только за несколько циклов
+    assert rewriter._clients[0].latency.summary("completion").count >= HEDGE_MIN_SAMPLES
+    assert rewriter.hedge_delay() < 1.0
+
+
+def test_process_once_keys_photo_cache_by_registration(tmp_path, monkeypatch) -> None:
+    import app.main as main_module
+    from app.config import Settings
+    from app.storage.repository import IncidentRepository
+
+    today = datetime.now(timezone.utc).date().strftime("%d %b %Y")
+    rows = [{
+        "title": "t0", "date_utc": today, "source_url": "https://aviation-safety.net/wikibase/1",
+        "aircraft": "Cessna 172S Skyhawk", "registration": "N85RW",
+    }]
+    looked_up: list[str] = []
+    monkeypatch.setattr(main_module, "AviationSafetyCollector", lambda *a, **kw: _FakeCollector(rows))
+    monkeypatch.setattr(main_module, "_build_rewriter", lambda *a, **kw: _FakeRewriter())
+    monkeypatch.setattr(main_module, "TelegramPublisher", _FakePublisher)
+    monkeypatch.setattr(main_module.PhotoFinder, "_planespotters", lambda self, reg: looked_up.append(reg))
+    monkeypatch.setattr(main_module.PhotoFinder, "_wikimedia", lambda self, query: None)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/avia.db")
+    monkeypatch.setenv("DRY_RUN", "false")
+    monkeypatch.setenv("PHOTO_CACHE_MAX_ENTRIES", "100")
+
+    main_module.process_once(Settings.from_env())
+
+    repository = IncidentRepository(f"sqlite:///{tmp_path}/avia.db")
+    assert looked_up == ["N85RW"]
+    assert repository.get_photo_lookup("planespotters:n85rw") is not None
+    assert repository.get_photo_lookup("planespotters:cessna 172s skyhawk") is None
+
+
+def test_process_once_writes_repository_batches_off_the_event_loop(tmp_path, monkeypatch) -> None:
+    import threading
+
+    import app.main as main_module
+    from app.config import Settings
+    from app.storage.repository import IncidentRepository
+
+    today = datetime.now(timezone.utc).date().strftime("%d %b %Y")
+    rows = [
+        {"title": f"t{i}", "date_utc": today, "source_url": f"https://aviation-safety.net/wikibase/{i}"}
+        for i in range(3)
+    ]
+    writers: list[threading.Thread] = []
+    write_batch = IncidentRepository._write_batch
+
+    def _spy(self, batch):
+        writers.append(threading.current_thread())
+        write_batch(self, batch)
+
+    monkeypatch.setattr(IncidentRepository, "_write_batch", _spy)
+    monkeypatch.setattr(main_module, "AviationSafetyCollector", lambda *a, **kw: _FakeCollector(rows))
+    monkeypatch.setattr(main_module, "_build_rewriter", lambda *a, **kw: _FakeRewriter())
+    monkeypatch.setattr(main_module, "TelegramPublisher", _FakePublisher)
+    monkeypatch.setattr(main_module.PhotoFinder, "find_photo", lambda self, **kw: None)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path}/avia.db")
+    monkeypatch.setenv("DRY_RUN", "false")
+
+    stats = main_module.process_once(Settings.from_env())
+
+    assert stats.published == 3
+    assert writers and threading.main_thread() not in writers
@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from app.collector.aviation_safety import AviationSafetyCollector
+from app.collector.parsers import LxmlParser, SoupParser, make_parser, parse_fatalities
+
+FIXTURES = Path(__file__).parent / "fixtures" / "asn"
+
+_CASES = [
+    ("rss.xml", "parse_rss"),
+    ("list_hp.html", "parse_incident_table"),
+    ("list_links.html", "parse_incident_table"),
+    ("detail.html", "parse_incident_detail"),
+    ("detail_paragraphs.html", "parse_incident_detail"),
+    ("detail_nested.html", "parse_incident_detail"),
+]
+
+
+@pytest.mark.parametrize("fixture,method", _CASES)
+def test_lxml_and_soup_backends_agree(fixture: str, method: str) -> None:
+    payload = (FIXTURES / fixture).read_text(encoding="utf-8")
+
+    fast = getattr(LxmlParser(), method)(payload)
+    reference = getattr(SoupParser(), method)(payload)
+
+    assert fast
+    assert fast == reference
+
+
+def test_lxml_detail_fields() -> None:
+    details = LxmlParser().parse_incident_detail((FIXTURES / "detail.html").read_text(encoding="utf-8"))
+
+    assert details["aircraft"] == "Airbus A320-214 (борт SU-GCA)"
+    assert details["date_utc"] == "Saturday 15 January 2026, 12:05 UTC"
+    assert details["persons_onboard"] == "154"
+    assert details["summary"].startswith("Нарратив: The aircraft sustained a bird strike")
+
+
+def test_lxml_skips_script_text_and_duplicates() -> None:
+    parser = LxmlParser()
+    rss = parser.parse_rss((FIXTURES / "rss.xml").read_text(encoding="utf-8"))
+    detail = parser.parse_incident_detail((FIXTURES / "detail_paragraphs.html").read_text(encoding="utf-8"))
+
+    assert [item["source_url"].rsplit("/", 1)[1] for item in rss] == ["512345", "512346", "512347"]
+    assert "script paragraph" not in detail["summary"]
+
+
+def test_empty_documents_parse_to_nothing() -> None:
+    parser = LxmlParser()
+    assert parser.parse_incident_table("   ") == []
+    assert parser.parse_incident_detail("") == {}
+
+
+def test_parser_backend_is_selectable() -> None:
+    collector = AviationSafetyCollector("test-agent", ["https://example.com"], parser_backend="bs4")
+    assert isinstance(collector._parser, SoupParser)
+    with pytest.raises(ValueError):
+        make_parser("html5lib")
+
+
+def test_detail_extractor_returns_typed_fields() -> None:
+    detail = LxmlParser().extract_incident_detail((FIXTURES / "detail.html").read_text(encoding="utf-8"))
+
+    assert detail.registration == "SU-GCA"
+    assert detail.aircraft_type == "Airbus A320-214"
+    assert detail.phase == "Initial climb"
+    assert detail.nature == "Passenger - Scheduled"
+    assert detail.fatalities == 0
+    assert detail.persons_onboard == 154
+
+
+def test_detail_extractor_follows_later_narrative_anchor() -> None:
+    detail = LxmlParser().extract_incident_detail((FIXTURES / "detail_nested.html").read_text(encoding="utf-8"))
+
+    assert detail.narrative.startswith("The Cessna collided with a Piper PA-28")
+    assert detail.fatalities == 1
+    assert detail.persons_onboard == 2
+    assert detail.date == "Thursday 13 January 2026 17:45"
+
+
+def test_parse_fatalities_takes_first_of_each_number() -> None:
+    assert parse_fatalities("Fatalities: 0 / Occupants: 154") == (0, 154)
+    assert parse_fatalities("Occupants: 2 / Fatalities: 1 / Fatalities: 9") == (1, 2)
+    assert parse_fatalities("unknown") == (None, None)
+
+
+def _chunked(payload: bytes, size: int = 64):
+    return (payload[i:i + size] for i in range(0, len(payload), size))
+
+
+@pytest.mark.parametrize("fixture,method", [case for case in _CASES if case[1] != "parse_incident_detail"])
+def test_streaming_feed_matches_full_parse(fixture: str, method: str) -> None:
+    payload = (FIXTURES / fixture).read_bytes()
+
+    streamed = list(LxmlParser().iter_feed(_chunked(payload)))
+
+    assert streamed == getattr(LxmlParser(), method)(payload.decode("utf-8"))
+    assert streamed == list(SoupParser().iter_feed(_chunked(payload)))
+
+
+def test_streaming_feed_yields_before_document_end() -> None:
+    payload = (FIXTURES / "rss.xml").read_bytes()
+    consumed: list[bytes] = []
+
+    def _chunks():
+        for chunk in _chunked(payload):
+            consumed.append(chunk)
+            yield chunk
+
+    first = next(LxmlParser().iter_feed(_chunks()))
+
+    assert first["source_url"].endswith("/512345")
+    assert sum(map(len, consumed)) < len(payload)
@@ -0,0 +1,94 @@
+import httpx
+
+from app.photos.cache import PhotoLookupCache
+from app.photos.finder import PLANESPOTTERS, WIKIMEDIA, PhotoFinder
+
+
+class _MemoryPhotoStore:
+    def __init__(self) -> None:
+        self.rows: dict[str, dict] = {}
+
+    def get_photo_lookup(self, lookup_key):
+        return self.rows.get(lookup_key)
+
+    def save_photo_lookup(self, lookup_key, source, photo_url, max_entries=0) -> None:
+        import time
+
+        self.rows[lookup_key] = {"source": source, "photo_url": photo_url, "fetched_at": time.time()}
+
+
+def _finder(monkeypatch, store, planespotters, wikimedia, miss_ttl=3600.0):
+    calls: list[tuple[str, str]] = []
+
+    def _source(name, answer):
+        def fetch(self, key):
+            calls.append((name, key))
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+        return fetch
+
+    monkeypatch.setattr(PhotoFinder, "_planespotters", _source(PLANESPOTTERS, planespotters))
+    monkeypatch.setattr(PhotoFinder, "_wikimedia", _source(WIKIMEDIA, wikimedia))
+    cache = PhotoLookupCache(store, hit_ttl_seconds=86400, miss_ttl_seconds=miss_ttl, max_entries=100)
+    return PhotoFinder(cache=cache), cache, calls
+
+
+def test_photo_cache_remembers_hits_and_misses_per_source(monkeypatch) -> None:
+    store = _MemoryPhotoStore()
+    finder, cache, calls = _finder(monkeypatch, store, planespotters=None, wikimedia="https://commons/pa28.jpg")
+
+    first = finder.find_photo("Piper PA-28-151 (борт N85RW)", "Piper PA-28-151 Cherokee Warrior (борт N85RW)")
+    second = finder.find_photo("Piper PA-28-161 (борт N85RW)", "Piper PA-28-161 Cherokee Warrior")
+
+    assert first == second == "https://commons/pa28.jpg"
+    # Второй поиск — без запросов: «фото нет» у Planespotters и фото модели из кэша
+    assert calls == [(PLANESPOTTERS, "N85RW"), (WIKIMEDIA, "Piper PA-28 Cherokee Warrior")]
+    stats = cache.stats()
+    assert (stats[PLANESPOTTERS].negative_hits, stats[PLANESPOTTERS].misses) == (1, 1)
+    assert (stats[WIKIMEDIA].hits, stats[WIKIMEDIA].misses) == (1, 1)
+
+
+def test_photo_cache_expires_misses_and_skips_errors(monkeypatch) -> None:
+    store = _MemoryPhotoStore()
+    finder, _, calls = _finder(monkeypatch, store, planespotters=None, wikimedia=None, miss_ttl=0.0)
+
+    finder.find_photo("N85RW", "Boeing 737-800")
+    finder.find_photo("N85RW", "Boeing 737-800")
+
+    # Негативная запись с нулевым TTL сразу устаревает
+    assert len(calls) == 4
+
+    store.rows.clear()
+    finder, _, calls = _finder(monkeypatch, store, planespotters=TimeoutError("slow"), wikimedia=None)
+    finder.find_photo("N85RW", "")
+
+    assert calls == [(PLANESPOTTERS, "N85RW")]
+    assert store.rows == {}
+
+
+
+def test_planespotters_not_found_is_cached_but_server_error_is_not(monkeypatch) -> None:
+    requests: list[str] = []
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if request.url.path.endswith("/N404"):
+            return httpx.Response(404, json={"error": "not found"})
+        if request.url.path.endswith("/N200"):
+            return httpx.Response(200, json={"photos": []})
+        return httpx.Response(503)
+
+    monkeypatch.setattr(PhotoFinder, "_client", lambda self: httpx.Client(transport=httpx.MockTransport(_handler)))
+    store = _MemoryPhotoStore()
+    cache = PhotoLookupCache(store, hit_ttl_seconds=86400, miss_ttl_seconds=3600, max_entries=100)
+    finder = PhotoFinder(cache=cache)
+
+    for _ in range(2):
+        for reg in ("N404", "N200", "N503"):
+            assert finder.find_photo(reg, "") is None
+
+    # 404 и пустой список — негативные записи; 503 запрашивается снова
+    assert sorted(store.rows) == ["planespotters:n200", "planespotters:n404"]
+    assert requests.count("/pub/photos/reg/N503") == 2
+    assert len(requests) == 4
@@ -0,0 +1,126 @@
+import asyncio
+import random
+
+import pytest
+
+from app.collector.rate_limit import HostRateLimiter
+from app.pipeline.engine import Stage, StagePipeline
+
+
+def _run(pipeline: StagePipeline, items, consume) -> int:
+    return asyncio.run(pipeline.run(items, consume))
+
+
+def test_pipeline_consumes_in_input_order_despite_random_delays() -> None:
+    rnd = random.Random(42)
+
+    async def _slow(x: int) -> int:
+        await asyncio.sleep(rnd.random() / 200)
+        return x * 10
+
+    consumed: list[int] = []
+
+    async def _consume(outcome) -> bool:
+        consumed.append(outcome.item)
+        return True
+
+    pipeline = StagePipeline([Stage("a", _slow, 4), Stage("b", _slow, 3)], max_in_flight=8)
+    count = _run(pipeline, range(20), _consume)
+
+    assert count == 20
+    assert consumed == [x * 100 for x in range(20)]
+
+
+def test_pipeline_stops_when_consumer_returns_false() -> None:
+    started: list[int] = []
+
+    async def _stage(x: int) -> int:
+        started.append(x)
+        return x
+
+    consumed: list[int] = []
+
+    async def _consume(outcome) -> bool:
+        consumed.append(outcome.item)
+        return len(consumed) < 3
+
+    pipeline = StagePipeline([Stage("a", _stage, 2)], max_in_flight=2)
+    _run(pipeline, range(100), _consume)
+
+    assert consumed == [0, 1, 2]
+    # Окно max_in_flight не даёт конвейеру уйти далеко вперёд
+    assert max(started) < 6
+
+
+def test_pipeline_forwards_stage_errors_to_consumer() -> None:
+    async def _boom(x: int) -> int:
+        if x == 1:
+            raise ValueError("bad item")
+        return x
+
+    async def _never(x: int) -> int:
+        assert x != 1, "failed item must skip later stages"
+        return x
+
+    outcomes = []
+
+    async def _consume(outcome) -> bool:
+        outcomes.append(outcome)
+        return True
+
+    pipeline = StagePipeline([Stage("first", _boom), Stage("second", _never)], max_in_flight=4)
+    _run(pipeline, range(3), _consume)
+
+    assert [o.item for o in outcomes] == [0, 1, 2]
+    assert isinstance(outcomes[1].error, ValueError)
+    assert outcomes[1].failed_stage == "first"
+    assert outcomes[0].error is None
+
+
+def test_pipeline_propagates_feeder_errors() -> None:
+    def _items():
+        yield 1
+        raise RuntimeError("db down")
+
+    async def _stage(x: int) -> int:
+        return x
+
+    async def _consume(outcome) -> bool:
+        return True
+
+    pipeline = StagePipeline([Stage("a", _stage)], max_in_flight=4)
+    with pytest.raises(RuntimeError, match="db down"):
+        _run(pipeline, _items(), _consume)
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+        self.sleeps: list[float] = []
+
+    def clock(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_spaces_requests_per_host() -> None:
+    fake = _FakeClock()
+    limiter = HostRateLimiter(1.5, clock=fake.clock, sleep=fake.sleep)
+
+    assert limiter.wait("https://aviation-safety.net/rss.xml") == 0.0
+    assert limiter.wait("https://aviation-safety.net/wikibase/1") == pytest.approx(1.5)
+    # Другой хост не ждёт ASN
+    assert limiter.wait("https://api.deepseek.com/v1/chat/completions") == 0.0
+    assert fake.sleeps == [pytest.approx(1.5)]
+
+
+def test_rate_limiter_does_not_wait_after_interval_elapsed() -> None:
+    fake = _FakeClock()
+    limiter = HostRateLimiter(1.5, clock=fake.clock, sleep=fake.sleep)
+
+    limiter.wait("https://aviation-safety.net/a")
+    fake.now += 10
+    assert limiter.wait("https://aviation-safety.net/b") == 0.0
@@ -0,0 +1,95 @@
+import dataclasses
+
+from app.ai.prompt_builder import PromptBuilder, has_casualties
+from app.ai.prompt_templates import (
+    EXAMPLE_WITH_CASUALTIES,
+    EXAMPLE_WITHOUT_CASUALTIES,
+    PROMPT_PREFIX_WITH_CASUALTIES,
+    PROMPT_PREFIX_WITHOUT_CASUALTIES,
+    SYSTEM_PROMPT,
+    build_incident_prompt,
+)
+from app.ai.usage import estimate_tokens
+from app.domain.models import Incident
+
+_NARRATIVE = (
+    "Нарратив: An Airbus A320 operated by Air Test was involved in an incident near Cairo. "
+    "The crew declared an emergency after the number two engine failed during the climb. "
+    "The aircraft returned to Cairo and landed safely on runway 05C. "
+    "The crew declared an emergency after the number two engine failed during the climb. "
+    "Weather at the time was fine with light winds."
+)
+
+
+def _incident(summary: str = _NARRATIVE, fatalities: str = "") -> Incident:
+    return Incident(
+        incident_id="abc",
+        title="Engine failure",
+        event_type="incident",
+        date_utc="2026-01-01",
+        location="Cairo",
+        aircraft="Airbus A320",
+        operator="Air Test",
+        persons_onboard="150",
+        summary=f"{summary}\nФаза полёта: Взлёт (TOF)\nАэропорт вылета: Cairo (HECA)",
+        source_url="https://aviation-safety.net/wikibase/1",
+        fatalities=fatalities,
+    )
+
+
+def test_prompt_builder_drops_repeats_and_fact_paragraphs() -> None:
+    built = PromptBuilder(token_budget=5000).build(_incident())
+    summary = built.incident.summary
+
+    assert summary.count("number two engine failed") == 1
+    assert "operated by Air Test" not in summary  # пересказ таблицы фактов
+    assert "returned to Cairo" in summary
+    assert summary.startswith("Нарратив: ")
+    assert summary.endswith("Фаза полёта: Взлёт (TOF)\nАэропорт вылета: Cairo (HECA)")
+    assert (built.sentences_kept, built.sentences_total) == (3, 5)
+
+
+def test_prompt_builder_picks_one_example() -> None:
+    calm = PromptBuilder(token_budget=5000).build(_incident())
+    fatal = PromptBuilder(token_budget=5000).build(_incident(fatalities="2"))
+
+    assert calm.prefix == PROMPT_PREFIX_WITHOUT_CASUALTIES
+    assert EXAMPLE_WITH_CASUALTIES not in calm.prefix
+    assert fatal.prefix == PROMPT_PREFIX_WITH_CASUALTIES
+    assert EXAMPLE_WITHOUT_CASUALTIES not in fatal.prefix
+    assert has_casualties(_incident(summary="Нарратив: Two passengers were injured."))
+
+
+def test_prompt_builder_ignores_zero_fatalities_and_negated_injuries() -> None:
+    calm = _incident(summary="Нарратив: The crew evacuated the aircraft. No one was injured.\nПогибших: 0")
+
+    assert not has_casualties(calm)
+    assert not has_casualties(_incident(summary="The pilot was uninjured. There were no injuries."))
+    assert has_casualties(_incident(summary="Нарратив: Nobody on board was hurt, but a ground worker died.\nПогибших: 0"))
+    assert PromptBuilder(token_budget=5000).build(calm).prefix == PROMPT_PREFIX_WITHOUT_CASUALTIES
+
+
+def test_prompt_builder_respects_budget_and_keeps_order() -> None:
+    filler = " ".join(f"Passenger statement {i} was recorded by investigators at the gate." for i in range(40))
+    incident = _incident(summary=f"{_NARRATIVE} {filler}")
+    fixed = (
+        estimate_tokens(SYSTEM_PROMPT)
+        + estimate_tokens(PROMPT_PREFIX_WITHOUT_CASUALTIES)
+        + estimate_tokens(build_incident_prompt(dataclasses.replace(incident, summary="")))
+    )
+    budget = fixed + 120
+
+    built = PromptBuilder(token_budget=budget).build(incident)
+
+    assert built.estimated_tokens <= budget + 30  # строки фактов не сокращаются
+    assert built.sentences_kept < built.sentences_total
+    summary = built.incident.summary
+    # Предложения о самом событии важнее показаний и идут в исходном порядке
+    assert summary.index("engine failed") < summary.index("returned to Cairo")
+
+
+def test_prompt_builder_keeps_one_sentence_when_budget_is_tiny() -> None:
+    built = PromptBuilder(token_budget=1).build(_incident())
+
+    assert built.sentences_kept == 1
+    assert "engine failed" in built.incident.summary
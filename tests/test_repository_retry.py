@@ -66,3 +66,331 @@ def test_dry_run_reset_does_not_touch_other_skipped(repo: IncidentRepository) ->
     count = repo.reset_dry_run_skipped()
     assert count == 0
     assert repo.exists(inc.incident_id) is True
+
+
+def test_feed_state_upsert(repo: IncidentRepository) -> None:
+    url = "https://aviation-safety.net/rss.xml"
+    assert repo.get_feed_state(url) is None
+
+    repo.save_feed_state(url, '"v1"', "", "hash1")
+    repo.save_feed_state(url, '"v2"', "Sat, 15 Jan 2026 12:00:00 GMT", "hash2", "https://aviation-safety.net/wikibase/1")
+
+    state = repo.get_feed_state(url)
+    assert state == {
+        "etag": '"v2"',
+        "last_modified": "Sat, 15 Jan 2026 12:00:00 GMT",
+        "body_hash": "hash2",
+        "high_water_mark": "https://aviation-safety.net/wikibase/1",
+    }
+
+
+def test_filter_unseen_resolves_batch_in_order(repo: IncidentRepository) -> None:
+    for incident_id, status in [("pub", "published"), ("skip", "skipped"), ("disc", None), ("fail", "failed")]:
+        repo.save_discovered(_make_incident(incident_id))
+        if status == "published":
+            repo.mark_published(incident_id, "text")
+        elif status == "skipped":
+            repo.mark_skipped(incident_id, "reason")
+        elif status == "failed":
+            repo.mark_failed(incident_id, "error")
+
+    unseen = repo.filter_unseen(["new1", "pub", "fail", "skip", "disc", "new2"])
+
+    assert unseen == ["new1", "fail", "disc", "new2"]
+
+
+def test_filter_unseen_uses_warm_index_without_db(tmp_path) -> None:
+    url = f"sqlite:///{tmp_path}/warm.db"
+    writer = IncidentRepository(url)
+    writer.save_discovered(_make_incident("done"))
+    writer.mark_published("done", "text")
+
+    # Новый процесс: индекс загружается при старте
+    repo = IncidentRepository(url)
+
+    def _no_db(*args):
+        raise AssertionError("terminal IDs must be rejected without touching the DB")
+
+    repo._conn = _no_db
+    assert repo.filter_unseen(["done", "done"]) == []
+    assert repo.exists("done") is True
+
+
+def test_known_ids_sees_writes_from_other_processes(tmp_path) -> None:
+    url = f"sqlite:///{tmp_path}/known.db"
+    repo = IncidentRepository(url)
+    other = IncidentRepository(url)
+    other.save_discovered(_make_incident("done"))
+    other.mark_published("done", "text")
+    other.save_discovered(_make_incident("pending"))
+
+    assert repo.known_ids() == frozenset({"done"})
+
+
+def test_terminal_index_tracks_failed_retries(repo: IncidentRepository) -> None:
+    inc = _make_incident()
+    repo.save_discovered(inc)
+    for _ in range(MAX_RETRY_ATTEMPTS):
+        repo.mark_failed(inc.incident_id, "error")
+
+    assert inc.incident_id in repo._terminal_ids
+
+
+def test_sqlite_connection_is_reused_with_pragmas(repo: IncidentRepository) -> None:
+    with repo._conn("probe") as first:
+        journal = first.execute("PRAGMA journal_mode").fetchone()[0]
+        sync = first.execute("PRAGMA synchronous").fetchone()[0]
+    with repo._conn("probe") as second:
+        pass
+
+    assert first is second
+    assert journal == "wal"
+    assert sync == 1  # NORMAL
+    assert repo.latency.summary("probe").count == 2
+
+
+def test_sqlite_connection_is_per_thread(repo: IncidentRepository) -> None:
+    import threading
+
+    seen = []
+
+    def _worker() -> None:
+        with repo._conn("probe") as conn:
+            seen.append(conn)
+        seen.append(repo.exists("missing"))
+
+    thread = threading.Thread(target=_worker)
+    thread.start()
+    thread.join()
+
+    with repo._conn("probe") as main_conn:
+        pass
+    assert seen[0] is not main_conn
+    assert seen[1] is False
+
+
+class _FakePgConn:
+    def __init__(self, healthy: bool = True) -> None:
+        self.closed = 0
+        self.autocommit = True
+        self._healthy = healthy
+
+    def cursor(self):
+        import psycopg2
+
+        conn = self
+
+        class _Cur:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return None
+
+            def execute(self, sql):
+                if not conn._healthy:
+                    raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+        return _Cur()
+
+    def rollback(self) -> None:
+        pass
+
+
+class _FakePool:
+    def __init__(self, conns: list) -> None:
+        self._conns = conns
+        self.returned: list[tuple] = []
+
+    def getconn(self):
+        return self._conns.pop(0)
+
+    def putconn(self, conn, close=False) -> None:
+        self.returned.append((conn, close))
+
+
+def test_pg_checkout_reconnects_after_failed_health_check() -> None:
+    pytest.importorskip("psycopg2")
+    stale, fresh = _FakePgConn(healthy=False), _FakePgConn()
+    repo = IncidentRepository.__new__(IncidentRepository)
+    repo._pg_pool = _FakePool([stale, fresh])
+    repo._pg_last_used = {}
+
+    conn = repo._checkout_pg()
+
+    assert conn is fresh
+    assert repo._pg_pool.returned == [(stale, True)]
+    assert conn.autocommit is False
+
+
+def test_unit_of_work_groups_transitions_into_one_transaction(repo: IncidentRepository) -> None:
+    with repo.unit_of_work() as uow:
+        for n in range(5):
+            uow.save_discovered(_make_incident(f"id{n}"))
+        uow.mark_skipped("id0", "dry_run_skip_publish")
+        uow.mark_failed("id1", "boom")
+        # До flush в БД ничего нет
+        assert repo.get_stats() == {}
+
+    assert repo.latency.summary("write_batch").count == 1
+    assert repo.get_stats() == {"discovered": 3, "skipped": 1, "failed": 1}
+    assert repo.filter_unseen(["id0", "id1", "id2"]) == ["id1", "id2"]
+
+
+def test_unit_of_work_flushes_every_n_incidents(repo: IncidentRepository) -> None:
+    uow = repo.unit_of_work(flush_every=2)
+    uow.save_discovered(_make_incident("a"))
+    assert repo.get_stats() == {}
+    uow.save_discovered(_make_incident("b"))
+    assert repo.get_stats() == {"discovered": 2}
+
+
+def test_unit_of_work_marks_published_immediately(repo: IncidentRepository) -> None:
+    uow = repo.unit_of_work(flush_every=100)
+    uow.save_discovered(_make_incident("p1"))
+    uow.mark_published("p1", "text")
+
+    # Без выхода из контекста: отметка о публикации уже в БД
+    fresh = IncidentRepository(repo._url)
+    assert fresh.exists("p1") is True
+
+
+def test_save_discovered_fills_typed_columns(repo: IncidentRepository) -> None:
+    inc = Incident(
+        incident_id="typed",
+        title="Test",
+        event_type="incident",
+        date_utc="24 Feb 2026, 17:32",
+        location="Formosa",
+        aircraft="Piper PA-28-151 (борт N85RW)",
+        operator="",
+        persons_onboard="2",
+        summary="",
+        source_url="https://aviation-safety.net/wikibase/1",
+        registration="N85RW",
+        fatalities="1",
+    )
+    repo.save_discovered(inc)
+
+    with repo._conn("probe") as conn:
+        row = dict(conn.execute(
+            "SELECT incident_date, registration, aircraft_type, fatalities, persons_onboard "
+            "FROM incidents WHERE incident_id = 'typed'"
+        ).fetchone())
+
+    assert row == {
+        "incident_date": "2026-02-24",
+        "registration": "N85RW",
+        "aircraft_type": "Piper PA-28-151",
+        "fatalities": 1,
+        "persons_onboard": 2,
+    }
+
+
+def test_typed_columns_backfilled_for_legacy_schema(tmp_path) -> None:
+    import sqlite3
+
+    db = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db)
+    conn.execute("""
+        CREATE TABLE incidents (
+            incident_id TEXT PRIMARY KEY, title TEXT NOT NULL, date_utc TEXT, location TEXT,
+            aircraft TEXT, source_url TEXT, rewrite_text TEXT, status TEXT NOT NULL,
+            first_seen_at TEXT NOT NULL, published_at TEXT
+        )
+    """)
+    conn.execute(
+        "INSERT INTO incidents VALUES ('old', 't', 'Sat, 15 Jan 2026 12:00:00 GMT', 'Cairo', "
+        "'Airbus A320 (борт SU-ABC)', 'u', 'x', 'published', '2026-01-15T12:00:00', NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    repo = IncidentRepository(f"sqlite:///{db}")
+
+    with repo._conn("probe") as c:
+        row = dict(c.execute("SELECT incident_date, registration, aircraft_type FROM incidents").fetchone())
+    assert row == {"incident_date": "2026-01-15", "registration": "SU-ABC", "aircraft_type": "Airbus A320"}
+    assert repo.exists("old") is True
+
+
+def test_status_queries_do_not_scan_table(repo: IncidentRepository) -> None:
+    def _plan(sql: str) -> str:
+        with repo._conn("probe") as conn:
+            return " ".join(str(tuple(r)) for r in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+
+    reset_plan = _plan(
+        "UPDATE incidents SET status = 'discovered' "
+        "WHERE status = 'skipped' AND rewrite_text = 'dry_run_skip_publish'"
+    )
+    stats_plan = _plan("SELECT status, COUNT(*) FROM incidents GROUP BY status")
+
+    assert "USING INDEX" in reset_plan
+    assert "COVERING INDEX idx_incidents_status" in stats_plan
+
+
+def test_migrations_recorded_and_skipped_on_restart(tmp_path) -> None:
+    from app.storage.migrations import LATEST_VERSION
+
+    url = f"sqlite:///{tmp_path / 'migrate.db'}"
+    first = IncidentRepository(url)
+    with first._conn("probe") as conn:
+        versions = [r["version"] for r in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert versions == list(range(1, LATEST_VERSION + 1))
+
+    executed: list[str] = []
+    second = IncidentRepository(url)
+    second._sqlite_conn().set_trace_callback(executed.append)
+    second._ensure_schema()
+    assert executed
+    assert not any(sql.lstrip().upper().startswith(("CREATE", "ALTER")) for sql in executed)
+
+
+def test_detail_page_cache_roundtrip_and_lru_eviction(repo: IncidentRepository) -> None:
+    import time
+
+    repo.save_detail_page("https://aviation-safety.net/wikibase/1", b"one", '"e1"', "", max_entries=2)
+    time.sleep(0.01)
+    repo.save_detail_page("https://aviation-safety.net/wikibase/2", b"two", "", "", max_entries=2)
+    time.sleep(0.01)
+    repo.touch_detail_page("https://aviation-safety.net/wikibase/1")
+    repo.save_detail_page("https://aviation-safety.net/wikibase/3", b"three", "", "", max_entries=2)
+
+    page = repo.get_detail_page("https://aviation-safety.net/wikibase/1")
+    assert page["body"] == b"one"
+    assert page["etag"] == '"e1"'
+    # /2 читали давнее всех — вытеснена
+    assert repo.get_detail_page("https://aviation-safety.net/wikibase/2") is None
+    assert repo.get_detail_page("https://aviation-safety.net/wikibase/3") is not None
+
+
+def test_rewrite_cache_roundtrip_and_lru_eviction(repo: IncidentRepository) -> None:
+    import time
+
+    repo.save_cached_rewrite("k1", "deepseek", "deepseek-chat", "one", 850.0, 400, max_entries=2)
+    time.sleep(0.01)
+    repo.save_cached_rewrite("k2", "deepseek", "deepseek-chat", "two", 900.0, 410, max_entries=2)
+    time.sleep(0.01)
+    assert repo.get_cached_rewrite("k1")["rewrite_text"] == "one"
+    repo.save_cached_rewrite("k3", "deepseek", "deepseek-chat", "three", 700.0, 380, max_entries=2)
+
+    # k2 читали давнее всех — вытеснен
+    assert repo.get_cached_rewrite("k2") is None
+    assert repo.get_cached_rewrite("k3")["tokens"] == 380
+    repo.delete_cached_rewrite("k1")
+    assert repo.get_cached_rewrite("k1") is None
+
+
+def test_photo_cache_roundtrip_and_lru_eviction(repo: IncidentRepository) -> None:
+    import time
+
+    repo.save_photo_lookup("planespotters:n85rw", "planespotters", "https://cdn/n85rw.jpg", max_entries=2)
+    time.sleep(0.01)
+    repo.save_photo_lookup("planespotters:n1", "planespotters", "", max_entries=2)
+    time.sleep(0.01)
+    assert repo.get_photo_lookup("planespotters:n85rw")["photo_url"] == "https://cdn/n85rw.jpg"
+    repo.save_photo_lookup("wikimedia:boeing 737", "wikimedia", "https://commons/737.jpg", max_entries=2)
+
+    # n1 читали давнее всех — вытеснен
+    assert repo.get_photo_lookup("planespotters:n1") is None
+    assert repo.get_photo_lookup("wikimedia:boeing 737")["source"] == "wikimedia"
@@ -0,0 +1,83 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.transport.http import HttpTransport
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802
+        body = f"ok {self.headers.get('X-Client', '')}".encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_transport_reuses_connection_across_sessions(server) -> None:
+    transport = HttpTransport(http2=False)
+    try:
+        for client_name in ("collector", "photos", "telegram"):
+            with transport.session(timeout=5.0, headers={"X-Client": client_name}) as session:
+                response = session.get(f"{server}/ping")
+                assert response.text == f"ok {client_name}"
+
+        stats = transport.stats()
+        host = server.removeprefix("http://")
+        assert stats[host].requests == 3
+        assert stats[host].connections == 1
+        assert stats[host].reused == 2
+        assert stats[host].tls_handshakes == 0
+    finally:
+        transport.close()
+
+
+def test_transport_counts_errors_per_host() -> None:
+    transport = HttpTransport(http2=False)
+    try:
+        with pytest.raises(Exception):
+            transport.session(timeout=0.5).get("http://127.0.0.1:1/unreachable")
+        assert transport.stats()["127.0.0.1:1"].errors == 1
+    finally:
+        transport.close()
+
+
+def test_session_stream_reads_body(server) -> None:
+    transport = HttpTransport(http2=False)
+    try:
+        with transport.session(timeout=5.0).stream("GET", f"{server}/stream") as response:
+            assert b"".join(response.iter_bytes()) == b"ok "
+    finally:
+        transport.close()
+
+
+def test_transport_raises_pool_timeout_when_host_slots_are_busy(server) -> None:
+    transport = HttpTransport(max_connections_per_host=1, http2=False)
+    try:
+        with transport.session(timeout=5.0).stream("GET", f"{server}/slow") as response:
+            assert response.status_code == 200
+            with pytest.raises(httpx.PoolTimeout):
+                transport.session(timeout=0.2).get(f"{server}/ping")
+        # Слот освобождён — следующий запрос проходит
+        assert transport.session(timeout=5.0).get(f"{server}/ping").status_code == 200
+        host = server.removeprefix("http://")
+        assert transport.stats()[host].errors == 1
+    finally:
+        transport.close()
@@ -14,3 +14,80 @@ def test_validate_rewrite_too_short() -> None:
     ok, reason = validate_rewrite(text)
     assert ok is False
     assert reason == "too_short"
+
+
+def test_render_post_always_passes_template_checks() -> None:
+    from app.ai.post_renderer import StructuredPost, render_post
+    from app.ai.validator import REQUIRED_EMOJIS, REQUIRED_HASHTAGS
+
+    post = StructuredPost(
+        headline="✈️ «LATAM A320 прервал взлет в Боготе»",
+        details="Подробности: 20 февраля 2026 года Airbus A320\nпрервал взлет из-за вертолета на полосе.",
+        casualties="",
+        region_tags=["#Колумбия", "Богота Колумбия"],
+        extra_tags=["авиация", "прерванный взлет"],
+    )
+
+    text = render_post(post)
+
+    assert text.startswith("✈️ LATAM A320 прервал взлет в Боготе\n\n📍 Подробности: 20 февраля 2026 года Airbus A320 прервал")
+    assert "⚠️" not in text
+    assert text.splitlines()[-1] == (
+        "#авиация #происшествие #Колумбия #БоготаКолумбия #небонаграни #авиабезопасность #прерванныйвзлет"
+    )
+    assert all(tag in text for tag in REQUIRED_HASHTAGS)
+    assert all(emoji in text for emoji in REQUIRED_EMOJIS)
+
+
+def test_render_post_adds_casualties_block_only_when_present() -> None:
+    from app.ai.post_renderer import StructuredPost, render_post
+
+    text = render_post(StructuredPost(headline="h", details="d", casualties="Пострадавшие: пилот получил травмы."))
+
+    assert "\n\n⚠️ Пострадавшие: пилот получил травмы.\n\n" in text
+
+
+def test_repair_rewrite_fixes_markers_hashtags_and_markdown() -> None:
+    from app.ai.repair import repair_rewrite
+
+    body = " ".join(["слово"] * 100)
+    text = f"## **Boeing 737 вернулся в аэропорт**\n\nПодробности: {body} *важно\n\n#авиация #США"
+
+    result = repair_rewrite(text)
+
+    assert validate_rewrite(result.text) == (True, "ok")
+    assert result.fixes == ("markdown", "markers", "hashtags")
+    assert result.text.startswith("✈️ Boeing 737 вернулся в аэропорт\n\n📍 Подробности: слово")
+    assert "*" not in result.text and "##" not in result.text
+    assert result.text.splitlines()[-1] == "#авиация #США #происшествие #небонаграни #авиабезопасность"
+
+
+def test_repair_rewrite_trims_to_word_ceiling_at_sentence_boundary() -> None:
+    from app.ai.repair import repair_rewrite
+    from app.ai.validator import MAX_WORDS
+
+    sentence = "Экипаж сообщил о проблеме с двигателем и вернулся."
+    text = (
+        f"✈️ Заголовок\n\n📍 Подробности: {' '.join([sentence] * 60)}\n\n⚠️ Пострадавшие: нет.\n\n"
+        "#авиация #происшествие #небонаграни #авиабезопасность"
+    )
+
+    result = repair_rewrite(text)
+
+    assert result.fixes == ("too_long",)
+    assert len(result.text.split()) <= MAX_WORDS
+    details = result.text.split("\n\n")[1]
+    assert details.endswith("вернулся.")
+    assert "⚠️ Пострадавшие: нет." in result.text
+
+
+def test_repair_rewrite_leaves_valid_and_short_texts_alone() -> None:
+    from app.ai.repair import repair_rewrite
+
+    body = " ".join(["слово"] * 100)
+    valid = f"✈️ Заголовок\n\n📍 Подробности: {body}\n\n#авиация #происшествие #небонаграни #авиабезопасность"
+    short = "post t0 with [link"
+
+    assert repair_rewrite(valid).text == valid and repair_rewrite(valid).fixes == ()
+    assert repair_rewrite(short).text == "post t0 with link"
+    assert repair_rewrite(short).fixes == ("markdown",)